@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+本地数据目录
+默认 ~/.ossgui，可通过环境变量 OSSGUI_HOME 修改
+"""
+
+import os
+
+
+def data_dir(*parts):
+    """返回数据目录（或其子目录），不存在时自动创建"""
+    base = os.environ.get("OSSGUI_HOME") or os.path.join(os.path.expanduser("~"), ".ossgui")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
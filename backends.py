@@ -0,0 +1,813 @@
+# -*- coding: utf-8 -*-
+"""
+对象存储后端
+统一的存储访问接口，GUI 只依赖这里的结构化结果：
+1.OCISDKBackend: 进程内调用 OCI Python SDK（默认，每个 profile 一个长连接客户端）
+2.OCICLIBackend: 调用 oci 命令行（备用）
+3.FakeBackend:   本地内存实现，无需网络即可测试
+"""
+
+import base64
+import configparser
+import hashlib
+import io
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from metrics import InstrumentedBackend
+
+DEFAULT_POOL_SIZE = 32  # 每个客户端的 HTTP 连接池大小
+LIST_FIELDS = "name,size,timeModified,md5,etag"
+COPY_POLL_INTERVAL = 1.0  # 复制工作请求轮询间隔（秒）
+TRANSIENT_STATUS = (500, 502, 504)  # 服务端暂时错误，可重试
+FAKE_NAMESPACE = "fakens"
+FAKE_TENANCY = "ocid1.tenancy.oc1..fake"
+
+
+class StorageError(Exception):
+    """存储后端调用失败
+
+    transient 表示网络中断、超时等与请求内容无关的错误。
+    """
+
+    def __init__(self, message, status=None, headers=None, transient=False):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+        self.transient = transient
+
+    @property
+    def throttled(self):
+        """服务端限流或暂时不可用，可稍后重试"""
+        return self.status in (429, 503)
+
+    @property
+    def retryable(self):
+        """限流、服务端暂时错误或网络错误，重试可能成功"""
+        return self.throttled or self.status in TRANSIENT_STATUS or self.transient
+
+    @property
+    def retry_after(self):
+        """服务端要求的等待秒数（Retry-After 头），没有时返回 None"""
+        value = self.headers.get('retry-after') or self.headers.get('Retry-After')
+        try:
+            return max(0.0, float(value)) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+
+def _object_info(name, size=0, time_modified=None, md5=None, etag=None):
+    """构建与 oci CLI JSON 输出同名字段的对象信息"""
+    if isinstance(time_modified, datetime):
+        time_modified = time_modified.isoformat()
+    return {'name': name, 'size': size or 0, 'time-modified': time_modified or '', 'md5': md5, 'etag': etag}
+
+
+def _bucket_info(name, namespace, compartment_id, time_created=None):
+    """与 oci CLI JSON 输出同名字段的 bucket 信息"""
+    if isinstance(time_created, datetime):
+        time_created = time_created.isoformat()
+    return {'name': name, 'namespace': namespace, 'compartment-id': compartment_id, 'time-created': time_created or ''}
+
+
+def _head_info(name, headers):
+    """把 HEAD 响应头转换为对象信息，附带分段 MD5 和自定义元数据"""
+    info = _object_info(name, int(headers.get('content-length', 0)), headers.get('last-modified'),
+                        headers.get('content-md5'), headers.get('etag'))
+    info['multipart-md5'] = headers.get('opc-multipart-md5')
+    info['content-encoding'] = headers.get('content-encoding')
+    info['metadata'] = {k[len('opc-meta-'):]: v for k, v in headers.items() if k.lower().startswith('opc-meta-')}
+    return info
+
+
+def _range_header(byte_range):
+    """(起始, 结束) 闭区间转换为 HTTP Range 头"""
+    return f"bytes={byte_range[0]}-{byte_range[1]}"
+
+
+class StorageBackend:
+    """存储后端基类，子类实现具体的访问方式"""
+
+    name = "base"
+    supports_multipart = False  # 是否支持分段上传接口
+
+    def get_namespace(self):
+        """当前 profile 所属租户的 namespace"""
+        raise NotImplementedError
+
+    def tenancy_id(self):
+        """租户（根 compartment）的 OCID，无法确定时返回 None"""
+        return None
+
+    def list_compartments(self, compartment_id):
+        """列出直接子 compartment（只含 ACTIVE 状态），返回 [{'id', 'name'}]"""
+        raise NotImplementedError
+
+    def list_buckets(self, namespace, compartment_id):
+        """列出 compartment 中的全部 bucket（不含子 compartment），返回 [{'name', 'namespace', 'compartment-id', 'time-created'}]"""
+        raise NotImplementedError
+
+    def get_bucket(self, namespace, bucket):
+        """获取bucket信息，不存在时抛出StorageError"""
+        raise NotImplementedError
+
+    def list_objects(self, namespace, bucket, prefix=None, start=None, limit=None, delimiter=None):
+        """列出一页对象，返回 {'objects': [...], 'prefixes': [...], 'next_start_with': str|None}
+
+        指定 delimiter 时只返回直接子对象，子目录以公共前缀的形式放在 prefixes 中
+        """
+        raise NotImplementedError
+
+    def head_object(self, namespace, bucket, name):
+        """获取对象元数据"""
+        raise NotImplementedError
+
+    def put_object(self, namespace, bucket, name, body, content_length=None, metadata=None, content_encoding=None):
+        """上传对象，body 为 bytes 或可读文件对象；content_encoding 为压缩格式（Content-Encoding 头）"""
+        raise NotImplementedError
+
+    def get_object(self, namespace, bucket, name, byte_range=None, if_match=None):
+        """下载对象，返回可 read() 的流
+
+        byte_range 为 (起始, 结束) 闭区间；if_match 为 ETag，对象已变化时抛出状态码 412 的 StorageError
+        """
+        raise NotImplementedError
+
+    def delete_object(self, namespace, bucket, name):
+        """删除对象"""
+        raise NotImplementedError
+
+    def copy_object(self, namespace, bucket, source_name, destination_name):
+        """在同一bucket内复制对象，等待复制完成后返回"""
+        raise NotImplementedError
+
+    def rename_object(self, namespace, bucket, source_name, new_name):
+        """服务端重命名对象（只修改元数据，不搬移数据）"""
+        raise NotImplementedError
+
+    def create_multipart_upload(self, namespace, bucket, name, metadata=None, content_encoding=None):
+        """创建分段上传，返回 upload_id"""
+        raise NotImplementedError
+
+    def upload_part(self, namespace, bucket, name, upload_id, part_num, body, content_length):
+        """上传一个分段（part_num 从 1 开始），返回该分段的 etag"""
+        raise NotImplementedError
+
+    def list_multipart_upload_parts(self, namespace, bucket, name, upload_id):
+        """列出分段上传中已上传的分段，返回 {part_num: {'etag', 'md5', 'size'}}，上传不存在时抛出状态码 404"""
+        raise NotImplementedError
+
+    def commit_multipart_upload(self, namespace, bucket, name, upload_id, parts):
+        """提交分段上传，parts 为按序排列的 (part_num, etag)"""
+        raise NotImplementedError
+
+    def abort_multipart_upload(self, namespace, bucket, name, upload_id):
+        """放弃分段上传，释放已上传的分段"""
+        raise NotImplementedError
+
+    def put_file(self, namespace, bucket, name, file_path, metadata=None):
+        """上传本地文件"""
+        with open(file_path, 'rb') as f:
+            return self.put_object(namespace, bucket, name, f, content_length=os.path.getsize(file_path),
+                                   metadata=metadata)
+
+    def get_file(self, namespace, bucket, name, file_path, chunk_size=1024 * 1024):
+        """下载对象到本地文件"""
+        stream = self.get_object(namespace, bucket, name)
+        try:
+            with open(file_path, 'wb') as f:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+
+
+class OCISDKBackend(StorageBackend):
+    """基于 OCI Python SDK 的进程内后端"""
+
+    name = "sdk"
+    supports_multipart = True
+
+    def __init__(self, profile="DEFAULT", config_file=None, pool_size=DEFAULT_POOL_SIZE, config=None,
+                 service_endpoint=None, signer=None):
+        """config 为空时从配置文件读取 profile；service_endpoint 和 signer 用于连接本地假服务等非默认端点"""
+        import oci  # 延迟导入，SDK 加载较慢
+
+        self._oci = oci
+        self.profile = profile
+        if config is None:
+            config = oci.config.from_file(file_location=config_file or oci.config.DEFAULT_LOCATION,
+                                          profile_name=profile)
+        self.region = config.get('region')
+        self._config = config
+        kwargs = {'retry_strategy': oci.retry.NoneRetryStrategy()}  # 重试由 retry.with_retry 统一处理
+        if signer is not None:
+            kwargs['signer'] = signer
+        self._identity_kwargs = dict(kwargs)
+        self._identity = None  # 身份服务客户端，浏览 compartment 时才创建
+        self._identity_lock = threading.Lock()
+        if service_endpoint:
+            kwargs['service_endpoint'] = service_endpoint
+        self.client = oci.object_storage.ObjectStorageClient(config, **kwargs)
+        self._mount_connection_pool(pool_size)
+
+    def _mount_connection_pool(self, pool_size):
+        """扩大 requests 连接池，使多个线程共享长连接"""
+        try:
+            from oci._vendor.requests.adapters import HTTPAdapter
+        except ImportError:
+            from requests.adapters import HTTPAdapter
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        for scheme in ('https://', 'http://'):
+            self.client.base_client.session.mount(scheme, adapter)
+
+    def _call(self, func, *args, **kwargs):
+        """调用 SDK 并把服务端异常转换为 StorageError"""
+        try:
+            return func(*args, **kwargs)
+        except self._oci.exceptions.ServiceError as e:
+            raise StorageError(f"{e.status} {e.code}: {e.message}", status=e.status, headers=e.headers) from e
+        except self._oci.exceptions.RequestException as e:
+            raise StorageError(str(e), transient=True) from e
+
+    def _identity_client(self):
+        with self._identity_lock:
+            if self._identity is None:
+                self._identity = self._oci.identity.IdentityClient(self._config, **self._identity_kwargs)
+            return self._identity
+
+    def get_namespace(self):
+        return self._call(self.client.get_namespace).data
+
+    def tenancy_id(self):
+        return self._config.get('tenancy')
+
+    def list_compartments(self, compartment_id):
+        identity = self._identity_client()
+        compartments, page = [], None
+        while True:
+            kwargs = {'page': page} if page else {}
+            response = self._call(identity.list_compartments, compartment_id, lifecycle_state='ACTIVE', **kwargs)
+            compartments.extend({'id': c.id, 'name': c.name} for c in response.data)
+            page = response.headers.get('opc-next-page')
+            if not page:
+                return compartments
+
+    def list_buckets(self, namespace, compartment_id):
+        buckets, page = [], None
+        while True:
+            kwargs = {'page': page} if page else {}
+            response = self._call(self.client.list_buckets, namespace, compartment_id, **kwargs)
+            buckets.extend(_bucket_info(b.name, b.namespace, b.compartment_id, b.time_created) for b in response.data)
+            page = response.headers.get('opc-next-page')
+            if not page:
+                return buckets
+
+    def get_bucket(self, namespace, bucket):
+        data = self._call(self.client.get_bucket, namespace, bucket).data
+        return {'name': data.name, 'namespace': data.namespace, 'compartment-id': data.compartment_id}
+
+    def list_objects(self, namespace, bucket, prefix=None, start=None, limit=None, delimiter=None):
+        kwargs = {'fields': LIST_FIELDS}
+        if prefix:
+            kwargs['prefix'] = prefix
+        if start:
+            kwargs['start'] = start
+        if limit:
+            kwargs['limit'] = limit
+        if delimiter:
+            kwargs['delimiter'] = delimiter
+        data = self._call(self.client.list_objects, namespace, bucket, **kwargs).data
+        objects = [_object_info(o.name, o.size, o.time_modified, o.md5, o.etag) for o in data.objects]
+        return {'objects': objects, 'prefixes': list(data.prefixes or []), 'next_start_with': data.next_start_with}
+
+    def head_object(self, namespace, bucket, name):
+        headers = self._call(self.client.head_object, namespace, bucket, name).headers
+        return _head_info(name, headers)
+
+    def put_object(self, namespace, bucket, name, body, content_length=None, metadata=None, content_encoding=None):
+        kwargs = {}
+        if content_length is not None:
+            kwargs['content_length'] = content_length
+        if metadata:
+            kwargs['opc_meta'] = metadata
+        if content_encoding:
+            kwargs['content_encoding'] = content_encoding
+        headers = self._call(self.client.put_object, namespace, bucket, name, body, **kwargs).headers
+        return {'etag': headers.get('etag'), 'md5': headers.get('opc-content-md5')}
+
+    def get_object(self, namespace, bucket, name, byte_range=None, if_match=None):
+        kwargs = {}
+        if byte_range:
+            kwargs['range'] = _range_header(byte_range)
+        if if_match:
+            kwargs['if_match'] = if_match
+        response = self._call(self.client.get_object, namespace, bucket, name, **kwargs)
+        return response.data.raw
+
+    def create_multipart_upload(self, namespace, bucket, name, metadata=None, content_encoding=None):
+        details = self._oci.object_storage.models.CreateMultipartUploadDetails(object=name, metadata=metadata,
+                                                                               content_encoding=content_encoding)
+        return self._call(self.client.create_multipart_upload, namespace, bucket, details).data.upload_id
+
+    def upload_part(self, namespace, bucket, name, upload_id, part_num, body, content_length):
+        response = self._call(self.client.upload_part, namespace, bucket, name, upload_id, part_num, body,
+                              content_length=content_length)
+        return response.headers.get('etag')
+
+    def list_multipart_upload_parts(self, namespace, bucket, name, upload_id):
+        parts, page = {}, None
+        while True:
+            kwargs = {'page': page} if page else {}
+            response = self._call(self.client.list_multipart_upload_parts, namespace, bucket, name, upload_id,
+                                  **kwargs)
+            for part in response.data:
+                parts[part.part_number] = {'etag': part.etag, 'md5': part.md5, 'size': part.size}
+            page = response.headers.get('opc-next-page')
+            if not page:
+                return parts
+
+    def commit_multipart_upload(self, namespace, bucket, name, upload_id, parts):
+        models = self._oci.object_storage.models
+        details = models.CommitMultipartUploadDetails(parts_to_commit=[
+            models.CommitMultipartUploadPartDetails(part_num=num, etag=etag) for num, etag in parts])
+        headers = self._call(self.client.commit_multipart_upload, namespace, bucket, name, upload_id, details).headers
+        return {'etag': headers.get('etag'), 'md5': headers.get('opc-multipart-md5')}
+
+    def abort_multipart_upload(self, namespace, bucket, name, upload_id):
+        self._call(self.client.abort_multipart_upload, namespace, bucket, name, upload_id)
+
+    def delete_object(self, namespace, bucket, name):
+        self._call(self.client.delete_object, namespace, bucket, name)
+
+    def copy_object(self, namespace, bucket, source_name, destination_name):
+        details = self._oci.object_storage.models.CopyObjectDetails(
+            source_object_name=source_name,
+            destination_region=self.region,
+            destination_namespace=namespace,
+            destination_bucket=bucket,
+            destination_object_name=destination_name)
+        response = self._call(self.client.copy_object, namespace, bucket, details)
+        work_request_id = response.headers.get('opc-work-request-id')
+        # 复制是异步工作请求，轮询直到结束
+        while work_request_id:
+            status = self._call(self.client.get_work_request, work_request_id).data.status
+            if status == 'COMPLETED':
+                break
+            if status in ('FAILED', 'CANCELED'):
+                raise StorageError(f"复制对象 {source_name} 失败: {status}")
+            time.sleep(COPY_POLL_INTERVAL)
+
+    def rename_object(self, namespace, bucket, source_name, new_name):
+        details = self._oci.object_storage.models.RenameObjectDetails(source_name=source_name, new_name=new_name)
+        self._call(self.client.rename_object, namespace, bucket, details)
+
+
+class _ProcessStream:
+    """oci 命令的标准输出流
+
+    读到结尾时等待进程退出，退出码非 0 时按 stderr 抛出 StorageError（带 HTTP 状态码，限流等可重试）；
+    close 时回收进程，提前关闭时结束仍在运行的进程，不留下僵尸进程。
+    """
+
+    def __init__(self, process, stderr, timeout):
+        self._process = process
+        self._stderr = stderr
+        self._timeout = timeout
+        self._finished = False
+
+    def check_started(self):
+        """等待第一块数据；进程未输出任何数据就退出时在这里抛出错误，调用方的重试可以据此判断"""
+        if not self._process.stdout.peek(1):
+            self._finish()
+
+    def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        try:
+            returncode = self._process.wait(self._timeout)
+        except subprocess.TimeoutExpired:
+            self._kill()
+            raise StorageError("命令执行超时", transient=True)
+        self._stderr.seek(0)
+        stderr = self._stderr.read()
+        self._stderr.close()
+        if returncode != 0:
+            raise StorageError(stderr.decode('utf-8', 'replace').strip() or f"oci 命令退出码 {returncode}",
+                               status=OCICLIBackend._parse_status(stderr))
+
+    def _kill(self):
+        self._process.kill()
+        self._process.wait()
+        self._stderr.close()
+
+    def read(self, size=-1):
+        data = self._process.stdout.read(size)
+        if not data and size != 0:
+            self._finish()
+        return data
+
+    def readinto(self, buffer):
+        n = self._process.stdout.readinto(buffer)
+        if not n and len(buffer):
+            self._finish()
+        return n
+
+    def close(self):
+        self._process.stdout.close()
+        if not self._finished:
+            self._finished = True
+            if self._process.poll() is None:
+                self._kill()  # 调用方提前停止读取
+            else:
+                self._stderr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class OCICLIBackend(StorageBackend):
+    """基于 oci 命令行的后端，每次调用启动一个子进程"""
+
+    name = "cli"
+
+    def __init__(self, profile="DEFAULT", timeout=300):
+        self.profile = profile
+        self.timeout = timeout
+
+    def _base_args(self, *args):
+        command = ['oci', *args]
+        if self.profile and self.profile != 'DEFAULT':
+            command += ['--profile', self.profile]
+        return command
+
+    def _env(self):
+        env = os.environ.copy()
+        env["SUPPRESS_LABEL_WARNING"] = "True"
+        return env
+
+    def _run(self, *args, input_data=None):
+        """执行 oci 命令并解析 JSON 输出"""
+        try:
+            result = subprocess.run(self._base_args(*args), capture_output=True, input=input_data,
+                                    timeout=self.timeout, env=self._env())
+        except subprocess.TimeoutExpired:
+            raise StorageError("命令执行超时", transient=True)
+        except OSError as e:
+            raise StorageError(str(e))
+        if result.returncode != 0:
+            raise StorageError(result.stderr.decode('utf-8', 'replace').strip(), status=self._parse_status(result.stderr))
+        output = result.stdout.decode('utf-8', 'replace').strip()
+        return json.loads(output) if output.startswith('{') else {}
+
+    @staticmethod
+    def _parse_status(stderr):
+        """从 ServiceError 输出中提取 HTTP 状态码"""
+        try:
+            text = stderr.decode('utf-8', 'replace')
+            start = text.index('{')
+            return json.loads(text[start:text.rindex('}') + 1]).get('status')
+        except (ValueError, AttributeError):
+            return None
+
+    def get_namespace(self):
+        return self._run('os', 'ns', 'get').get('data')
+
+    def tenancy_id(self):
+        config = configparser.ConfigParser()
+        config.read(os.path.expanduser(os.environ.get('OCI_CLI_CONFIG_FILE', '~/.oci/config')))
+        section = config[self.profile] if config.has_section(self.profile) else config.defaults()
+        return section.get('tenancy')
+
+    def list_compartments(self, compartment_id):
+        data = self._run('iam', 'compartment', 'list', '--compartment-id', compartment_id, '--lifecycle-state',
+                         'ACTIVE', '--all').get('data', [])
+        return [{'id': c.get('id'), 'name': c.get('name')} for c in data]
+
+    def list_buckets(self, namespace, compartment_id):
+        data = self._run('os', 'bucket', 'list', '--namespace', namespace, '--compartment-id', compartment_id,
+                         '--all').get('data', [])
+        return [_bucket_info(b.get('name'), b.get('namespace'), b.get('compartment-id'), b.get('time-created'))
+                for b in data]
+
+    def get_bucket(self, namespace, bucket):
+        data = self._run('os', 'bucket', 'get', '--namespace', namespace, '--bucket-name', bucket).get('data', {})
+        return {'name': data.get('name'), 'namespace': data.get('namespace'),
+                'compartment-id': data.get('compartment-id')}
+
+    def list_objects(self, namespace, bucket, prefix=None, start=None, limit=None, delimiter=None):
+        args = ['os', 'object', 'list', '--namespace', namespace, '--bucket-name', bucket,
+                '--fields', LIST_FIELDS, '--output', 'json']
+        if prefix:
+            args += ['--prefix', prefix]
+        if start:
+            args += ['--start', start]
+        if limit:
+            args += ['--limit', str(limit)]
+        if delimiter:
+            args += ['--delimiter', delimiter]
+        data = self._run(*args)
+        objects = [_object_info(o.get('name', ''), o.get('size'), o.get('time-modified'), o.get('md5'), o.get('etag'))
+                   for o in data.get('data', [])]
+        return {'objects': objects, 'prefixes': data.get('prefixes', []), 'next_start_with': data.get('next-start-with')}
+
+    def head_object(self, namespace, bucket, name):
+        headers = self._run('os', 'object', 'head', '--namespace', namespace, '--bucket-name', bucket, '--name', name)
+        return _head_info(name, headers)
+
+    def put_object(self, namespace, bucket, name, body, content_length=None, metadata=None, content_encoding=None):
+        data = body if isinstance(body, bytes) else body.read()
+        args = ['os', 'object', 'put', '--namespace', namespace, '--bucket-name', bucket, '--name', name,
+                '--file', '-', '--force']
+        if metadata:
+            args += ['--metadata', json.dumps(metadata)]
+        if content_encoding:
+            args += ['--content-encoding', content_encoding]
+        result = self._run(*args, input_data=data)
+        return {'etag': result.get('etag'), 'md5': result.get('opc-content-md5')}
+
+    def put_file(self, namespace, bucket, name, file_path, metadata=None):
+        args = ['os', 'object', 'put', '--namespace', namespace, '--bucket-name', bucket, '--name', name,
+                '--file', file_path, '--force']
+        if metadata:
+            args += ['--metadata', json.dumps(metadata)]
+        result = self._run(*args)
+        return {'etag': result.get('etag'), 'md5': result.get('opc-content-md5')}
+
+    def get_object(self, namespace, bucket, name, byte_range=None, if_match=None):
+        args = ['os', 'object', 'get', '--namespace', namespace, '--bucket-name', bucket, '--name', name,
+                '--file', '-']
+        if byte_range:
+            args += ['--range', _range_header(byte_range)]
+        if if_match:
+            args += ['--if-match', if_match]
+        stderr = tempfile.TemporaryFile()  # 写入临时文件而不是管道，读取标准输出时不会因 stderr 写满而阻塞
+        try:
+            process = subprocess.Popen(self._base_args(*args), stdout=subprocess.PIPE, stderr=stderr,
+                                       env=self._env())
+        except OSError as e:
+            stderr.close()
+            raise StorageError(str(e))
+        stream = _ProcessStream(process, stderr, self.timeout)
+        try:
+            stream.check_started()
+        except BaseException:
+            stream.close()
+            raise
+        return stream
+
+    def get_file(self, namespace, bucket, name, file_path, chunk_size=None):
+        self._run('os', 'object', 'get', '--namespace', namespace, '--bucket-name', bucket, '--name', name,
+                  '--file', file_path)
+
+    def delete_object(self, namespace, bucket, name):
+        self._run('os', 'object', 'delete', '--namespace', namespace, '--bucket-name', bucket, '--name', name,
+                  '--force')
+
+    def copy_object(self, namespace, bucket, source_name, destination_name):
+        self._run('os', 'object', 'copy', '--namespace', namespace, '--bucket-name', bucket,
+                  '--source-object-name', source_name, '--destination-bucket', bucket,
+                  '--destination-object-name', destination_name, '--wait-for-state', 'COMPLETED')
+
+    def rename_object(self, namespace, bucket, source_name, new_name):
+        self._run('os', 'object', 'rename', '--namespace', namespace, '--bucket-name', bucket,
+                  '--source-name', source_name, '--new-name', new_name)
+
+
+class FakeBackend(StorageBackend):
+    """内存中的假后端，结构与真实服务一致，用于测试和基准"""
+
+    name = "fake"
+
+    supports_multipart = True
+
+    def __init__(self, buckets=("test",), namespace=FAKE_NAMESPACE):
+        self._lock = threading.Lock()
+        self.namespace = namespace
+        self._buckets = {name: {} for name in buckets}
+        self._bucket_compartments = {name: FAKE_TENANCY for name in buckets}
+        self._compartments = {}  # compartment_id -> (名称, 上级 compartment_id)
+        self._uploads = {}  # upload_id -> {'bucket', 'name', 'metadata', 'parts': {part_num: (etag, data)}}
+
+    def add_compartment(self, compartment_id, name, parent=FAKE_TENANCY):
+        with self._lock:
+            self._compartments[compartment_id] = (name, parent)
+
+    def add_bucket(self, bucket, compartment_id=FAKE_TENANCY):
+        with self._lock:
+            self._buckets.setdefault(bucket, {})
+            self._bucket_compartments[bucket] = compartment_id
+
+    def _bucket(self, bucket):
+        try:
+            return self._buckets[bucket]
+        except KeyError:
+            raise StorageError(f"BucketNotFound: {bucket}", status=404)
+
+    def _info(self, name, entry):
+        return _object_info(name, len(entry['data']), entry['time-modified'], entry['md5'], entry['etag'])
+
+    def get_namespace(self):
+        return self.namespace
+
+    def tenancy_id(self):
+        return FAKE_TENANCY
+
+    def list_compartments(self, compartment_id):
+        with self._lock:
+            return [{'id': child, 'name': name} for child, (name, parent) in sorted(self._compartments.items())
+                    if parent == compartment_id]
+
+    def list_buckets(self, namespace, compartment_id):
+        with self._lock:
+            return [_bucket_info(name, namespace, compartment) for name, compartment
+                    in sorted(self._bucket_compartments.items()) if compartment == compartment_id]
+
+    def get_bucket(self, namespace, bucket):
+        with self._lock:
+            self._bucket(bucket)
+            compartment_id = self._bucket_compartments.get(bucket)
+        return {'name': bucket, 'namespace': namespace, 'compartment-id': compartment_id}
+
+    def list_objects(self, namespace, bucket, prefix=None, start=None, limit=None, delimiter=None):
+        limit = limit or 1000
+        prefix = prefix or ''
+        with self._lock:
+            entries = self._bucket(bucket)
+            names = sorted(n for n in entries if n.startswith(prefix) and (not start or n >= start))
+            objects, prefixes = [], []
+            index = 0
+            while index < len(names) and len(objects) + len(prefixes) < limit:
+                name = names[index]
+                rest = name[len(prefix):]
+                if delimiter and delimiter in rest:
+                    # 合并为公共前缀，并跳过该前缀下的所有对象
+                    common = prefix + rest[:rest.index(delimiter) + len(delimiter)]
+                    prefixes.append(common)
+                    while index < len(names) and names[index].startswith(common):
+                        index += 1
+                    continue
+                objects.append(self._info(name, entries[name]))
+                index += 1
+        next_start = names[index] if index < len(names) else None
+        return {'objects': objects, 'prefixes': prefixes, 'next_start_with': next_start}
+
+    def head_object(self, namespace, bucket, name):
+        with self._lock:
+            entry = self._bucket(bucket).get(name)
+            if entry is None:
+                raise StorageError(f"ObjectNotFound: {name}", status=404)
+            info = self._info(name, entry)
+            info['multipart-md5'] = entry.get('multipart-md5')
+            info['content-encoding'] = entry.get('content-encoding')
+            info['metadata'] = dict(entry['metadata'])
+        return info
+
+    def put_object(self, namespace, bucket, name, body, content_length=None, metadata=None, content_encoding=None):
+        data = body if isinstance(body, bytes) else body.read()
+        md5 = base64.b64encode(hashlib.md5(data).digest()).decode()
+        etag = hashlib.sha1(data + name.encode()).hexdigest()
+        entry = {'data': data, 'md5': md5, 'etag': etag, 'metadata': dict(metadata or {}),
+                 'content-encoding': content_encoding, 'time-modified': datetime.now(timezone.utc)}
+        with self._lock:
+            self._bucket(bucket)[name] = entry
+        return {'etag': etag, 'md5': md5}
+
+    def get_object(self, namespace, bucket, name, byte_range=None, if_match=None):
+        with self._lock:
+            entry = self._bucket(bucket).get(name)
+            if entry is None:
+                raise StorageError(f"ObjectNotFound: {name}", status=404)
+            if if_match and if_match != entry['etag']:
+                raise StorageError(f"PreconditionFailed: {name}", status=412)
+            data = entry['data']
+        if byte_range:
+            data = data[byte_range[0]:byte_range[1] + 1]
+        return io.BytesIO(data)
+
+    def create_multipart_upload(self, namespace, bucket, name, metadata=None, content_encoding=None):
+        with self._lock:
+            self._bucket(bucket)
+            upload_id = hashlib.sha1(f"{bucket}/{name}/{len(self._uploads)}/{time.time()}".encode()).hexdigest()
+            self._uploads[upload_id] = {'bucket': bucket, 'name': name, 'metadata': dict(metadata or {}),
+                                        'content-encoding': content_encoding, 'parts': {}}
+        return upload_id
+
+    def _upload(self, upload_id):
+        upload = self._uploads.get(upload_id)
+        if upload is None:
+            raise StorageError(f"NoSuchUpload: {upload_id}", status=404)
+        return upload
+
+    def upload_part(self, namespace, bucket, name, upload_id, part_num, body, content_length):
+        data = body if isinstance(body, bytes) else body.read()
+        etag = hashlib.md5(data).hexdigest()
+        with self._lock:
+            self._upload(upload_id)['parts'][part_num] = (etag, data)
+        return etag
+
+    def list_multipart_upload_parts(self, namespace, bucket, name, upload_id):
+        with self._lock:
+            return {num: {'etag': etag, 'md5': base64.b64encode(bytes.fromhex(etag)).decode(), 'size': len(data)}
+                    for num, (etag, data) in self._upload(upload_id)['parts'].items()}
+
+    def commit_multipart_upload(self, namespace, bucket, name, upload_id, parts):
+        with self._lock:
+            upload = self._upload(upload_id)
+            chunks, digests = [], b''
+            for num, etag in parts:
+                stored = upload['parts'].get(num)
+                if stored is None or stored[0] != etag:
+                    raise StorageError(f"InvalidPart: {num}", status=400)
+                chunks.append(stored[1])
+                digests += bytes.fromhex(stored[0])
+            data = b''.join(chunks)
+            multipart_md5 = f"{base64.b64encode(hashlib.md5(digests).digest()).decode()}-{len(parts)}"
+            etag = hashlib.sha1(data + name.encode()).hexdigest()
+            self._bucket(bucket)[name] = {'data': data, 'md5': None, 'multipart-md5': multipart_md5, 'etag': etag,
+                                          'metadata': upload['metadata'],
+                                          'content-encoding': upload['content-encoding'],
+                                          'time-modified': datetime.now(timezone.utc)}
+            del self._uploads[upload_id]
+        return {'etag': etag, 'md5': multipart_md5}
+
+    def abort_multipart_upload(self, namespace, bucket, name, upload_id):
+        with self._lock:
+            self._upload(upload_id)
+            del self._uploads[upload_id]
+
+    def delete_object(self, namespace, bucket, name):
+        with self._lock:
+            if self._bucket(bucket).pop(name, None) is None:
+                raise StorageError(f"ObjectNotFound: {name}", status=404)
+
+    def copy_object(self, namespace, bucket, source_name, destination_name):
+        with self._lock:
+            objects = self._bucket(bucket)
+            if source_name not in objects:
+                raise StorageError(f"ObjectNotFound: {source_name}", status=404)
+            objects[destination_name] = dict(objects[source_name], **{'time-modified': datetime.now(timezone.utc)})
+
+    def rename_object(self, namespace, bucket, source_name, new_name):
+        with self._lock:
+            objects = self._bucket(bucket)
+            if source_name not in objects:
+                raise StorageError(f"ObjectNotFound: {source_name}", status=404)
+            objects[new_name] = objects.pop(source_name)
+
+
+BACKEND_TYPES = {
+    OCISDKBackend.name: OCISDKBackend,
+    OCICLIBackend.name: OCICLIBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def default_backend_kind():
+    """默认后端：环境变量 OSSGUI_BACKEND 优先，其次 SDK，未安装 SDK 时退回 CLI"""
+    kind = os.environ.get("OSSGUI_BACKEND")
+    if kind in BACKEND_TYPES:
+        return kind
+    try:
+        import importlib.util
+        return "sdk" if importlib.util.find_spec("oci") else "cli"
+    except (ImportError, ValueError):
+        return "cli"
+
+
+def get_backend(profile="DEFAULT", kind=None):
+    """获取 profile 对应的后端实例，同一 profile 复用同一个长连接客户端
+
+    返回的后端包装在 InstrumentedBackend 中，每次调用都计入统计。
+    """
+    kind = kind or default_backend_kind()
+    key = (kind, profile or "DEFAULT")
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend_type = BACKEND_TYPES[kind]
+            try:
+                backend = backend_type() if backend_type is FakeBackend else backend_type(profile=key[1])
+            except StorageError:
+                raise
+            except Exception as e:
+                raise StorageError(f"初始化 {kind} 后端失败: {e}") from e
+            backend = _backends[key] = InstrumentedBackend(backend)
+        return backend
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试
+启动本地假对象存储服务（fakeserver.py），通过与 GUI 相同的后端、调度器和传输代码测量：
+1.列举：每秒列举页数和对象数（递归分页、按 delimiter 列举目录）
+2.小文件上传：每秒文件数
+3.大文件传输：分段上传和 Range 下载的 MB/s
+4.文件列表渲染：大目录插入 Treeview 的耗时（需要图形界面，无显示时跳过）
+同时记录各类调用的延迟百分位。
+结果保存到 数据目录/bench/，并与上一次结果比较。
+
+    python bench.py
+    python bench.py --latency 0.02 --throttle 0.05 --quick
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import retry
+from appdata import data_dir
+from backends import FakeBackend, StorageError
+from bufferpool import default_pool
+from fakeserver import FakeObjectStorageServer
+from listing import iter_list_pages
+from metrics import InstrumentedBackend, Metrics
+from scheduler import TransferScheduler
+from transfer import DEFAULT_WORKERS, download_file, upload_file, upload_folder
+
+BENCH_BUCKET = "bench"
+DEFAULT_LIST_OBJECTS = 20000
+DEFAULT_LIST_FOLDERS = 200
+DEFAULT_SMALL_FILES = 500
+DEFAULT_SMALL_SIZE = 4 * 1024
+DEFAULT_LARGE_SIZE = 256 * 1024 * 1024
+DEFAULT_TREE_ROWS = (2000, 100000)  # 分别对应分批插入和虚拟列表
+QUICK_SCALE = 10  # --quick 时各项规模缩小的倍数
+
+
+def run_job(scheduler, title, func):
+    """在调度器中执行 func(job) 并等待结束，返回 func 的结果"""
+    result = {}
+    job = scheduler.submit(title, lambda job: result.setdefault('value', func(job)))
+    while job.finished is None:
+        time.sleep(0.01)
+    if job.failed:
+        raise StorageError(job.message)
+    return result.get('value')
+
+
+def bench_listing(backend, store, namespace, objects, folders):
+    """向服务端直接写入 objects 个空对象（分布在 folders 个目录中），测量列举速度"""
+    for index in range(objects):
+        store.put_object(namespace, BENCH_BUCKET, f"list/d{index % folders:05d}/f{index:08d}", b'')
+
+    started = time.perf_counter()
+    pages = listed = 0
+    for page in iter_list_pages(backend, namespace, BENCH_BUCKET, "list/", delimiter=None):
+        pages += 1
+        listed += len(page['objects'])
+    recursive = time.perf_counter() - started
+
+    # 逐个打开目录，与在 GUI 中浏览时的请求一致
+    started = time.perf_counter()
+    directories = 0
+    for page in iter_list_pages(backend, namespace, BENCH_BUCKET, "list/"):
+        for prefix in page['prefixes']:
+            for _ in iter_list_pages(backend, namespace, BENCH_BUCKET, prefix):
+                pass
+            directories += 1
+    browse = time.perf_counter() - started
+
+    return {'objects': listed, 'pages': pages, 'pages_per_second': pages / recursive,
+            'objects_per_second': listed / recursive, 'directories': directories,
+            'directory_listings_per_second': directories / browse}
+
+
+def bench_small_uploads(backend, scheduler, namespace, work_dir, files, size):
+    """上传 files 个 size 字节的文件夹，测量每秒文件数"""
+    source = os.path.join(work_dir, "small")
+    os.makedirs(source)
+    for index in range(files):
+        with open(os.path.join(source, f"f{index:06d}.bin"), 'wb') as f:
+            f.write(os.urandom(size))
+
+    summary = run_job(scheduler, "bench small", lambda job: upload_folder(
+        backend, namespace, BENCH_BUCKET, source, "small/", scheduler.limit, job.tracker, job.cancel_event,
+        gate=job.slot))
+    return {'files': summary.succeeded, 'failed': len(summary.failed), 'seconds': summary.elapsed,
+            'files_per_second': summary.items_per_second, 'concurrency': scheduler.current_limit}
+
+
+def bench_large_transfer(backend, scheduler, namespace, work_dir, size):
+    """上传并下载一个 size 字节的文件，测量 MB/s（超过阈值时走分段上传）"""
+    source = os.path.join(work_dir, "large.bin")
+    with open(source, 'wb') as f:
+        remaining = size
+        while remaining:
+            chunk = min(remaining, 8 * 1024 * 1024)
+            f.write(os.urandom(chunk))
+            remaining -= chunk
+
+    def upload(job):
+        with job.slot():
+            upload_file(backend, namespace, BENCH_BUCKET, "large.bin", source, job.tracker.add_bytes,
+                        job.cancel_event)
+
+    def download(job):
+        with job.slot():
+            download_file(backend, namespace, BENCH_BUCKET, "large.bin", os.path.join(work_dir, "large.out"),
+                          job.tracker.add_bytes, job.cancel_event)
+
+    started = time.perf_counter()
+    run_job(scheduler, "bench upload", upload)
+    uploaded = time.perf_counter() - started
+    started = time.perf_counter()
+    run_job(scheduler, "bench download", download)
+    downloaded = time.perf_counter() - started
+    megabytes = size / (1024 * 1024)
+    return {'megabytes': megabytes, 'upload_mb_per_second': megabytes / uploaded,
+            'download_mb_per_second': megabytes / downloaded}
+
+
+def bench_treeview(row_counts):
+    """把 row_counts 行写入 GUI 的文件列表，测量首屏和全部插入完成的耗时"""
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:  # 未安装 Tk 或没有显示（TclError）
+        return {'skipped': str(e)}
+
+    from main import FileListView
+    results = {}
+    try:
+        root.geometry("1000x600")
+        tree = ttk.Treeview(root, columns=('name', 'size', 'modified', 'type'), show='headings', height=25)
+        scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        root.update()
+        view = FileListView(root, tree, scrollbar)
+        for count in row_counts:
+            rows = [(f"file-{index:08d}.bin", "4.0 KB", "2024-01-01 00:00:00", "文件") for index in range(count)]
+            view.clear()
+            root.update()
+            started = time.perf_counter()
+            view.add([], rows)
+            root.update()
+            first_paint = time.perf_counter() - started
+            while view._pending or view._drain_job:
+                root.update()
+            results[f'rows_{count}'] = {'first_paint_ms': first_paint * 1000,
+                                        'complete_ms': (time.perf_counter() - started) * 1000,
+                                        'virtual': view.virtual}
+    finally:
+        root.destroy()
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _flatten(results, prefix=""):
+    """{'a': {'b': 1}} -> {'a.b': 1}，只保留数值"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(previous, current):
+    """打印与上一次结果的对比"""
+    old, new = _flatten(previous['results']), _flatten(current['results'])
+    print(f"\n与 {previous['timestamp']}（{previous.get('revision') or '-'}）比较：")
+    width = max((len(key) for key in new), default=10)
+    for key, value in new.items():
+        if key in old and old[key]:
+            change = (value - old[key]) / old[key] * 100
+            print(f"  {key:<{width}}  {old[key]:>14.2f} -> {value:>14.2f}  {change:+7.1f}%")
+        else:
+            print(f"  {key:<{width}}  {'-':>14} -> {value:>14.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对象存储基准测试（本地假服务）")
+    parser.add_argument('--backend', choices=('sdk', 'fake'), default='sdk',
+                        help="sdk: 通过 HTTP 连接假服务（默认）；fake: 进程内内存后端，不注入延迟和限流")
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="随机附加延迟的上限（秒）")
+    parser.add_argument('--throttle', type=float, default=0.0, help="随机返回 429 的比例")
+    parser.add_argument('--max-rps', type=int, default=0, help="超过该请求速率时返回 429")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--fixed-concurrency', action='store_true', help="关闭自适应并发")
+    parser.add_argument('--quick', action='store_true', help=f"各项规模缩小 {QUICK_SCALE} 倍")
+    parser.add_argument('--only', action='append', choices=('listing', 'small', 'large', 'treeview'),
+                        help="只运行指定项目，可多次指定")
+    parser.add_argument('--compare', help="与指定的结果文件比较，默认与上一次结果比较")
+    parser.add_argument('--output', help="结果文件路径，默认保存到数据目录")
+    args = parser.parse_args(argv)
+
+    scale = QUICK_SCALE if args.quick else 1
+    selected = set(args.only or ('listing', 'small', 'large', 'treeview'))
+    server = FakeObjectStorageServer(buckets=(BENCH_BUCKET,), latency=args.latency, jitter=args.jitter,
+                                     throttle=args.throttle, max_rps=args.max_rps)
+    if args.backend == 'sdk':
+        try:
+            backend = server.sdk_backend()
+        except ImportError:
+            parser.error("未安装 OCI Python SDK，可使用 --backend fake")
+        server.start()
+        store = server.store
+    else:
+        backend = store = FakeBackend((BENCH_BUCKET,))
+    metrics = Metrics()
+    backend = InstrumentedBackend(backend, metrics)
+    namespace = server.namespace
+    scheduler = TransferScheduler(args.workers, adaptive=not args.fixed_concurrency)
+    retries_before = retry.stats.snapshot()
+
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix="ossgui-bench-")
+    try:
+        if 'listing' in selected:
+            results['listing'] = bench_listing(backend, store, namespace, DEFAULT_LIST_OBJECTS // scale,
+                                               max(1, DEFAULT_LIST_FOLDERS // scale))
+            print(f"listing: {results['listing']}", flush=True)
+        if 'small' in selected:
+            results['small_uploads'] = bench_small_uploads(backend, scheduler, namespace, work_dir,
+                                                           DEFAULT_SMALL_FILES // scale, DEFAULT_SMALL_SIZE)
+            print(f"small_uploads: {results['small_uploads']}", flush=True)
+        if 'large' in selected:
+            results['large_transfer'] = bench_large_transfer(backend, scheduler, namespace, work_dir,
+                                                             DEFAULT_LARGE_SIZE // scale)
+            print(f"large_transfer: {results['large_transfer']}", flush=True)
+        if 'treeview' in selected:
+            results['treeview'] = bench_treeview([count // scale for count in DEFAULT_TREE_ROWS])
+            print(f"treeview: {results['treeview']}", flush=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if args.backend == 'sdk':
+            server.stop()
+
+    retries, throttled, exhausted = (after - before for after, before in zip(retry.stats.snapshot(),
+                                                                             retries_before))
+    results['retries'] = {'retries': retries, 'throttled': throttled, 'exhausted': exhausted,
+                          'server_requests': server.requests, 'server_throttled': server.throttled}
+    results['latency_ms'] = {operation: {'calls': stats['calls'], 'p50': stats['p50'] * 1000,
+                                         'p95': stats['p95'] * 1000, 'p99': stats['p99'] * 1000}
+                             for operation, stats in metrics.snapshot().items() if stats['p50'] is not None}
+    pool = default_pool().snapshot()
+    results['buffer_pool'] = {'peak_mb': pool['peak'] / (1024 * 1024),
+                              'allocated_mb': pool['allocated'] / (1024 * 1024), 'waits': pool['waits']}
+    record = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'revision': _git_revision(),
+              'python': platform.python_version(), 'options': vars(args), 'results': results}
+
+    history = sorted(glob.glob(os.path.join(data_dir("bench"), "bench-*.json")))
+    output = args.output or os.path.join(data_dir("bench"), f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {output}")
+
+    baseline = args.compare or (history[-1] if history else None)
+    if baseline and os.path.abspath(baseline) != os.path.abspath(output):
+        with open(baseline, encoding='utf-8') as f:
+            compare(json.load(f), record)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Bucket 浏览
+1.按 profile 自动获取并缓存 namespace
+2.从根 compartment 开始并发遍历 compartment 树，列出其中全部 bucket
+3.结果按 (profile, 根 compartment) 缓存在本地，有效期内切换 bucket 不需要任何网络请求
+4.在缓存的列表中按名称和 compartment 路径本地搜索
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from appdata import data_dir
+from backends import FakeBackend, StorageError, default_backend_kind
+from retry import TransferCancelled, with_retry
+
+DEFAULT_DISCOVERY_WORKERS = 8  # 遍历 compartment 树的并发数
+BUCKET_CACHE_TTL = 3600  # bucket 列表缓存有效期（秒），过期后仍先显示缓存再后台刷新
+CACHE_FILE = "buckets.json"
+
+
+class BucketCatalog:
+    """namespace 和 bucket 列表的本地缓存，线程安全
+
+    文件内容为 {'namespaces': {profile: namespace},
+               'buckets': {profile: {根 compartment: {'buckets': [...], 'time': ..., 'errors': [...]}}}}，
+    根 compartment 为空字符串表示整个租户。
+    """
+
+    def __init__(self, path=None, ttl=BUCKET_CACHE_TTL):
+        self.path = path or os.path.join(data_dir(), CACHE_FILE)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        data.setdefault('namespaces', {})
+        data.setdefault('buckets', {})
+        return data
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def namespace(self, profile):
+        with self._lock:
+            return self._data['namespaces'].get(profile)
+
+    def set_namespace(self, profile, namespace):
+        with self._lock:
+            if self._data['namespaces'].get(profile) != namespace:
+                self._data['namespaces'][profile] = namespace
+                self._save()
+
+    def buckets(self, profile, root=""):
+        """缓存的 {'buckets', 'time', 'errors'}，没有时返回 None"""
+        with self._lock:
+            entry = self._data['buckets'].get(profile, {}).get(root or "")
+            return dict(entry) if entry else None
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry.get('time', 0) < self.ttl
+
+    def set_buckets(self, profile, root, buckets, errors=()):
+        with self._lock:
+            self._data['buckets'].setdefault(profile, {})[root or ""] = {
+                'buckets': list(buckets), 'time': time.time(), 'errors': list(errors)}
+            self._save()
+
+
+def catalog_key(profile, kind=None):
+    """profile 在缓存中的键：SDK 和 CLI 后端访问同一个租户，共用一份缓存；本地假后端单独保存"""
+    kind = kind or default_backend_kind()
+    return f"{kind}:{profile}" if kind == FakeBackend.name else profile
+
+
+_default_catalog = None
+_default_lock = threading.Lock()
+
+
+def default_catalog():
+    """进程内共享的 bucket 缓存"""
+    global _default_catalog
+    with _default_lock:
+        if _default_catalog is None:
+            _default_catalog = BucketCatalog()
+        return _default_catalog
+
+
+def discover_namespace(backend, profile, catalog=None, refresh=False):
+    """profile（catalog_key 的结果）对应的 namespace，优先使用缓存，refresh 为 True 时重新获取"""
+    catalog = catalog or default_catalog()
+    namespace = None if refresh else catalog.namespace(profile)
+    if not namespace:
+        namespace = with_retry(backend.get_namespace)
+        catalog.set_namespace(profile, namespace)
+    return namespace
+
+
+def discover_buckets(backend, namespace, root, workers=DEFAULT_DISCOVERY_WORKERS, cancel_event=None,
+                     on_progress=None):
+    """并发遍历 root 及其全部子 compartment，返回 (buckets, errors)
+
+    每个 compartment 的子 compartment 和 bucket 同时列举，发现子 compartment 后立即提交，树的深度不增加串行等待。
+    buckets 中每项额外带 'compartment'（相对 root 的 compartment 路径，root 本身为空字符串）。
+    某个 compartment 无权限或失败时记入 errors（"路径: 错误信息"），不影响其他 compartment。
+    on_progress(已完成的 compartment 数, 已发现的 bucket 数) 在工作线程中调用。
+    """
+    buckets, errors = [], []
+    pending = {}
+    done_compartments = 0
+
+    def submit(executor, compartment_id, path):
+        pending[executor.submit(with_retry, backend.list_compartments, compartment_id,
+                                cancel_event=cancel_event)] = ('compartments', compartment_id, path)
+        pending[executor.submit(with_retry, backend.list_buckets, namespace, compartment_id,
+                                cancel_event=cancel_event)] = ('buckets', compartment_id, path)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="discover") as executor:
+        submit(executor, root, "")
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                raise TransferCancelled()
+            done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, compartment_id, path = pending.pop(future)
+                try:
+                    result = future.result()
+                except StorageError as e:
+                    errors.append(f"{path or '/'}: {e}")
+                    result = []
+                if kind == 'compartments':
+                    for child in result:
+                        submit(executor, child['id'], f"{path}/{child['name']}" if path else child['name'])
+                else:
+                    buckets.extend(dict(bucket, compartment=path) for bucket in result)
+                    done_compartments += 1
+                    if on_progress is not None:
+                        on_progress(done_compartments, len(buckets))
+    buckets.sort(key=lambda b: (b['name'].lower(), b['compartment']))
+    return buckets, errors
+
+
+def search_buckets(buckets, text):
+    """按空格分隔的关键字过滤（不区分大小写，需全部出现在名称或 compartment 路径中）"""
+    terms = text.lower().split()
+    if not terms:
+        return list(buckets)
+    return [bucket for bucket in buckets
+            if all(term in f"{bucket['name']} {bucket.get('compartment', '')}".lower() for term in terms)]
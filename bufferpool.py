@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+缓冲池
+所有传输在内存中持有的数据共用一个内存预算：读写文件和响应流用池中预先分配、反复使用的 bytearray（readinto 读取，
+不为每块数据新建对象），压缩分段等必须整块保存的数据按大小预留额度。额度不足时工作线程阻塞等待，而不是继续分配，
+峰值内存因此不再随并发数和分段大小相乘增长。
+"""
+
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from retry import TransferCancelled
+
+BUFFER_SIZE = 1024 * 1024  # 池中每块缓冲的大小
+DEFAULT_BUDGET = 256 * 1024 * 1024  # 默认内存预算，可用环境变量 OSSGUI_MEMORY_BUDGET_MB 修改
+WAIT_INTERVAL = 0.2  # 等待额度时检查取消的间隔（秒）
+
+
+def budget_from_env():
+    """环境变量 OSSGUI_MEMORY_BUDGET_MB 指定的内存预算（字节），未设置或无效时使用默认值"""
+    try:
+        return max(1, int(os.environ["OSSGUI_MEMORY_BUDGET_MB"])) * 1024 * 1024
+    except (KeyError, ValueError):
+        return DEFAULT_BUDGET
+
+
+class Reservation:
+    """从内存预算中预留的一块额度，release 可以重复调用"""
+
+    def __init__(self, pool, size):
+        self._pool = pool
+        self.size = size
+
+    def release(self):
+        size, self.size = self.size, 0
+        if size:
+            self._pool._give(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class _PooledBuffer:
+    """池中借出的缓冲，退出时归还"""
+
+    def __init__(self, pool, buffer):
+        self._pool = pool
+        self._buffer = buffer
+
+    def __enter__(self):
+        return memoryview(self._buffer)
+
+    def __exit__(self, *exc_info):
+        self._pool._return(self._buffer)
+
+
+class BufferPool:
+    """有内存预算的缓冲池，线程安全"""
+
+    def __init__(self, budget=None, buffer_size=BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.budget = max(budget or budget_from_env(), buffer_size)
+        self._cond = threading.Condition()
+        self._free = []  # 空闲的缓冲
+        self.allocated = 0  # 已分配的缓冲总大小
+        self.in_use = 0  # 已借出的缓冲和预留额度之和
+        self.peak = 0
+        self.waits = 0  # 因额度不足而等待的次数
+        self.wait_seconds = 0.0
+
+    def set_budget(self, budget):
+        """修改内存预算，多出的空闲缓冲随即释放"""
+        with self._cond:
+            self.budget = max(int(budget), self.buffer_size)
+            while self._free and self.allocated > self.budget:
+                self._free.pop()
+                self.allocated -= self.buffer_size
+            self._cond.notify_all()
+
+    def _take(self, size, cancel_event, while_waiting=None):
+        """等待并占用 size 字节的额度，超过预算的请求按整个预算计算，保证最终能满足
+
+        需要等待时，等待期间处于 while_waiting() 返回的上下文中（例如暂时归还调度器的并发额度），
+        占到额度并放开池的锁之后才退出该上下文。
+        """
+        size = min(size, self.budget)
+        with self._cond:
+            if self.in_use + size <= self.budget:
+                self._add(size)
+                return size
+        taken = False
+        try:
+            with while_waiting() if while_waiting is not None else nullcontext():
+                with self._cond:
+                    self.waits += 1
+                    started = time.monotonic()
+                    try:
+                        while self.in_use + size > self.budget:
+                            if cancel_event is not None and cancel_event.is_set():
+                                raise TransferCancelled()
+                            self._cond.wait(WAIT_INTERVAL)
+                    finally:
+                        self.wait_seconds += time.monotonic() - started
+                    self._add(size)
+                    taken = True
+        except BaseException:
+            if taken:
+                self._give(size)
+            raise
+        return size
+
+    def _add(self, size):
+        """记入占用的额度（调用方持有锁）"""
+        self.in_use += size
+        self.peak = max(self.peak, self.in_use)
+
+    def _give(self, size):
+        with self._cond:
+            self.in_use -= size
+            self._cond.notify_all()
+
+    def buffer(self, cancel_event=None, while_waiting=None):
+        """借出一块 buffer_size 的缓冲，用法: with pool.buffer() as view，view 为 memoryview"""
+        self._take(self.buffer_size, cancel_event, while_waiting)
+        with self._cond:
+            if self._free:
+                buffer = self._free.pop()
+            else:
+                buffer = None
+                self.allocated += self.buffer_size
+        if buffer is None:
+            buffer = bytearray(self.buffer_size)
+        return _PooledBuffer(self, buffer)
+
+    def _return(self, buffer):
+        with self._cond:
+            if self.allocated <= self.budget:
+                self._free.append(buffer)
+            else:
+                self.allocated -= self.buffer_size
+            self.in_use -= self.buffer_size
+            self._cond.notify_all()
+
+    def reserve(self, size, cancel_event=None, while_waiting=None):
+        """为不经过缓冲池、但要整块留在内存中的数据预留额度，返回 Reservation"""
+        return Reservation(self, self._take(size, cancel_event, while_waiting))
+
+    def snapshot(self):
+        """{'budget', 'in_use', 'peak', 'allocated', 'waits', 'wait_seconds'}"""
+        with self._cond:
+            return {'budget': self.budget, 'in_use': self.in_use, 'peak': self.peak, 'allocated': self.allocated,
+                    'waits': self.waits, 'wait_seconds': self.wait_seconds}
+
+
+def readinto(stream, view):
+    """尽量用 readinto 把数据读入 view，不支持时退回 read，返回读取的字节数"""
+    method = getattr(stream, 'readinto', None)
+    if method is not None:
+        return method(view) or 0
+    data = stream.read(len(view))
+    view[:len(data)] = data
+    return len(data)
+
+
+class MemoryReader:
+    """把 memoryview 包装成只读文件对象，上传内存中的分段时不再复制整块数据"""
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view) - self._position
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._position + size)
+        data = bytes(self._view[self._position:end])
+        self._position = end
+        return data
+
+
+_default_pool = BufferPool()
+
+
+def default_pool():
+    """进程内所有传输共用的缓冲池"""
+    return _default_pool
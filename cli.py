@@ -0,0 +1,506 @@
+# -*- coding: utf-8 -*-
+"""
+命令行模式
+不依赖 Tk，复用与 GUI 相同的列举、传输、删除、重命名和同步引擎，适合脚本和定时任务。
+远端路径写作 oci://<bucket>/<path>；输出为 JSON Lines，每行一个事件。
+
+    python main.py ls oci://bucket/dir/
+    python main.py cp -r ./photos oci://bucket/photos/
+    python main.py cp oci://bucket/a.iso ./
+    python main.py rm -r oci://bucket/tmp/
+    python main.py mv oci://bucket/old/ oci://bucket/new/
+    python main.py sync ./site oci://bucket/site/ --delete
+    python main.py bench oci://bucket/bench/ --files 100 --size 4M
+    python main.py buckets logs
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from backends import BACKEND_TYPES, StorageError, get_backend
+from buckets import catalog_key, default_catalog, discover_buckets, discover_namespace, search_buckets
+from bufferpool import default_pool
+from compression import ENCODINGS, default_index
+from journal import JobJournal
+from listing import iter_list_pages
+from metrics import default_metrics
+from ratelimit import default_limiter
+from scheduler import TransferScheduler
+from sync import plan_sync, run_sync
+from transfer import (DEFAULT_WORKERS, MAX_WORKERS, TransferSummary, delete_object, delete_prefix, download_file,
+                      download_prefix, holding_slot, local_path_for, rename_object, rename_prefix, upload_file,
+                      upload_folder)
+
+REMOTE_SCHEME = "oci://"
+DEFAULT_PROGRESS_INTERVAL = 1.0  # 进度事件的输出间隔（秒）
+
+EXIT_OK = 0
+EXIT_FAILED = 1  # 有失败项
+EXIT_USAGE = 2
+EXIT_CANCELLED = 130
+
+
+class UsageError(Exception):
+    """命令行参数错误"""
+
+
+def emit(event, **fields):
+    """输出一行 JSON 事件"""
+    print(json.dumps(dict(event=event, **fields), ensure_ascii=False, default=str), flush=True)
+
+
+def parse_remote(text):
+    """解析 oci://bucket/path，返回 (bucket, path)；不是远端路径时返回 None"""
+    if not text.startswith(REMOTE_SCHEME):
+        return None
+    bucket, _, path = text[len(REMOTE_SCHEME):].partition('/')
+    if not bucket:
+        raise UsageError(f"缺少 bucket: {text}")
+    return bucket, path
+
+
+def parse_size(text):
+    """解析 4M、512K、1G 形式的大小"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper().rstrip('B')
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的大小: {text}")
+
+
+def summary_fields(summary):
+    """TransferSummary 的可序列化字段"""
+    return {'succeeded': summary.succeeded, 'skipped': summary.skipped, 'failed': len(summary.failed),
+            'cancelled': summary.cancelled, 'bytes': summary.bytes, 'seconds': round(summary.elapsed, 3),
+            'items_per_second': round(summary.items_per_second, 2),
+            'bytes_per_second': round(summary.bytes_per_second, 1),
+            'failures': [{'name': name, 'error': error} for name, error in summary.failed]}
+
+
+class Session:
+    """一次命令执行的上下文：后端、namespace 和调度器"""
+
+    def __init__(self, args):
+        self.args = args
+        self.profile = args.profile
+        self.catalog_key = catalog_key(args.profile, args.backend)
+        self.backend = get_backend(args.profile, args.backend)
+        self.namespace = args.namespace or os.environ.get('OSSGUI_NAMESPACE', '')
+        self.workers = max(1, min(args.workers, MAX_WORKERS))
+        self.scheduler = TransferScheduler(self.workers, adaptive=not args.fixed_concurrency)
+        if args.trace:
+            default_metrics().set_trace(args.trace)
+        default_limiter().set_rates(upload_rate=args.upload_limit * 1024, download_rate=args.download_limit * 1024)
+        if args.memory_budget:
+            default_pool().set_budget(args.memory_budget)
+
+    def require_namespace(self):
+        """未指定 --namespace 和 OSSGUI_NAMESPACE 时自动获取（按 profile 缓存）"""
+        if not self.namespace:
+            self.namespace = discover_namespace(self.backend, self.catalog_key)
+        return self.namespace
+
+    def location(self, bucket):
+        return (self.profile, self.namespace, bucket)
+
+    def run(self, title, func):
+        """在调度器中执行 func(job) 并定时输出进度，返回 func 的结果；Ctrl+C 时取消任务"""
+        result = {}
+        done = threading.Event()
+
+        def target(job):
+            try:
+                result['value'] = func(job)
+            finally:
+                done.set()
+
+        job = self.scheduler.submit(title, target)
+        interval = self.args.progress_interval
+        try:
+            while not done.wait(interval):
+                if interval > 0:
+                    self._emit_progress(job)
+        except KeyboardInterrupt:
+            job.cancel()
+            done.wait()
+        while job.finished is None:
+            time.sleep(0.01)
+        if job.failed:
+            raise StorageError(job.message)
+        return result.get('value'), job
+
+    def _emit_progress(self, job):
+        done_items, total_items, done_bytes, total_bytes, _, current = job.tracker.snapshot()
+        byte_rate, item_rate = job.rate()
+        eta = job.tracker.eta()
+        emit('progress', job=job.title, done_items=done_items, total_items=total_items, done_bytes=done_bytes,
+             total_bytes=total_bytes, discovering=job.tracker.discovering, bytes_per_second=round(byte_rate, 1),
+             items_per_second=round(item_rate, 2), eta=round(eta, 1) if eta is not None else None,
+             concurrency=self.scheduler.current_limit, buffer_bytes=default_pool().in_use, current=current)
+
+
+def close_journal(journal, summary):
+    """与 GUI 相同：全部成功或用户取消时删除日志，有失败项时保留，下次在 GUI 中连接该 bucket 时可以继续"""
+    if summary.failed and not summary.cancelled:
+        journal.flush()
+    else:
+        journal.remove()
+
+
+def _finish(summary, **fields):
+    emit('summary', **fields, **summary_fields(summary))
+    if summary.cancelled:
+        return EXIT_CANCELLED
+    return EXIT_FAILED if summary.failed else EXIT_OK
+
+
+def cmd_ls(session, args):
+    bucket, prefix = parse_remote(args.path) or (None, None)
+    if bucket is None:
+        raise UsageError("ls 需要远端路径 oci://bucket/path")
+    namespace = session.require_namespace()
+    if args.recursive:
+        for page in iter_list_pages(session.backend, namespace, bucket, prefix, delimiter=None):
+            compressed = default_index().lookup([obj.get('etag') for obj in page['objects']])
+            for obj in page['objects']:
+                emit('object', **with_original_size(obj, compressed))
+        return EXIT_OK
+    for page in iter_list_pages(session.backend, namespace, bucket, prefix):
+        for name in page['prefixes']:
+            emit('prefix', name=name)
+        compressed = default_index().lookup([obj.get('etag') for obj in page['objects']])
+        for obj in page['objects']:
+            if obj['name'] != prefix:
+                emit('object', **with_original_size(obj, compressed))
+    return EXIT_OK
+
+
+def with_original_size(obj, compressed):
+    """已知的压缩对象加上编码和原始大小，compressed 为压缩索引的查询结果"""
+    known = compressed.get(obj.get('etag'))
+    if known is None:
+        return obj
+    return dict(obj, **{'content-encoding': known[0], 'original-size': known[1]})
+
+
+def cmd_cp(session, args):
+    source, destination = parse_remote(args.source), parse_remote(args.destination)
+    namespace = session.require_namespace()
+    if source is None and destination is not None:
+        return _upload(session, namespace, args.source, destination, args.recursive, args.compress)
+    if source is not None and destination is None:
+        return _download(session, namespace, source, args.destination, args.recursive)
+    raise UsageError("cp 需要一个本地路径和一个远端路径")
+
+
+def _upload(session, namespace, local_path, destination, recursive, compression=None):
+    bucket, path = destination
+    if os.path.isdir(local_path):
+        if not recursive:
+            raise UsageError(f"{local_path} 是目录，需要 -r")
+        target = path if not path or path.endswith('/') else path + '/'
+        journal = JobJournal.create('upload', session.location(bucket),
+                                    {'folder_path': os.path.abspath(local_path), 'target_path': target,
+                                     'compression': compression})
+        summary, job = session.run(f"上传 {local_path}", lambda job: upload_folder(
+            session.backend, namespace, bucket, local_path, target, session.workers, job.tracker, job.cancel_event,
+            gate=job.slot, journal=journal, compression=compression))
+        close_journal(journal, summary)
+        return _finish(summary, command='cp', direction='upload')
+
+    name = path + os.path.basename(local_path) if not path or path.endswith('/') else path
+
+    def upload(job):
+        summary = TransferSummary()
+        job.tracker.add_total(os.path.getsize(local_path), items=1)
+        try:
+            with holding_slot(job.slot):
+                upload_file(session.backend, namespace, bucket, name, local_path, progress=job.tracker.add_bytes,
+                            cancel_event=job.cancel_event, compression=compression)
+            summary.add_success(os.path.getsize(local_path))
+        except StorageError as e:
+            summary.add_failure(name, e)
+        job.tracker.item_done(name)
+        summary.finish(cancelled=job.cancel_event.is_set())
+        return summary
+
+    summary, _ = session.run(f"上传 {local_path}", upload)
+    return _finish(summary, command='cp', direction='upload')
+
+
+def _download(session, namespace, source, local_path, recursive):
+    bucket, path = source
+    if not path or path.endswith('/'):
+        if not recursive:
+            raise UsageError("下载前缀需要 -r")
+        summary, _ = session.run(f"下载 {path}", lambda job: download_prefix(
+            session.backend, namespace, bucket, path, local_path, session.workers, job.tracker, job.cancel_event,
+            gate=job.slot))
+        return _finish(summary, command='cp', direction='download')
+
+    if os.path.isdir(local_path) or local_path.endswith(os.sep):
+        local_path = local_path_for(local_path, path.rsplit('/', 1)[-1])
+
+    def download(job):
+        summary = TransferSummary()
+        try:
+            with holding_slot(job.slot):
+                download_file(session.backend, namespace, bucket, path, local_path, progress=job.tracker.add_bytes,
+                              cancel_event=job.cancel_event,
+                              on_size=lambda size: job.tracker.add_total(size, items=1))
+            summary.add_success(os.path.getsize(local_path))
+        except (StorageError, OSError) as e:
+            summary.add_failure(path, e)
+        job.tracker.item_done(path)
+        summary.finish(cancelled=job.cancel_event.is_set())
+        return summary
+
+    summary, _ = session.run(f"下载 {path}", download)
+    return _finish(summary, command='cp', direction='download')
+
+
+def cmd_rm(session, args):
+    bucket, path = parse_remote(args.path) or (None, None)
+    if bucket is None:
+        raise UsageError("rm 需要远端路径 oci://bucket/path")
+    namespace = session.require_namespace()
+    if not path or path.endswith('/'):
+        if not args.recursive:
+            raise UsageError("删除前缀需要 -r")
+        journal = JobJournal.create('delete', session.location(bucket), {'items': [[path, path, "文件夹"]]})
+        summary, _ = session.run(f"删除 {path}", lambda job: delete_prefix(
+            session.backend, namespace, bucket, path, session.workers, job.tracker, job.cancel_event, gate=job.slot,
+            journal=journal))
+        close_journal(journal, summary)
+        return _finish(summary, command='rm')
+
+    def delete(job):
+        summary = TransferSummary()
+        job.tracker.add_total(0, items=1)
+        try:
+            with job.slot():
+                # 明确指定的单个对象不存在时报告失败，批量删除中才视为已删除
+                delete_object(session.backend, namespace, bucket, path, job.cancel_event, missing_ok=False)
+            summary.add_success()
+        except StorageError as e:
+            summary.add_failure(path, "对象不存在" if e.status == 404 else e)
+        job.tracker.item_done(path)
+        summary.finish(cancelled=job.cancel_event.is_set())
+        return summary
+
+    summary, _ = session.run(f"删除 {path}", delete)
+    return _finish(summary, command='rm')
+
+
+def cmd_mv(session, args):
+    source, destination = parse_remote(args.source), parse_remote(args.destination)
+    if source is None or destination is None or source[0] != destination[0]:
+        raise UsageError("mv 需要同一 bucket 内的两个远端路径")
+    namespace = session.require_namespace()
+    bucket, old_name = source
+    new_name = destination[1]
+    if not old_name.endswith('/') and (not new_name or new_name.endswith('/')):
+        new_name += old_name.rsplit('/', 1)[-1]  # 与 cp 一致，移动到目录下时保留文件名
+    if old_name.endswith('/'):
+        new_name = new_name if new_name.endswith('/') else new_name + '/'
+        journal = JobJournal.create('rename', session.location(bucket),
+                                    {'old_prefix': old_name, 'new_prefix': new_name})
+        summary, _ = session.run(f"重命名 {old_name}", lambda job: rename_prefix(
+            session.backend, namespace, bucket, old_name, new_name, journal, session.workers, job.tracker,
+            job.cancel_event, gate=job.slot))
+        if not summary.failed and not summary.cancelled:
+            journal.remove()
+        else:
+            journal.flush()
+        return _finish(summary, command='mv')
+
+    def rename(job):
+        summary = TransferSummary()
+        try:
+            with job.slot():
+                rename_object(session.backend, namespace, bucket, old_name, new_name, job.cancel_event)
+            summary.add_success()
+        except StorageError as e:
+            summary.add_failure(old_name, e)
+        summary.finish(cancelled=job.cancel_event.is_set())
+        return summary
+
+    summary, _ = session.run(f"重命名 {old_name}", rename)
+    return _finish(summary, command='mv')
+
+
+def cmd_sync(session, args):
+    destination = parse_remote(args.destination)
+    if destination is None or not os.path.isdir(args.source):
+        raise UsageError("sync 需要本地目录和远端路径")
+    session.require_namespace()
+    bucket, prefix = destination
+    prefix = prefix if not prefix or prefix.endswith('/') else prefix + '/'
+
+    def sync(job):
+        plan, manifest = plan_sync(session.backend, session.location(bucket), args.source, prefix, args.full_scan,
+                                   args.delete)
+        emit('plan', uploads=len(plan.uploads), upload_bytes=plan.upload_bytes, deletes=len(plan.deletes),
+             unchanged=plan.unchanged, unreadable=len(plan.errors))
+        return run_sync(session.backend, plan, manifest, session.workers, job.tracker, job.cancel_event,
+                        gate=job.slot)
+
+    summary, _ = session.run(f"同步 {args.source}", sync)
+    return _finish(summary, command='sync')
+
+
+def cmd_bench(session, args):
+    """上传、列举、下载、删除一组临时文件，输出每个阶段的吞吐量"""
+    destination = parse_remote(args.path)
+    if destination is None:
+        raise UsageError("bench 需要远端路径 oci://bucket/path")
+    namespace = session.require_namespace()
+    bucket, prefix = destination
+    session.backend.get_bucket(namespace, bucket)
+    prefix = (prefix if not prefix or prefix.endswith('/') else prefix + '/') + f"ossgui-bench-{int(time.time())}/"
+
+    work_dir = tempfile.mkdtemp(prefix="ossgui-bench-")
+    exit_code = EXIT_OK
+    try:
+        source_dir = os.path.join(work_dir, "src")
+        os.makedirs(source_dir)
+        for index in range(args.files):
+            with open(os.path.join(source_dir, f"file-{index:06d}.bin"), 'wb') as f:
+                f.write(os.urandom(args.size))
+        emit('bench_start', files=args.files, size=args.size, workers=session.workers,
+             backend=session.backend.name, prefix=prefix)
+
+        phases = [
+            ('upload', lambda job: upload_folder(session.backend, namespace, bucket, source_dir, prefix,
+                                                 session.workers, job.tracker, job.cancel_event, gate=job.slot)),
+            ('list', lambda job: _bench_list(session, namespace, bucket, prefix)),
+            ('download', lambda job: download_prefix(session.backend, namespace, bucket, prefix,
+                                                     os.path.join(work_dir, "dst"), session.workers, job.tracker,
+                                                     job.cancel_event, gate=job.slot)),
+            ('delete', lambda job: delete_prefix(session.backend, namespace, bucket, prefix, session.workers,
+                                                 job.tracker, job.cancel_event, gate=job.slot)),
+        ]
+        for phase, func in phases:
+            summary, _ = session.run(f"bench {phase}", func)
+            emit('bench', phase=phase, concurrency=session.scheduler.current_limit, **summary_fields(summary))
+            if summary.cancelled:
+                return EXIT_CANCELLED
+            if summary.failed:
+                exit_code = EXIT_FAILED
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return exit_code
+
+
+def _bench_list(session, namespace, bucket, prefix):
+    summary = TransferSummary()
+    for page in iter_list_pages(session.backend, namespace, bucket, prefix, delimiter=None):
+        for obj in page['objects']:
+            summary.add_success(obj.get('size', 0))
+    summary.finish()
+    return summary
+
+
+def cmd_buckets(session, args):
+    """列出 compartment 树中的全部 bucket，有效期内直接使用本地缓存"""
+    namespace = session.require_namespace()
+    catalog = default_catalog()
+    root = args.compartment or ""
+    entry = None if args.refresh else catalog.buckets(session.catalog_key, root)
+    if not catalog.is_fresh(entry):
+        root_id = root or session.backend.tenancy_id()
+        if not root_id:
+            raise UsageError("无法确定租户 OCID，需要 --compartment")
+        buckets, errors = discover_buckets(session.backend, namespace, root_id, workers=session.workers)
+        catalog.set_buckets(session.catalog_key, root, buckets, errors)
+        entry = catalog.buckets(session.catalog_key, root)
+    for error in entry['errors']:
+        emit('error', error=error)
+    for bucket in search_buckets(entry['buckets'], ' '.join(args.search)):
+        emit('bucket', **bucket)
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ossgui", description="OCI 对象存储命令行模式，输出 JSON Lines")
+    parser.add_argument('--profile', default='DEFAULT', help="~/.oci/config 中的 profile")
+    parser.add_argument('--backend', choices=sorted(BACKEND_TYPES), default=None, help="存储后端")
+    parser.add_argument('--namespace', '-n', default=None, help="对象存储 namespace")
+    parser.add_argument('--workers', '-j', type=int, default=DEFAULT_WORKERS, help="并发数上限")
+    parser.add_argument('--fixed-concurrency', action='store_true', help="关闭自适应并发，始终使用 --workers")
+    parser.add_argument('--upload-limit', type=int, default=0, help="上传限速 KB/s，0 为不限速")
+    parser.add_argument('--download-limit', type=int, default=0, help="下载限速 KB/s，0 为不限速")
+    parser.add_argument('--memory-budget', type=parse_size,
+                        help="传输缓冲的内存上限，如 256M（默认取 OSSGUI_MEMORY_BUDGET_MB 或 256M）")
+    parser.add_argument('--progress-interval', type=float, default=DEFAULT_PROGRESS_INTERVAL,
+                        help="进度事件输出间隔（秒），0 为不输出")
+    parser.add_argument('--trace', help="把每次后端调用（操作、耗时、字节数、状态）追加到该 JSON Lines 文件")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ls = commands.add_parser('ls', help="列出对象")
+    ls.add_argument('path')
+    ls.add_argument('-r', '--recursive', action='store_true')
+    ls.set_defaults(func=cmd_ls)
+
+    cp = commands.add_parser('cp', help="上传或下载")
+    cp.add_argument('source')
+    cp.add_argument('destination')
+    cp.add_argument('-r', '--recursive', action='store_true')
+    cp.add_argument('--compress', choices=ENCODINGS, help="上传时压缩，下载时总是按 Content-Encoding 自动解压")
+    cp.set_defaults(func=cmd_cp)
+
+    rm = commands.add_parser('rm', help="删除对象或前缀")
+    rm.add_argument('path')
+    rm.add_argument('-r', '--recursive', action='store_true')
+    rm.set_defaults(func=cmd_rm)
+
+    mv = commands.add_parser('mv', help="重命名对象或前缀")
+    mv.add_argument('source')
+    mv.add_argument('destination')
+    mv.set_defaults(func=cmd_mv)
+
+    sync = commands.add_parser('sync', help="增量同步本地目录到远端")
+    sync.add_argument('source')
+    sync.add_argument('destination')
+    sync.add_argument('--delete', action='store_true', help="删除远端多余的对象")
+    sync.add_argument('--full-scan', action='store_true', help="忽略本地清单，重新列举远端")
+    sync.set_defaults(func=cmd_sync)
+
+    bench = commands.add_parser('bench', help="测量上传、列举、下载、删除的吞吐量")
+    bench.add_argument('path')
+    bench.add_argument('--files', type=int, default=100)
+    bench.add_argument('--size', type=parse_size, default=parse_size('1M'))
+    bench.set_defaults(func=cmd_bench)
+
+    buckets = commands.add_parser('buckets', help="列出（并搜索）各 compartment 中的 bucket")
+    buckets.add_argument('search', nargs='*', help="关键字，匹配 bucket 名称或 compartment 路径")
+    buckets.add_argument('--compartment', help="从该 compartment 开始遍历，默认整个租户")
+    buckets.add_argument('--refresh', action='store_true', help="忽略本地缓存，重新列举")
+    buckets.set_defaults(func=cmd_buckets)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        session = Session(args)
+        return args.func(session, args)
+    except UsageError as e:
+        emit('error', error=str(e))
+        return EXIT_USAGE
+    except (StorageError, OSError) as e:
+        emit('error', error=str(e))
+        return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
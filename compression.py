@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+压缩
+上传时可选 gzip 或 zstd（需要安装 zstandard 包）流式压缩，对象带 Content-Encoding 和原始大小、原始 MD5 元数据；
+下载时按 Content-Encoding 透明解压。
+列举结果不包含元数据，压缩对象的原始大小按 ETag 记录在本地索引中（上传或下载时写入），列表据此显示两种大小。
+"""
+
+import importlib.util
+import os
+import sqlite3
+import threading
+import zlib
+
+from appdata import data_dir
+
+GZIP = "gzip"
+ZSTD = "zstd"
+ENCODINGS = (GZIP, ZSTD)
+ORIGINAL_SIZE_METADATA = "original-size"  # 压缩前的大小
+ORIGINAL_MD5_METADATA = "original-md5"  # 压缩前的 MD5（base64），只在单次上传时写入
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS compressed (
+    etag TEXT PRIMARY KEY,
+    encoding TEXT NOT NULL,
+    original_size INTEGER NOT NULL,
+    original_md5 TEXT
+)
+"""
+
+
+def available_encodings():
+    """当前环境可用的压缩算法，只查找 zstandard 包而不导入，启动时不增加开销"""
+    encodings = [GZIP]
+    if importlib.util.find_spec("zstandard") is not None:
+        encodings.append(ZSTD)
+    return encodings
+
+
+def compressor(encoding):
+    """返回带 compress(data) 和 flush() 的压缩对象"""
+    if encoding == GZIP:
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 输出带 gzip 头和 CRC 的格式
+    if encoding == ZSTD:
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd 压缩需要安装 zstandard 包")
+        return zstandard.ZstdCompressor(write_checksum=True).compressobj()
+    raise ValueError(f"不支持的压缩算法: {encoding}")
+
+
+class _Decompressor:
+    """统一 zlib 和 zstandard 的解压接口，数据损坏或不完整时抛出 ValueError"""
+
+    def __init__(self, decompress, errors):
+        self._decompress = decompress
+        self._errors = errors
+
+    def decompress(self, data):
+        try:
+            return self._decompress.decompress(data)
+        except self._errors as e:
+            raise ValueError(str(e))
+
+    def flush(self):
+        data = b''
+        flush = getattr(self._decompress, 'flush', None)
+        if flush is not None:
+            try:
+                data = flush()
+            except self._errors as e:
+                raise ValueError(str(e))
+        if not getattr(self._decompress, 'eof', True):
+            raise ValueError("压缩数据不完整")
+        return data
+
+
+def decompressor(encoding):
+    """返回带 decompress(data) 和 flush() 的解压对象，不认识的编码返回 None（原样保存）"""
+    if encoding == GZIP:
+        return _Decompressor(zlib.decompressobj(31), zlib.error)
+    if encoding == ZSTD:
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("解压 zstd 对象需要安装 zstandard 包")
+        return _Decompressor(zstandard.ZstdDecompressor().decompressobj(), zstandard.ZstdError)
+    return None
+
+
+def is_compressed(info):
+    """对象信息（HEAD 结果）是否为本程序能解压的压缩对象"""
+    return (info.get('content-encoding') or '').lower() in ENCODINGS
+
+
+def original_size(info):
+    """压缩对象元数据中的原始大小，没有时返回 None"""
+    try:
+        return int((info.get('metadata') or {})[ORIGINAL_SIZE_METADATA])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class CompressionIndex:
+    """压缩对象的本地索引 ETag -> (编码, 原始大小, 原始 MD5)，线程安全"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), "compression.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def put(self, etag, encoding, size, md5=None):
+        if not etag:
+            return
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO compressed VALUES (?, ?, ?, ?)", (etag, encoding, size, md5))
+            self._conn.commit()
+
+    def put_info(self, info):
+        """记录 HEAD 结果中的压缩信息，非压缩对象忽略"""
+        size = original_size(info)
+        if is_compressed(info) and size is not None:
+            self.put(info.get('etag'), info['content-encoding'].lower(), size,
+                     (info.get('metadata') or {}).get(ORIGINAL_MD5_METADATA))
+
+    def get(self, etag):
+        """返回 (编码, 原始大小, 原始 MD5)，不是已知的压缩对象时返回 None"""
+        return self.lookup([etag]).get(etag)
+
+    def lookup(self, etags):
+        """批量查询，返回 {etag: (编码, 原始大小, 原始 MD5)}"""
+        etags = [etag for etag in etags if etag]
+        results = {}
+        with self._lock:
+            for start in range(0, len(etags), 500):
+                batch = etags[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT etag, encoding, original_size, original_md5 FROM compressed "
+                    f"WHERE etag IN ({','.join('?' * len(batch))})", batch).fetchall()
+                results.update((row[0], tuple(row[1:])) for row in rows)
+        return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_index():
+    """进程内共享的压缩索引"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = CompressionIndex()
+        return _default_index
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+本地假对象存储服务
+在本机 HTTP 端口上模拟 OCI 对象存储 REST API 的常用部分，数据保存在 FakeBackend 中：
+列举（delimiter、分页）、上传、Range 下载、HEAD、分段上传、复制、重命名、删除。
+可注入延迟和限流（429 + Retry-After），OCI SDK 以不签名的方式连接，用于基准测试和离线调试。
+
+    python fakeserver.py --port 8765 --latency 0.02 --throttle 0.05
+"""
+
+import argparse
+import email.utils
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from backends import FAKE_NAMESPACE, FakeBackend, StorageError
+
+FAKE_REGION = "us-ashburn-1"  # SDK 要求配置中有 region，指定 endpoint 后不会实际使用
+DEFAULT_PAGE_LIMIT = 1000  # 服务端单页上限，与真实服务一致
+DEFAULT_RETRY_AFTER = 1  # 限流响应的 Retry-After（秒）
+
+
+class NoopSigner:
+    """不签名的 signer，只用于连接本地的假服务"""
+
+    def __call__(self, request):
+        return request
+
+
+class FakeObjectStorageServer:
+    """在后台线程中运行的假对象存储服务
+
+    latency/jitter 为每个请求额外等待的秒数（jitter 为随机附加的上限）；
+    throttle 为随机返回 429 的比例，max_rps 不为 0 时超过该请求速率的请求返回 429。
+    注入参数可以在运行中通过 inject() 修改。
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, buckets=("test",), namespace=FAKE_NAMESPACE, latency=0.0,
+                 jitter=0.0, throttle=0.0, max_rps=0, retry_after=DEFAULT_RETRY_AFTER):
+        self.store = FakeBackend(buckets, namespace)
+        self.namespace = namespace
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = throttle
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.requests = 0  # 收到的请求数
+        self.throttled = 0  # 其中返回 429 的请求数
+        self._lock = threading.Lock()
+        self._window = (0, 0)  # (秒, 该秒内的请求数)
+        self._work_requests = itertools.count(1)
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="fake-oss")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def inject(self, latency=None, jitter=None, throttle=None, max_rps=None):
+        """修改注入的延迟和限流，None 表示保持不变"""
+        if latency is not None:
+            self.latency = latency
+        if jitter is not None:
+            self.jitter = jitter
+        if throttle is not None:
+            self.throttle = throttle
+        if max_rps is not None:
+            self.max_rps = max_rps
+
+    def sdk_backend(self):
+        """连接到本服务的 SDK 后端"""
+        from backends import OCISDKBackend
+        return OCISDKBackend(config={'region': FAKE_REGION}, service_endpoint=self.url, signer=NoopSigner())
+
+    def _admit(self):
+        """计数并按注入参数等待，返回是否应当限流"""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.requests += 1
+            second = int(time.monotonic())
+            count = self._window[1] + 1 if self._window[0] == second else 1
+            self._window = (second, count)
+            throttled = (self.throttle and random.random() < self.throttle) or (self.max_rps and count > self.max_rps)
+            if throttled:
+                self.throttled += 1
+            return bool(throttled)
+
+
+def _http_date(value):
+    if not value:
+        return None
+    return email.utils.format_datetime(datetime.fromisoformat(value).astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_range(header, size):
+    """解析 Range 头，返回闭区间 (起始, 结束)，无法满足时返回 None"""
+    unit, _, spec = header.partition('=')
+    start, _, end = spec.partition('-')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+    if not start:
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    return (start, end) if start <= end else None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """把 REST 请求转换为 FakeBackend 调用"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_HEAD(self):
+        self._dispatch('HEAD')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip('/').split('/')
+        body = self._read_body()
+        if self.fake._admit():
+            self._send_error(429, "TooManyRequests", "Too many requests",
+                             {'Retry-After': str(self.fake.retry_after)})
+            return
+        try:
+            self._route(method, parts, body)
+        except StorageError as e:
+            code = str(e).split(':', 1)[0] if ':' in str(e) else "InternalServerError"
+            self._send_error(e.status or 500, code, str(e))
+        except (KeyError, ValueError) as e:
+            self._send_error(400, "InvalidParameter", str(e))
+
+    def _route(self, method, parts, body):
+        if parts == ['n'] and method == 'GET':
+            return self._send_json(200, self.fake.namespace)
+        if len(parts) == 2 and parts[0] == 'workRequests':
+            return self._send_json(200, {'id': parts[1], 'status': 'COMPLETED', 'operationType': 'COPY_OBJECT'})
+        if len(parts) == 3 and parts[0] == 'n' and parts[2] == 'b' and method == 'GET':
+            buckets = self.fake.store.list_buckets(parts[1], self.query['compartmentId'])
+            return self._send_json(200, [{'name': b['name'], 'namespace': b['namespace'],
+                                          'compartmentId': b['compartment-id'], 'createdBy': "fake",
+                                          'timeCreated': b['time-created'] or None, 'etag': b['name']}
+                                         for b in buckets])
+        if len(parts) < 4 or parts[0] != 'n' or parts[2] != 'b':
+            return self._send_error(404, "NotFound", self.path)
+
+        store = self.fake.store
+        namespace, bucket, rest = parts[1], unquote(parts[3]), parts[4:]
+        name = unquote('/'.join(rest[1:]))
+        if not rest:
+            if method in ('GET', 'HEAD'):
+                info = store.get_bucket(namespace, bucket)
+                return self._send_json(200, {'name': info['name'], 'namespace': namespace,
+                                             'compartmentId': info['compartment-id']})
+        elif rest == ['o'] and method == 'GET':
+            return self._list_objects(namespace, bucket)
+        elif rest[0] == 'o' and name:
+            return self._object(method, namespace, bucket, name, body)
+        elif rest == ['u'] and method == 'POST':
+            details = json.loads(body)
+            upload_id = store.create_multipart_upload(namespace, bucket, details['object'], details.get('metadata'),
+                                                      details.get('contentEncoding'))
+            return self._send_json(200, {'namespace': namespace, 'bucket': bucket, 'object': details['object'],
+                                         'uploadId': upload_id, 'timeCreated': _now()})
+        elif rest[0] == 'u' and name:
+            return self._multipart(method, namespace, bucket, name, body)
+        elif rest == ['actions', 'renameObject'] and method == 'POST':
+            details = json.loads(body)
+            store.rename_object(namespace, bucket, details['sourceName'], details['newName'])
+            return self._send(200)
+        elif rest == ['actions', 'copyObject'] and method == 'POST':
+            details = json.loads(body)
+            store.copy_object(namespace, bucket, details['sourceObjectName'], details['destinationObjectName'])
+            return self._send(202, headers={'opc-work-request-id': f"fakewr{next(self.fake._work_requests)}"})
+        self._send_error(404, "NotFound", self.path)
+
+    def _list_objects(self, namespace, bucket):
+        limit = min(int(self.query.get('limit', DEFAULT_PAGE_LIMIT)), DEFAULT_PAGE_LIMIT)
+        page = self.fake.store.list_objects(namespace, bucket, prefix=self.query.get('prefix'),
+                                            start=self.query.get('start'), limit=limit,
+                                            delimiter=self.query.get('delimiter'))
+        objects = [{'name': obj['name'], 'size': obj['size'], 'md5': obj['md5'], 'etag': obj['etag'],
+                    'timeModified': obj['time-modified'] or None} for obj in page['objects']]
+        result = {'objects': objects, 'prefixes': page['prefixes']}
+        if page['next_start_with']:
+            result['nextStartWith'] = page['next_start_with']
+        self._send_json(200, result)
+
+    def _object(self, method, namespace, bucket, name, body):
+        store = self.fake.store
+        if method == 'PUT':
+            metadata = {key[len('opc-meta-'):]: value for key, value in self.headers.items()
+                        if key.lower().startswith('opc-meta-')}
+            result = store.put_object(namespace, bucket, name, body, len(body), metadata,
+                                      self.headers.get('Content-Encoding'))
+            return self._send(200, headers={'ETag': result['etag'], 'opc-content-md5': result['md5'],
+                                            'last-modified': email.utils.formatdate(usegmt=True)})
+        if method == 'DELETE':
+            store.delete_object(namespace, bucket, name)
+            return self._send(204)
+        if method not in ('GET', 'HEAD'):
+            return self._send_error(405, "MethodNotAllowed", method)
+
+        info = store.head_object(namespace, bucket, name)
+        headers = {'ETag': info['etag'], 'Content-Type': 'application/octet-stream', 'Accept-Ranges': 'bytes',
+                   'last-modified': _http_date(info['time-modified'])}
+        if info['md5']:
+            headers['Content-MD5'] = info['md5']
+        if info.get('multipart-md5'):
+            headers['opc-multipart-md5'] = info['multipart-md5']
+        if info.get('content-encoding'):
+            headers['Content-Encoding'] = info['content-encoding']
+        for key, value in info['metadata'].items():
+            headers[f'opc-meta-{key}'] = value
+        if method == 'HEAD':
+            return self._send(200, headers=headers, content_length=info['size'])
+
+        status, byte_range = 200, None
+        if self.headers.get('Range') and info['size']:
+            byte_range = _parse_range(self.headers['Range'], info['size'])
+            if byte_range is None:
+                return self._send_error(416, "InvalidRange", self.headers['Range'])
+            status = 206
+            headers['Content-Range'] = f"bytes {byte_range[0]}-{byte_range[1]}/{info['size']}"
+        data = store.get_object(namespace, bucket, name, byte_range, self.headers.get('If-Match')).read()
+        self._send(status, data, headers)
+
+    def _multipart(self, method, namespace, bucket, name, body):
+        store = self.fake.store
+        upload_id = self.query['uploadId']
+        if method == 'PUT':
+            etag = store.upload_part(namespace, bucket, name, upload_id, int(self.query['uploadPartNum']), body,
+                                     len(body))
+            return self._send(200, headers={'ETag': etag})
+        if method == 'GET':
+            parts = store.list_multipart_upload_parts(namespace, bucket, name, upload_id)
+            numbers = sorted(parts)
+            start = int(self.query.get('page', 0))
+            limit = int(self.query.get('limit', DEFAULT_PAGE_LIMIT))
+            page = [{'partNumber': num, 'etag': parts[num]['etag'], 'md5': parts[num]['md5'],
+                     'size': parts[num]['size']} for num in numbers[start:start + limit]]
+            headers = {'opc-next-page': str(start + limit)} if start + limit < len(numbers) else {}
+            return self._send_json(200, page, headers)
+        if method == 'POST':
+            details = json.loads(body)
+            parts = [(part['partNum'], part['etag']) for part in details.get('partsToCommit', [])]
+            result = store.commit_multipart_upload(namespace, bucket, name, upload_id, parts)
+            return self._send(200, headers={'ETag': result['etag'], 'opc-multipart-md5': result['md5']})
+        if method == 'DELETE':
+            store.abort_multipart_upload(namespace, bucket, name, upload_id)
+            return self._send(204)
+        self._send_error(405, "MethodNotAllowed", method)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status, data=b'', headers=None, content_length=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            if value is not None:
+                self.send_header(key, value)
+        self.send_header('opc-request-id', f"fake-{self.fake.requests}")
+        self.send_header('Content-Length', str(len(data) if content_length is None else content_length))
+        self.end_headers()
+        if data and self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def _send_json(self, status, value, headers=None):
+        self._send(status, json.dumps(value).encode(), dict(headers or {}, **{'Content-Type': 'application/json'}))
+
+    def _send_error(self, status, code, message, headers=None):
+        self._send_json(status, {'code': code, 'message': message}, headers)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地假对象存储服务")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--bucket', action='append', help="可多次指定，默认 test")
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="随机附加延迟的上限（秒）")
+    parser.add_argument('--throttle', type=float, default=0.0, help="随机返回 429 的比例")
+    parser.add_argument('--max-rps', type=int, default=0, help="超过该请求速率时返回 429，0 为不限制")
+    args = parser.parse_args(argv)
+
+    server = FakeObjectStorageServer(args.host, args.port, tuple(args.bucket or ["test"]), latency=args.latency,
+                                     jitter=args.jitter, throttle=args.throttle, max_rps=args.max_rps)
+    print(f"{server.url}  namespace={server.namespace}  buckets={','.join(args.bucket or ['test'])}", flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
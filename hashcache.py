@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+本地文件哈希缓存
+以 (路径, 大小, 修改时间, inode) 识别文件，缓存 MD5 和分段 MD5，未变化的文件不再重复读取。
+未命中的文件用线程池并行计算（hashlib 和文件读取都会释放 GIL）。
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from appdata import data_dir
+
+HASH_CHUNK_SIZE = 1024 * 1024
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024  # 未命中文件总量超过该值时才并行计算
+DEFAULT_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    md5 TEXT NOT NULL,
+    part_size INTEGER,
+    part_md5s TEXT
+)
+"""
+
+
+def _file_key(path):
+    """文件身份 (size, mtime_ns, inode)"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def hash_file(path, part_size=None):
+    """读取一次文件，返回 (MD5 base64, 各分段 MD5 十六进制列表或 None)"""
+    digest = hashlib.md5()
+    parts = [] if part_size else None
+    part_digest, part_filled = hashlib.md5(), 0
+    buffer = memoryview(bytearray(HASH_CHUNK_SIZE))  # 整个文件反复使用同一块缓冲
+    with open(path, 'rb') as f:
+        for n in iter(lambda: f.readinto(buffer), 0):
+            chunk = buffer[:n]
+            digest.update(chunk)
+            while parts is not None and chunk:
+                take = chunk[:part_size - part_filled]
+                part_digest.update(take)
+                part_filled += len(take)
+                chunk = chunk[len(take):]
+                if part_filled == part_size:
+                    parts.append(part_digest.hexdigest())
+                    part_digest, part_filled = hashlib.md5(), 0
+    if parts is not None and (part_filled or not parts):
+        parts.append(part_digest.hexdigest())
+    return base64.b64encode(digest.digest()).decode(), parts
+
+
+def _hash_or_none(path):
+    """文件的 MD5，读取失败（例如已被删除）时返回 None"""
+    try:
+        return hash_file(path)[0]
+    except OSError:
+        return None
+
+
+def multipart_md5(part_md5s):
+    """按服务端规则由各分段 MD5 计算分段上传对象的 MD5：base64(md5(各分段摘要拼接))-分段数"""
+    combined = hashlib.md5(b''.join(bytes.fromhex(part) for part in part_md5s)).digest()
+    return f"{base64.b64encode(combined).decode()}-{len(part_md5s)}"
+
+
+class HashCache:
+    """SQLite 哈希缓存，线程安全"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), "hashes.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def _lookup(self, path, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT md5, part_size, part_md5s FROM hashes WHERE path=? AND size=? AND mtime_ns=? AND inode=?",
+                (path, *key)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2]) if row[2] else None
+
+    def _store(self, path, key, md5, part_size=None, part_md5s=None):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (path, *key, md5, part_size, json.dumps(part_md5s) if part_md5s else None))
+            self._conn.commit()
+
+    def put(self, path, md5):
+        """记录已知的 MD5（例如刚下载并校验过的文件）"""
+        path = os.path.abspath(path)
+        self._store(path, _file_key(path), md5)
+
+    def md5(self, path):
+        """文件的 MD5（base64），未变化时直接返回缓存值"""
+        path = os.path.abspath(path)
+        key = _file_key(path)
+        cached = self._lookup(path, key)
+        if cached:
+            return cached[0]
+        md5, _ = hash_file(path)
+        self._store(path, key, md5)
+        return md5
+
+    def part_md5s(self, path, part_size):
+        """文件按 part_size 切分后各分段的 MD5（十六进制）"""
+        path = os.path.abspath(path)
+        key = _file_key(path)
+        cached = self._lookup(path, key)
+        if cached and cached[1] == part_size and cached[2]:
+            return cached[2]
+        md5, parts = hash_file(path, part_size)
+        self._store(path, key, md5, part_size, parts)
+        return parts
+
+    def multipart_md5(self, path, part_size):
+        """文件按 part_size 分段上传后服务端给出的分段 MD5"""
+        return multipart_md5(self.part_md5s(path, part_size))
+
+    def md5_many(self, paths, workers=DEFAULT_HASH_WORKERS):
+        """批量计算 MD5，返回 {路径: md5}；未命中的文件较多时用线程池并行读取，无法读取的文件不在结果中
+
+        不用进程池：GUI 和调度器进程中有很多线程，fork 出的子进程可能卡在 fork 时被其他线程持有的锁上。
+        """
+        results, misses = {}, []
+        for path in paths:
+            absolute = os.path.abspath(path)
+            try:
+                key = _file_key(absolute)
+            except OSError:
+                continue
+            cached = self._lookup(absolute, key)
+            if cached:
+                results[path] = cached[0]
+            else:
+                misses.append((path, absolute, key))
+
+        if len(misses) > 1 and sum(key[0] for _, _, key in misses) >= PARALLEL_MIN_BYTES:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash") as executor:
+                hashed = list(executor.map(_hash_or_none, [absolute for _, absolute, _ in misses]))
+        else:
+            hashed = [_hash_or_none(absolute) for _, absolute, _ in misses]
+
+        for (path, absolute, key), md5 in zip(misses, hashed):
+            if md5 is None:
+                continue
+            self._store(absolute, key, md5)
+            results[path] = md5
+        return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """进程内共享的哈希缓存"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = HashCache()
+        return _default_cache
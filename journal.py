@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+任务日志
+批量任务（文件夹上传、删除、重命名）的进度写入本地 SQLite 数据库（WAL 模式），
+记录每一项的状态和进行中的分段上传，程序或机器中断后可以继续：跳过已完成的项目，复用未完成的分段上传。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from appdata import data_dir
+
+COMMIT_INTERVAL = 0.5  # 项目状态最多延迟多少秒落盘；中断时丢失的少量记录会在继续时重做
+
+DONE = "done"
+UNDONE = "undone"  # 回滚重命名后恢复原状的项目
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        location TEXT NOT NULL,
+        params TEXT NOT NULL,
+        created REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS items (
+        job_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        state TEXT NOT NULL,
+        PRIMARY KEY (job_id, name)
+    )""",
+    """CREATE TABLE IF NOT EXISTS uploads (
+        job_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        upload_id TEXT NOT NULL,
+        part_size INTEGER NOT NULL,
+        PRIMARY KEY (job_id, name)
+    )""",
+)
+
+
+class JournalStore:
+    """日志数据库，所有任务共用一个连接，线程安全
+
+    项目状态按 COMMIT_INTERVAL 批量提交，任务的创建、删除和分段上传记录立即提交。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), "journal.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self._last_commit = time.monotonic()
+
+    def execute(self, sql, params=(), commit=False):
+        """执行写操作；commit 为 False 时按时间间隔合并提交"""
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            now = time.monotonic()
+            if commit or now - self._last_commit >= COMMIT_INTERVAL:
+                self._conn.commit()
+                self._last_commit = now
+            return cursor.lastrowid
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._last_commit = time.monotonic()
+
+
+_default_store = None
+_store_lock = threading.Lock()
+
+
+def default_store():
+    """进程内共享的日志数据库"""
+    global _default_store
+    with _store_lock:
+        if _default_store is None:
+            _default_store = JournalStore()
+        return _default_store
+
+
+class JobJournal:
+    """一个批量任务的日志
+
+    kind 为任务类型（'upload'、'delete'、'rename'），params 为继续任务所需的参数。
+    任务全部成功或被放弃后调用 remove() 删除日志。
+    """
+
+    def __init__(self, store, job_id, kind, location, params, created=None):
+        self.store = store
+        self.id = job_id
+        self.kind = kind
+        self.location = tuple(location)
+        self.params = params
+        self.created = created
+        self._done = None
+        self._done_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, kind, location, params, store=None):
+        """新建任务日志，location 为 (profile, namespace, bucket)"""
+        store = store or default_store()
+        created = time.time()
+        job_id = store.execute("INSERT INTO jobs (kind, location, params, created) VALUES (?, ?, ?, ?)",
+                               (kind, json.dumps(list(location)), json.dumps(params, ensure_ascii=False), created),
+                               commit=True)
+        journal = cls(store, job_id, kind, location, params, created)
+        journal._done = set()
+        return journal
+
+    @classmethod
+    def pending(cls, location=None, kind=None, store=None):
+        """未完成的任务日志，可按 bucket 和任务类型过滤"""
+        store = store or default_store()
+        journals = []
+        for job_id, job_kind, job_location, params, created in store.query(
+                "SELECT id, kind, location, params, created FROM jobs ORDER BY id"):
+            job_location = tuple(json.loads(job_location))
+            if (location is None or job_location == tuple(location)) and (kind is None or job_kind == kind):
+                journals.append(cls(store, job_id, job_kind, job_location, json.loads(params), created))
+        return journals
+
+    def _done_set(self):
+        with self._done_lock:
+            if self._done is None:
+                self._done = set(self.done_names())
+            return self._done
+
+    def is_done(self, name):
+        """该项目在之前的运行中是否已完成"""
+        return name in self._done_set()
+
+    def record_done(self, name):
+        self.store.execute("INSERT OR REPLACE INTO items VALUES (?, ?, ?)", (self.id, name, DONE))
+        done = self._done_set()
+        with self._done_lock:
+            done.add(name)
+
+    def record_undone(self, name):
+        self.store.execute("INSERT OR REPLACE INTO items VALUES (?, ?, ?)", (self.id, name, UNDONE))
+        done = self._done_set()
+        with self._done_lock:
+            done.discard(name)
+
+    def done_names(self):
+        """已完成（且未回滚）的项目"""
+        self.store.flush()
+        return [row[0] for row in self.store.query("SELECT name FROM items WHERE job_id=? AND state=?",
+                                                   (self.id, DONE))]
+
+    def record_upload(self, name, upload_id, part_size):
+        """记录进行中的分段上传，中断后可以复用已上传的分段"""
+        self.store.execute("INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?)", (self.id, name, upload_id, part_size),
+                           commit=True)
+
+    def upload_for(self, name):
+        """该对象进行中的分段上传 (upload_id, part_size)，没有时返回 None"""
+        rows = self.store.query("SELECT upload_id, part_size FROM uploads WHERE job_id=? AND name=?", (self.id, name))
+        return tuple(rows[0]) if rows else None
+
+    def clear_upload(self, name):
+        self.store.execute("DELETE FROM uploads WHERE job_id=? AND name=?", (self.id, name))
+
+    def uploads(self):
+        """所有进行中的分段上传 [(name, upload_id)]，放弃任务时用于释放已上传的分段"""
+        return [tuple(row) for row in self.store.query("SELECT name, upload_id FROM uploads WHERE job_id=?",
+                                                       (self.id,))]
+
+    def flush(self):
+        self.store.flush()
+
+    def remove(self):
+        """删除任务日志"""
+        for table, column in (("items", "job_id"), ("uploads", "job_id"), ("jobs", "id")):
+            self.store.execute(f"DELETE FROM {table} WHERE {column}=?", (self.id,))
+        self.store.flush()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+目录列举
+1.基于 delimiter 的分页列举，按页惰性返回结果
+2.按目录缓存列举结果
+3.后台预取子目录
+"""
+
+import threading
+import time
+from bisect import insort
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import StorageError
+from retry import with_retry
+
+DEFAULT_PAGE_SIZE = 1000  # 服务端单页上限
+DEFAULT_CACHE_TTL = 300  # 列举缓存有效期（秒）
+DEFAULT_CACHE_SIZE = 256  # 列举缓存最多保留的目录数
+DEFAULT_PREFETCH_WORKERS = 2  # 预取线程数，独立于传输线程
+DEFAULT_PREFETCH_COUNT = 20  # 每个目录最多预取的子目录数
+DEFAULT_PREFETCH_MAX_PAGES = 5  # 子目录超过该页数时放弃预取
+PREFETCH_THROTTLE_PAUSE = 30.0  # 预取遇到限流后暂停的秒数（服务端给出更长的 Retry-After 时按其等待）
+
+
+def iter_list_pages(backend, namespace, bucket, prefix="", delimiter="/", page_size=DEFAULT_PAGE_SIZE):
+    """按页惰性列举前缀下的对象
+
+    delimiter 为 '/' 时只返回直接子对象和子目录前缀；为 None 时递归返回前缀下的全部对象。
+    每页为 {'objects': [...], 'prefixes': [...], 'next_start_with': ...}，调用方停止迭代即停止请求后续页。
+    限流或暂时错误时重试该页。
+    """
+    start = None
+    while True:
+        page = with_retry(backend.list_objects, namespace, bucket, prefix=prefix or None, start=start,
+                          limit=page_size, delimiter=delimiter)
+        yield page
+        start = page.get('next_start_with')
+        if not start:
+            return
+
+
+def iter_objects(backend, namespace, bucket, prefix="", page_size=DEFAULT_PAGE_SIZE):
+    """递归列举前缀下的全部对象，逐个返回"""
+    for page in iter_list_pages(backend, namespace, bucket, prefix, delimiter=None, page_size=page_size):
+        yield from page['objects']
+
+
+def parent_prefix(name):
+    """对象或文件夹所在的目录前缀，'a/b/c.txt' -> 'a/b/'，'a/b/' -> 'a/'"""
+    stripped = name[:-1] if name.endswith('/') else name
+    index = stripped.rfind('/')
+    return stripped[:index + 1] if index >= 0 else ""
+
+
+class ListingCache:
+    """目录列举缓存
+
+    键为 (profile, namespace, bucket, prefix)，值为该目录的直接子对象和子目录前缀。
+    超过 ttl 的条目视为失效，条目数超过 max_entries 时淘汰最久未使用的条目。
+    上传、删除、重命名等操作通过 add_*/remove_* 就地修补受影响的目录，而不是整体失效。
+    """
+
+    def __init__(self, ttl=DEFAULT_CACHE_TTL, max_entries=DEFAULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """返回 {'objects', 'prefixes', 'time'} 的副本，未命中或已过期返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry['time'] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return {'objects': list(entry['objects']), 'prefixes': list(entry['prefixes']), 'time': entry['time']}
+
+    def put(self, key, objects, prefixes):
+        """写入一个目录的完整列举结果"""
+        with self._lock:
+            self._entries[key] = {'objects': list(objects), 'prefixes': list(prefixes), 'time': time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, location, prefix, recursive=False):
+        """使目录失效，recursive 时连同所有子目录一起失效；location 为 (profile, namespace, bucket)"""
+        with self._lock:
+            for key in list(self._entries):
+                if key[:3] != tuple(location):
+                    continue
+                if key[3] == prefix or (recursive and key[3].startswith(prefix)):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def add_object(self, location, obj):
+        """新增或覆盖对象，并确保各级上级目录中出现对应的子目录前缀"""
+        name = obj['name']
+        with self._lock:
+            entry = self._entries.get((*location, parent_prefix(name)))
+            if entry is not None:
+                entry['objects'] = [o for o in entry['objects'] if o['name'] != name]
+                insort(entry['objects'], obj, key=lambda o: o['name'])
+            self._add_ancestors(location, parent_prefix(name))
+
+    def remove_object(self, location, name):
+        """删除对象"""
+        parent = parent_prefix(name)
+        with self._lock:
+            entry = self._entries.get((*location, parent))
+            if entry is None:
+                return
+            entry['objects'] = [o for o in entry['objects'] if o['name'] != name]
+            if parent and not entry['objects'] and not entry['prefixes']:
+                # 目录已空（没有占位对象），上级目录中的前缀可能随之消失
+                self._entries.pop((*location, parent_prefix(parent)), None)
+
+    def add_prefix(self, location, prefix):
+        """新增子目录前缀（如创建文件夹、上传文件夹）"""
+        with self._lock:
+            self._add_ancestors(location, prefix)
+
+    def remove_prefix(self, location, prefix):
+        """删除子目录：移除该目录及其所有子目录的缓存，并从上级目录中去掉前缀"""
+        with self._lock:
+            for key in list(self._entries):
+                if key[:3] == tuple(location) and key[3].startswith(prefix):
+                    del self._entries[key]
+            entry = self._entries.get((*location, parent_prefix(prefix)))
+            if entry is not None:
+                entry['prefixes'] = [p for p in entry['prefixes'] if p != prefix]
+
+    def rename_object(self, location, old_name, new_name):
+        """对象重命名：沿用缓存中的元数据，移到新名称下"""
+        with self._lock:
+            entry = self._entries.get((*location, parent_prefix(old_name)))
+            obj = next((o for o in entry['objects'] if o['name'] == old_name), None) if entry else None
+        self.remove_object(location, old_name)
+        if obj is not None:
+            self.add_object(location, dict(obj, name=new_name))
+        else:
+            self.invalidate(location, parent_prefix(new_name))
+
+    def _add_ancestors(self, location, prefix):
+        """从 prefix 逐级向上，把子目录前缀补进已缓存的上级目录（调用方持有锁）"""
+        while prefix:
+            parent = parent_prefix(prefix)
+            entry = self._entries.get((*location, parent))
+            if entry is not None and prefix not in entry['prefixes']:
+                insort(entry['prefixes'], prefix)
+            prefix = parent
+
+
+class Prefetcher:
+    """后台预取子目录列举结果并写入缓存
+
+    使用独立的小线程池；should_yield 返回 True 时（例如有传输正在进行）跳过预取，
+    不与用户发起的传输争用并发。导航离开时调用 cancel() 丢弃尚未完成的预取。
+    预取请求不经过 with_retry：失败即放弃，遇到限流时暂停预取，也不通知调度器的并发控制。
+    """
+
+    def __init__(self, cache, max_workers=DEFAULT_PREFETCH_WORKERS, max_prefixes=DEFAULT_PREFETCH_COUNT,
+                 max_pages=DEFAULT_PREFETCH_MAX_PAGES, should_yield=None, page_size=DEFAULT_PAGE_SIZE):
+        self.cache = cache
+        self.max_prefixes = max_prefixes
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.should_yield = should_yield
+        self._paused_until = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._generation = 0
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def prefetch(self, backend, location, prefixes):
+        """预取前 max_prefixes 个子目录，location 为 (profile, namespace, bucket)"""
+        if self.paused():
+            return
+        with self._lock:
+            generation = self._generation
+            for prefix in prefixes[:self.max_prefixes]:
+                if self.cache.get((*location, prefix)) is None:
+                    self._futures.append(self._executor.submit(self._fetch, generation, backend, location, prefix))
+
+    def cancel(self):
+        """取消尚未完成的预取"""
+        with self._lock:
+            self._generation += 1
+            for future in self._futures:
+                future.cancel()
+            self._futures.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def paused(self):
+        """是否因限流暂停预取"""
+        return time.monotonic() < self._paused_until
+
+    def _cancelled(self, generation):
+        return (generation != self._generation or self.paused()
+                or (self.should_yield is not None and self.should_yield()))
+
+    def _fetch(self, generation, backend, location, prefix):
+        objects, prefixes, start = [], [], None
+        for _ in range(self.max_pages):
+            if self._cancelled(generation):
+                return
+            try:
+                page = backend.list_objects(location[1], location[2], prefix=prefix or None, start=start,
+                                            limit=self.page_size, delimiter='/')
+            except StorageError as e:
+                if e.throttled:
+                    self._paused_until = time.monotonic() + max(PREFETCH_THROTTLE_PAUSE, e.retry_after or 0)
+                return  # 预取失败不影响正常浏览
+            except Exception:
+                return
+            objects.extend(page['objects'])
+            prefixes.extend(page['prefixes'])
+            start = page.get('next_start_with')
+            if not start:
+                break
+        else:
+            return  # 子目录超过 max_pages 页，不再预取
+        if not self._cancelled(generation):
+            self.cache.put((*location, prefix), objects, prefixes)
@@ -4,75 +4,522 @@
 # -*- AI times -*-
 """
 Oracle OCI 对象存储 GUI 管理工具
-1.需预先安装并配置 OCI CLI
+1.需预先安装 OCI Python SDK（随 OCI CLI 一起安装），或 OCI CLI
 2.配置~/.oci/config文件
 """
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
-import subprocess
-import json
 import os
+import sys
 import threading
+from collections import deque
 from datetime import datetime
 import time
-import tempfile
 
-class ProgressDialog:
-    def __init__(self, parent, title, operation_type):
-        self.window = tk.Toplevel(parent)
-        self.window.title(title)
-        self.window.geometry("400x150")
-        self.window.resizable(False, False)
-        self.window.transient(parent)
-        self.window.grab_set()
+from backends import StorageError, get_backend
+from bufferpool import default_pool
+from buckets import catalog_key, default_catalog, discover_buckets, discover_namespace, search_buckets
+from compression import available_encodings, default_index
+from listing import ListingCache, Prefetcher, iter_list_pages
+from metrics import default_metrics
+from ratelimit import default_limiter, parse_schedule
+import retry
+from journal import JobJournal
+from session import load_session, load_snapshot, save_session, save_snapshot
+from scheduler import (CANCELLED, DONE, FAILED, PAUSED, PRIORITY_BULK, PRIORITY_INTERACTIVE, QUEUED, RUNNING,
+                       TransferScheduler)
+from sync import plan_sync, run_sync
+from transfer import (DEFAULT_WORKERS, MAX_WORKERS, TransferCancelled, TransferSummary, delete_object, delete_prefix,
+                      download_file, download_prefix, holding_slot, rename_object, rename_prefix, rollback_rename,
+                      run_pool, upload_file, upload_folder)
+
+JOB_STATE_TEXT = {QUEUED: "排队", RUNNING: "进行中", PAUSED: "已暂停", DONE: "完成", FAILED: "失败", CANCELLED: "已取消"}
+QUEUE_REFRESH_INTERVAL = 500  # 传输队列刷新间隔（毫秒）
+STATS_REFRESH_INTERVAL = 1000  # 统计窗口刷新间隔（毫秒）
+NO_COMPRESSION = "不压缩"
+OPERATION_TEXT = {'list': "列举", 'head': "查询", 'put': "上传", 'get': "下载", 'delete': "删除", 'copy': "复制",
+                  'rename': "重命名", 'multipart': "分段", 'bucket': "Bucket"}
+
+
+def _size_or_zero(path):
+    """文件大小，无法访问时返回 0（实际上传时再报告错误）"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class SyncOptionsDialog(simpledialog.Dialog):
+    """同步选项对话框"""
+
+    def __init__(self, parent, title):
+        self.delete_orphans = tk.BooleanVar(value=False)
+        self.full_scan = tk.BooleanVar(value=False)
+        self.result = None
+        super().__init__(parent, title)
+
+    def body(self, master):
+        ttk.Label(master, text="只上传新增或变化的文件").grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+        ttk.Checkbutton(master, text="删除远端多余的文件", variable=self.delete_orphans).grid(row=1, column=0, sticky=tk.W)
+        ttk.Checkbutton(master, text="重新扫描远端（忽略本地清单）", variable=self.full_scan).grid(row=2, column=0, sticky=tk.W)
+        return None
+
+    def apply(self):
+        self.result = (self.delete_orphans.get(), self.full_scan.get())
+
+
+class StatsWindow:
+    """调用统计窗口：各操作最近一分钟的延迟百分位、累计调用和错误数、当前吞吐量，定时刷新"""
+
+    def __init__(self, root, metrics, format_size):
+        self.metrics = metrics
+        self.format_size = format_size
+        self.window = tk.Toplevel(root)
+        self.window.title("调用统计")
+        self.window.geometry("820x460")
+
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ('操作', '调用', '错误', '限流', '数据量', '平均', 'p50', 'p95', 'p99')
+        self.tree = ttk.Treeview(frame, columns=columns, show='headings', height=9)
+        for col, width in zip(columns, (90, 70, 60, 60, 100, 80, 80, 80, 80)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor=tk.W if col == '操作' else tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.summary_var = tk.StringVar()
+        ttk.Label(frame, textvariable=self.summary_var).pack(fill=tk.X, pady=(5, 0))
+        self.pool_var = tk.StringVar()
+        ttk.Label(frame, textvariable=self.pool_var).pack(fill=tk.X, pady=(0, 5))
+
+        ttk.Label(frame, text="最近的错误:").pack(anchor=tk.W)
+        self.errors = tk.Listbox(frame, height=6)
+        self.errors.pack(fill=tk.BOTH, expand=True)
+
+        buttons = ttk.Frame(frame)
+        buttons.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(buttons, text="导出...", command=self.export).pack(side=tk.LEFT, padx=(0, 5))
+        self.tracing = tk.BooleanVar(value=metrics.tracing)
+        ttk.Checkbutton(buttons, text="记录每次调用到文件", variable=self.tracing,
+                        command=self.toggle_trace).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(buttons, text="重置", command=self.metrics.reset).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(buttons, text="关闭", command=self.window.destroy).pack(side=tk.RIGHT)
+
+        self._refresh()
+
+    def exists(self):
+        return bool(self.window.winfo_exists())
+
+    def _refresh(self):
+        if not self.exists():
+            return
 
-        # 居中显示
-        self.window.geometry("+%d+%d" % (parent.winfo_rootx() + 50, parent.winfo_rooty() + 50))
+        def milliseconds(value):
+            return f"{value * 1000:.0f} ms" if value is not None else "-"
+
+        snapshot = self.metrics.snapshot()
+        self.tree.delete(*self.tree.get_children())
+        for operation, stats in snapshot.items():
+            self.tree.insert('', 'end', values=(
+                OPERATION_TEXT.get(operation, operation), stats['calls'], stats['errors'], stats['throttled'],
+                self.format_size(stats['bytes']), milliseconds(stats['mean']), milliseconds(stats['p50']),
+                milliseconds(stats['p95']), milliseconds(stats['p99'])))
+
+        upload, download = self.metrics.throughput()
+        retries, throttled, exhausted = retry.stats.snapshot()
+        self.summary_var.set(f"当前上传: {self.format_size(upload)}/s   下载: {self.format_size(download)}/s   "
+                             f"累计发送: {self.format_size(self.metrics.bytes_sent)}   "
+                             f"接收: {self.format_size(self.metrics.bytes_received)}   "
+                             f"重试: {retries}（限流 {throttled}，放弃 {exhausted}）")
+        pool = default_pool().snapshot()
+        self.pool_var.set(f"传输缓冲: {self.format_size(pool['in_use'])} / {self.format_size(pool['budget'])}   "
+                          f"峰值: {self.format_size(pool['peak'])}   已分配: {self.format_size(pool['allocated'])}   "
+                          f"等待内存: {pool['waits']} 次（共 {pool['wait_seconds']:.1f} 秒）")
+
+        errors = [f"{datetime.fromtimestamp(when):%H:%M:%S}  {OPERATION_TEXT.get(operation, operation)}  {message}"
+                  for when, operation, message in reversed(self.metrics.recent_errors)]
+        if list(self.errors.get(0, tk.END)) != errors:
+            self.errors.delete(0, tk.END)
+            self.errors.insert(tk.END, *errors)
+
+        self.window.after(STATS_REFRESH_INTERVAL, self._refresh)
+
+    def export(self):
+        path = filedialog.asksaveasfilename(parent=self.window, title="导出统计", defaultextension=".jsonl",
+                                            filetypes=[("JSON Lines", "*.jsonl"), ("所有文件", "*.*")])
+        if path:
+            try:
+                self.metrics.export(path)
+            except OSError as e:
+                messagebox.showerror("错误", f"导出失败: {e}", parent=self.window)
+
+    def toggle_trace(self):
+        """开始或停止把每次调用记录到 JSON Lines 文件"""
+        if not self.tracing.get():
+            self.metrics.set_trace(None)
+            return
+        path = filedialog.asksaveasfilename(parent=self.window, title="记录调用到文件", defaultextension=".jsonl",
+                                            filetypes=[("JSON Lines", "*.jsonl"), ("所有文件", "*.*")])
+        try:
+            if path:
+                self.metrics.set_trace(path)
+        except OSError as e:
+            messagebox.showerror("错误", f"无法打开文件: {e}", parent=self.window)
+            path = None
+        if not path:
+            self.tracing.set(False)
+
+
+class BucketPicker:
+    """Bucket 浏览窗口：并发列出 compartment 树中的全部 bucket，支持本地搜索
+
+    先显示本地缓存的列表（有缓存时无需等待网络），缓存过期或点击刷新时在后台重新遍历。
+    """
+
+    def __init__(self, root, profile, compartment, on_select):
+        self.profile = profile
+        self.key = catalog_key(profile)
+        self.compartment = compartment  # 遍历的根 compartment，空字符串为整个租户
+        self.on_select = on_select
+        self.catalog = default_catalog()
+        self.buckets = []
+        self.shown = []
+        self.cancel_event = None
+        self.window = tk.Toplevel(root)
+        self.window.title(f"浏览 Bucket - {profile}")
+        self.window.geometry("760x480")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        search_frame = ttk.Frame(frame)
+        search_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(search_frame, text="搜索:").pack(side=tk.LEFT, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self._filter())
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind('<Return>', lambda event: self.open())
+        search_entry.focus_set()
+
+        columns = ('Bucket', 'Compartment', '创建时间')
+        tree_frame = ttk.Frame(frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show='headings', selectmode='browse')
+        for col, width in zip(columns, (240, 320, 150)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind('<Double-1>', lambda event: self.open())
 
-        self.operation_type = operation_type
-        self.cancelled = False
+        self.status_var = tk.StringVar()
+        ttk.Label(frame, textvariable=self.status_var).pack(fill=tk.X, pady=5)
+
+        buttons = ttk.Frame(frame)
+        buttons.pack(fill=tk.X)
+        ttk.Button(buttons, text="刷新", command=self.refresh).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(buttons, text="关闭", command=self.close).pack(side=tk.RIGHT)
+        ttk.Button(buttons, text="打开", command=self.open).pack(side=tk.RIGHT, padx=(0, 5))
+
+        entry = self.catalog.buckets(self.key, compartment)
+        if entry is not None:
+            self._show(entry)
+        if not self.catalog.is_fresh(entry):
+            self.refresh()
+
+    def exists(self):
+        return bool(self.window.winfo_exists())
+
+    def _show(self, entry):
+        self.buckets = entry['buckets']
+        self._filter()
+        text = (f"共 {len(self.buckets)} 个 bucket，"
+                f"{datetime.fromtimestamp(entry['time']):%Y-%m-%d %H:%M} 更新")
+        if entry.get('errors'):
+            text += f"，{len(entry['errors'])} 个 compartment 无法列举: {entry['errors'][0]}"
+        self.status_var.set(text)
+
+    def _filter(self):
+        self.shown = search_buckets(self.buckets, self.search_var.get())
+        self.tree.delete(*self.tree.get_children())
+        for index, bucket in enumerate(self.shown):
+            self.tree.insert('', tk.END, iid=str(index), values=(
+                bucket['name'], bucket['compartment'] or "(根)", (bucket.get('time-created') or "")[:16]))
+        if self.shown:
+            self.tree.selection_set('0')
+
+    def refresh(self):
+        """在后台重新遍历 compartment 树"""
+        if self.cancel_event is not None:
+            return
+        self.cancel_event = threading.Event()
+        self.status_var.set("正在列出 bucket...")
+        threading.Thread(target=self._discover_thread, args=(self.cancel_event,), daemon=True).start()
 
-        # 创建界面
-        main_frame = ttk.Frame(self.window, padding="20")
-        main_frame.pack(fill=tk.BOTH, expand=True)
-
-        # 文件名显示
-        self.file_label = ttk.Label(main_frame, text="准备中...", wraplength=350)
-        self.file_label.pack(pady=(0, 10))
-
-        # 进度条
-        self.progress = ttk.Progressbar(main_frame, length=350, mode='determinate')
-        self.progress.pack(pady=(0, 10))
-
-        # 进度信息
-        self.info_label = ttk.Label(main_frame, text="0%")
-        self.info_label.pack(pady=(0, 10))
-
-        # 取消按钮
-        self.cancel_btn = ttk.Button(main_frame, text="取消", command=self.cancel)
-        self.cancel_btn.pack()
-
-        # 协议关闭窗口
-        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
-
-    def update_progress(self, filename, progress_percent, speed_info=""):
-        if not self.cancelled:
-            self.file_label.config(text=f"{self.operation_type}: {os.path.basename(filename)}")
-            self.progress['value'] = progress_percent
-            info_text = f"{progress_percent:.1f}%"
-            if speed_info:
-                info_text += f" - {speed_info}"
-            self.info_label.config(text=info_text)
-            self.window.update()
-
-    def cancel(self):
-        self.cancelled = True
-        self.window.destroy()
+    def _discover_thread(self, cancel_event):
+        def progress(compartments, buckets):
+            if not cancel_event.is_set():
+                self.window.after(0, self.status_var.set,
+                                  f"已列举 {compartments} 个 compartment，发现 {buckets} 个 bucket...")
+
+        entry, error = None, None
+        try:
+            backend = get_backend(self.profile)
+            namespace = discover_namespace(backend, self.key)
+            root_id = self.compartment or backend.tenancy_id()
+            if not root_id:
+                raise StorageError("无法确定租户 OCID，请在 Compartment 中填写要浏览的 compartment")
+            buckets, errors = discover_buckets(backend, namespace, root_id, cancel_event=cancel_event,
+                                               on_progress=progress)
+            entry = {'buckets': buckets, 'time': time.time(), 'errors': errors}
+            self.catalog.set_buckets(self.key, self.compartment, buckets, errors)
+        except TransferCancelled:
+            pass
+        except StorageError as e:
+            error = f"列出 bucket 失败: {e}"
+        except Exception as e:
+            error = f"列出 bucket 失败: {e}" if entry is None else f"已列出 bucket，但无法保存缓存: {e}"
+        finally:
+            # 无论成功与否都要复位，否则刷新按钮失效；窗口已关闭时不再回调
+            if not cancel_event.is_set():
+                self.window.after(0, self._discover_done, entry, error)
+
+    def _discover_done(self, entry, error):
+        self.cancel_event = None
+        if entry is not None:
+            self._show(entry)
+        if error:
+            self.status_var.set(error)
+
+    def open(self):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        bucket = self.shown[int(selection[0])]
+        self.close()
+        self.on_select(bucket)
 
     def close(self):
-        if not self.cancelled:
-            self.window.destroy()
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.window.destroy()
+
+
+class FileListView:
+    """文件列表视图：分批插入Treeview，超大目录时切换为虚拟列表，只保留可见行"""
+
+    BATCH_TIME_BUDGET = 0.015  # 每批插入最多占用Tk线程的时间（秒）
+    VIRTUAL_THRESHOLD = 5000  # 超过该行数时启用虚拟列表
+    DEFAULT_ROW_HEIGHT = 20
+
+    def __init__(self, root, tree, scrollbar):
+        self.root = root
+        self.tree = tree
+        self.scrollbar = scrollbar
+
+        self.parent_row = None  # ".."行
+        self.folders = []
+        self.files = []
+        self.virtual = False
+
+        self._pending = deque()  # 等待插入的 (是否文件夹, 行)
+        self._drain_job = None
+        self._folder_index = 0  # 下一个文件夹行的插入位置
+        self._rows_by_item = {}  # Treeview item -> 行
+        self._offset = 0  # 虚拟模式下第一可见行
+        self._selected = set()  # 虚拟模式下按名称记录选中项
+        self._rendering = False
+
+        self.tree.configure(yscrollcommand=self._on_tree_yview)
+        self.scrollbar.configure(command=self._on_scrollbar)
+        self.tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+        self.tree.bind('<Button-1>', self._on_click, add='+')
+        self.tree.bind('<Configure>', lambda e: self.virtual and self._render(), add='+')
+        self.tree.bind('<MouseWheel>', self._on_mousewheel, add='+')
+        self.tree.bind('<Button-4>', self._on_mousewheel, add='+')
+        self.tree.bind('<Button-5>', self._on_mousewheel, add='+')
+
+    def __len__(self):
+        return (1 if self.parent_row else 0) + len(self.folders) + len(self.files)
+
+    def clear(self, show_parent=False):
+        """清空列表"""
+        if self._drain_job:
+            self.root.after_cancel(self._drain_job)
+            self._drain_job = None
+        self._pending.clear()
+        self._rows_by_item.clear()
+        self._selected.clear()
+        self.folders, self.files = [], []
+        self.virtual = False
+        self._offset = 0
+        self.tree.delete(*self.tree.get_children())
+
+        self.parent_row = ("..", "", "", "文件夹") if show_parent else None
+        self._folder_index = 0
+        if self.parent_row:
+            self._insert(self.parent_row, 'end')
+            self._folder_index = 1
+
+    def add(self, folder_rows, file_rows):
+        """追加一批行，分时插入，不阻塞界面"""
+        self.folders.extend(folder_rows)
+        self.files.extend(file_rows)
+
+        if self.virtual:
+            self._render()
+            return
+        if len(self) > self.VIRTUAL_THRESHOLD:
+            self._switch_to_virtual()
+            return
+
+        self._pending.extend((True, row) for row in folder_rows)
+        self._pending.extend((False, row) for row in file_rows)
+        if not self._drain_job:
+            self._drain_job = self.root.after(0, self._drain)
+
+    def selected_rows(self):
+        """返回选中的行 (名称, 大小, 修改时间, 类型)"""
+        if self.virtual:
+            return [row for row in self._iter_rows() if row[0] in self._selected]
+        return [self._rows_by_item[item] for item in self.tree.selection() if item in self._rows_by_item]
+
+    def _insert(self, row, index):
+        item = self.tree.insert('', index, values=row)
+        self._rows_by_item[item] = row
+        return item
+
+    def _drain(self):
+        """在时间片内插入尽可能多的行，剩余的留到下一次调度"""
+        deadline = time.perf_counter() + self.BATCH_TIME_BUDGET
+        while self._pending and time.perf_counter() < deadline:
+            is_folder, row = self._pending.popleft()
+            if is_folder:
+                self._insert(row, self._folder_index)
+                self._folder_index += 1
+            else:
+                self._insert(row, 'end')
+        self._drain_job = self.root.after(1, self._drain) if self._pending else None
+
+    def _iter_rows(self):
+        if self.parent_row:
+            yield self.parent_row
+        yield from self.folders
+        yield from self.files
+
+    def _row(self, index):
+        if self.parent_row:
+            if index == 0:
+                return self.parent_row
+            index -= 1
+        if index < len(self.folders):
+            return self.folders[index]
+        return self.files[index - len(self.folders)]
+
+    def _switch_to_virtual(self):
+        """切换为虚拟列表：删除已插入的行，只渲染可见窗口"""
+        if self._drain_job:
+            self.root.after_cancel(self._drain_job)
+            self._drain_job = None
+        self._pending.clear()
+        self._selected = {row[0] for row in self.selected_rows()}
+        self._rows_by_item.clear()
+        self.tree.delete(*self.tree.get_children())
+        self.virtual = True
+        self._render()
+
+    def _visible_count(self):
+        """根据Treeview当前高度计算可见行数"""
+        children = self.tree.get_children()
+        row_height, header = self.DEFAULT_ROW_HEIGHT, self.DEFAULT_ROW_HEIGHT
+        bbox = self.tree.bbox(children[0]) if children else None
+        if bbox:
+            header, row_height = bbox[1], bbox[3]
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget('height'))
+        return max(1, (height - header) // max(1, row_height))
+
+    def _render(self):
+        """把 [offset, offset+可见行数) 的行写入复用的Treeview项目"""
+        total = len(self)
+        count = min(self._visible_count(), total)
+        self._offset = max(0, min(self._offset, total - count))
+
+        self._rendering = True
+        try:
+            items = list(self.tree.get_children())
+            while len(items) > count:
+                self.tree.delete(items.pop())
+            while len(items) < count:
+                items.append(self.tree.insert('', 'end'))
+
+            self._rows_by_item.clear()
+            selected = []
+            for position, item in enumerate(items):
+                row = self._row(self._offset + position)
+                self.tree.item(item, values=row)
+                self._rows_by_item[item] = row
+                if row[0] in self._selected:
+                    selected.append(item)
+            self.tree.selection_set(selected)
+        finally:
+            self._rendering = False
+
+        if total:
+            self.scrollbar.set(self._offset / total, (self._offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll_to(self, offset):
+        self._offset = offset
+        self._render()
+
+    def _on_tree_yview(self, first, last):
+        if not self.virtual:
+            self.scrollbar.set(first, last)
+
+    def _on_scrollbar(self, *args):
+        if not self.virtual:
+            self.tree.yview(*args)
+            return
+        count = self._visible_count()
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * len(self)))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (count if args[2] == 'pages' else 1)
+            self._scroll_to(self._offset + step)
+
+    def _on_mousewheel(self, event):
+        if not self.virtual:
+            return None
+        if event.num == 4 or event.delta > 0:
+            self._scroll_to(self._offset - 3)
+        else:
+            self._scroll_to(self._offset + 3)
+        return "break"
+
+    def _on_click(self, event):
+        # 虚拟模式下单击（无Ctrl/Shift）会替换选择，清除不可见的已选项
+        if self.virtual and not event.state & 0x0005:
+            self._selected.clear()
+
+    def _on_select(self, event=None):
+        if not self.virtual or self._rendering:
+            return
+        selection = set(self.tree.selection())
+        for item, row in self._rows_by_item.items():
+            if item in selection:
+                self._selected.add(row[0])
+            else:
+                self._selected.discard(row[0])
+
 
 class OCIStorageGUI:
     def __init__(self, root):
@@ -87,12 +534,37 @@ class OCIStorageGUI:
         self.current_bucket = tk.StringVar()
         self.current_path = ""  # 当前路径
         self.is_navigating = False  # 新增：导航锁
+        self._listing_generation = 0  # 列举代次，导航后丢弃旧目录的结果
+        self._current_listing = None  # 当前目录最近一次完整的列举结果 (location, prefix, objects, prefixes)
+        self.listing_cache = ListingCache()  # 目录列举缓存
+        self.prefetch_enabled = tk.BooleanVar(value=True)  # 是否预取子目录
+        self.worker_count = tk.IntVar(value=DEFAULT_WORKERS)  # 所有传输共享的并发数
+        self.compression = tk.StringVar(value=NO_COMPRESSION)  # 上传时的压缩算法
+        self.scheduler = TransferScheduler(DEFAULT_WORKERS)  # 传输队列，预取会为传输让路
+        self.worker_count.trace_add('write', lambda *args: self.scheduler.set_limit(self._get_worker_count()))
+        self.adaptive_concurrency = tk.BooleanVar(value=True)  # 按吞吐量和限流自动调整并发
+        self.adaptive_concurrency.trace_add('write',
+                                            lambda *args: self.scheduler.set_adaptive(self.adaptive_concurrency.get()))
+        self.prefetcher = Prefetcher(self.listing_cache, should_yield=self.scheduler.busy)
+        self._journal_lock = threading.Lock()  # 新建任务日志与检查中断任务互斥，新日志不会被误认为中断
+        self._checked_job_locations = set()  # 本次运行中已检查过中断任务的 bucket
+        self.stats_window = None
+        self.bucket_picker = None
+        self.upload_limit = tk.IntVar(value=0)  # 上传限速 KB/s，0 为不限速
+        self.download_limit = tk.IntVar(value=0)  # 下载限速 KB/s
+        self.offpeak_enabled = tk.BooleanVar(value=False)  # 不限速时段是否启用
+        self.offpeak_window = tk.StringVar(value="22:00-07:00")
+        for var in (self.upload_limit, self.download_limit, self.offpeak_enabled, self.offpeak_window):
+            var.trace_add('write', lambda *args: self._apply_bandwidth_limits())
 
         # 创建界面
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        # 初始化配置
-        self.load_profiles()
+        # 恢复上次的会话并立即显示目录快照；读取配置文件、检查中断的任务和创建后端客户端推迟到窗口显示之后
+        restored, snapshot = self._restore_session()
+        self._refresh_queue()
+        self.root.after_idle(self._finish_startup, restored, snapshot)
 
     def create_widgets(self):
         # 主框架
@@ -113,6 +585,8 @@ class OCIStorageGUI:
         ttk.Label(config_frame, text="Compartment:").grid(row=0, column=2, sticky=tk.W, padx=(0, 5))
         self.compartment_entry = ttk.Entry(config_frame, textvariable=self.current_compartment, width=20)
         self.compartment_entry.grid(row=0, column=3, sticky=(tk.W, tk.E), padx=(0, 10))
+        ttk.Button(config_frame, text="浏览 Bucket...", command=self.browse_buckets).grid(row=0, column=4,
+                                                                                       padx=(10, 0))
 
         # Namespace输入
         ttk.Label(config_frame, text="Namespace:").grid(row=1, column=0, sticky=tk.W, padx=(0, 5))
@@ -139,6 +613,7 @@ class OCIStorageGUI:
 
         ttk.Button(nav_frame, text="返回上级", command=self.go_up).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(nav_frame, text="根目录", command=self.go_root).pack(side=tk.LEFT)
+        ttk.Checkbutton(nav_frame, text="预取子目录", variable=self.prefetch_enabled).pack(side=tk.LEFT, padx=(10, 0))
 
         # 操作按钮区域
         button_frame = ttk.Frame(main_frame)
@@ -146,15 +621,24 @@ class OCIStorageGUI:
 
         ttk.Button(button_frame, text="上传文件", command=self.upload_file).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(button_frame, text="上传文件夹", command=self.upload_folder).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="同步文件夹", command=self.sync_folder).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(button_frame, text="创建文件夹", command=self.create_folder).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(button_frame, text="刷新", command=self.refresh_files).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="刷新", command=lambda: self.refresh_files(force=True)).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(button_frame, text="下载", command=self.download_file).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(button_frame, text="重命名", command=self.rename_file).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(button_frame, text="删除", command=self.delete_file).pack(side=tk.LEFT, padx=(0, 5))
 
+        ttk.Button(button_frame, text="统计", command=self.show_stats).pack(side=tk.RIGHT, padx=(10, 0))
+        ttk.Spinbox(button_frame, from_=1, to=MAX_WORKERS, textvariable=self.worker_count, width=4).pack(side=tk.RIGHT)
+        ttk.Label(button_frame, text="并发数:").pack(side=tk.RIGHT, padx=(0, 5))
+        ttk.Combobox(button_frame, textvariable=self.compression, values=[NO_COMPRESSION] + available_encodings(),
+                     state='readonly', width=6).pack(side=tk.RIGHT, padx=(0, 10))
+        ttk.Label(button_frame, text="上传压缩:").pack(side=tk.RIGHT, padx=(0, 5))
+
         # 文件列表区域
         list_frame = ttk.LabelFrame(main_frame, text="文件列表", padding="5")
         list_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        self.list_frame = list_frame
 
         # 创建Treeview，支持多选
         columns = ('名称', '大小', '修改时间', '类型')
@@ -175,17 +659,53 @@ class OCIStorageGUI:
         self.file_tree.bind('<Double-1>', self.on_double_click)
 
         # 添加滚动条
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.file_tree.yview)
-        self.file_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        self.file_list = FileListView(self.root, self.file_tree, scrollbar)
 
         self.file_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
 
+        # 传输队列
+        queue_frame = ttk.LabelFrame(main_frame, text="传输队列", padding="5")
+        queue_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+
+        queue_columns = ('任务', '状态', '进度', '速度', '剩余')
+        self.queue_tree = ttk.Treeview(queue_frame, columns=queue_columns, show='headings', height=4,
+                                       selectmode='extended')
+        for col, width in zip(queue_columns, (380, 160, 120, 120, 80)):
+            self.queue_tree.heading(col, text=col)
+            self.queue_tree.column(col, width=width, stretch=(col == '任务'))
+        self.queue_tree.grid(row=0, column=0, sticky=(tk.W, tk.E))
+
+        queue_buttons = ttk.Frame(queue_frame)
+        queue_buttons.grid(row=0, column=1, sticky=tk.N, padx=(10, 0))
+        ttk.Button(queue_buttons, text="暂停", command=lambda: self._control_jobs('pause')).pack(fill=tk.X)
+        ttk.Button(queue_buttons, text="继续", command=lambda: self._control_jobs('resume')).pack(fill=tk.X)
+        ttk.Button(queue_buttons, text="取消", command=lambda: self._control_jobs('cancel')).pack(fill=tk.X)
+        ttk.Button(queue_buttons, text="清除已完成", command=self.scheduler.clear_finished).pack(fill=tk.X)
+
+        # 限速设置，修改后对进行中的传输立即生效
+        limit_frame = ttk.Frame(queue_frame)
+        limit_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        ttk.Label(limit_frame, text="上传限速:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(limit_frame, from_=0, to=1024 * 1024, increment=128, textvariable=self.upload_limit,
+                    width=8).pack(side=tk.LEFT)
+        ttk.Label(limit_frame, text="KB/s   下载限速:").pack(side=tk.LEFT, padx=(5, 5))
+        ttk.Spinbox(limit_frame, from_=0, to=1024 * 1024, increment=128, textvariable=self.download_limit,
+                    width=8).pack(side=tk.LEFT)
+        ttk.Label(limit_frame, text="KB/s (0 为不限速)").pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Checkbutton(limit_frame, text="不限速时段:", variable=self.offpeak_enabled).pack(side=tk.LEFT)
+        ttk.Entry(limit_frame, textvariable=self.offpeak_window, width=12).pack(side=tk.LEFT, padx=(5, 0))
+        self.concurrency_var = tk.StringVar()
+        ttk.Label(limit_frame, textvariable=self.concurrency_var).pack(side=tk.RIGHT)
+        ttk.Checkbutton(limit_frame, text="自适应并发", variable=self.adaptive_concurrency).pack(side=tk.RIGHT,
+                                                                                          padx=(0, 10))
+
         # 状态栏
         self.status_var = tk.StringVar()
         self.status_var.set("就绪")
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        status_bar.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E))
 
         # 配置网格权重
         self.root.columnconfigure(0, weight=1)
@@ -194,77 +714,252 @@ class OCIStorageGUI:
         main_frame.rowconfigure(3, weight=1)
         list_frame.columnconfigure(0, weight=1)
         list_frame.rowconfigure(0, weight=1)
+        queue_frame.columnconfigure(0, weight=1)
         config_frame.columnconfigure(3, weight=1)
         nav_frame.columnconfigure(1, weight=1)
 
-    def run_oci_command(self, command):
-        """执行OCI CLI命令"""
+    def get_backend(self):
+        """获取当前profile的存储后端（每个profile复用同一个客户端）"""
+        return get_backend(self.current_profile.get() or 'DEFAULT')
+
+    def _cache_location(self):
+        """列举缓存键的前三项 (profile, namespace, bucket)"""
+        return (self.current_profile.get() or 'DEFAULT', self.current_namespace.get(), self.current_bucket.get())
+
+    def _submit_job(self, title, target, *args, priority=PRIORITY_BULK):
+        """把传输加入队列，target(job, *args) 在调度器的后台线程中执行"""
+        return self.scheduler.submit(title, target, *args, priority=priority)
+
+    def _resume_job(self, title, target, journal, *args, priority=PRIORITY_BULK):
+        """提交使用已有任务日志的任务（继续、回滚或放弃），任务结束前该日志不会再被当作中断的任务"""
+        job = self._submit_job(title, target, *args, priority=priority)
+        job.journal_id = journal.id
+        return job
+
+    def _create_journal(self, job, kind, location, params):
+        """为任务新建任务日志并记在任务上"""
+        with self._journal_lock:
+            journal = JobJournal.create(kind, location, params)
+            job.journal_id = journal.id
+        return journal
+
+    def _get_compression(self):
+        """上传时使用的压缩算法，不压缩时返回 None"""
+        encoding = self.compression.get()
+        return encoding if encoding != NO_COMPRESSION else None
+
+    def _get_worker_count(self):
+        """读取并发数设置，输入无效时使用默认值"""
         try:
-            # Suppress API key warning
-            env = os.environ.copy()
-            env["SUPPRESS_LABEL_WARNING"] = "True"
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=300, env=env)
-            if result.returncode == 0:
-                return True, result.stdout
+            return max(1, min(int(self.worker_count.get()), MAX_WORKERS))
+        except (tk.TclError, ValueError):
+            return DEFAULT_WORKERS
+
+    def _refresh_queue(self):
+        """定时把各任务的状态、进度和实时速度刷新到传输队列"""
+        jobs = list(self.scheduler.jobs)
+        shown = set(self.queue_tree.get_children())
+        for job in jobs:
+            done, total, done_bytes, total_bytes, _, current = job.tracker.snapshot()
+            byte_rate, item_rate = job.rate()
+            state = job.state
+            status = JOB_STATE_TEXT[state]
+            if job.message and state in (DONE, FAILED, CANCELLED):
+                status += f": {job.message}"
+            elif current and state == RUNNING:
+                status += f": {os.path.basename(current.rstrip('/'))}"
+            if total_bytes or done_bytes:
+                speed = f"{self._format_size(byte_rate)}/s"
             else:
-                return False, result.stderr
-        except subprocess.TimeoutExpired:
-            return False, "命令执行超时"
-        except Exception as e:
-            return False, str(e)
-
-    def run_oci_command_with_progress(self, command, progress_dialog, file_path):
-        """执行带进度的OCI CLI命令"""
-        try:
-            # 启动子进程
-            process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE, text=True)
-
-            # 获取文件大小用于计算进度
-            file_size = 0
-            if os.path.exists(file_path):
-                file_size = os.path.getsize(file_path)
-
-            start_time = time.time()
-
-            # 模拟进度更新（因为OCI CLI没有内置进度输出）
-            while process.poll() is None:
-                if progress_dialog.cancelled:
-                    process.terminate()
-                    return False, "操作已取消"
-
-                elapsed_time = time.time() - start_time
-                # 估算进度（基于时间的粗略估计）
-                estimated_progress = min(90, elapsed_time * 10)  # 每秒增加10%，最多90%
-
-                speed_info = ""
-                if file_size > 0 and elapsed_time > 0:
-                    estimated_speed = (file_size * estimated_progress / 100) / elapsed_time / 1024 / 1024  # MB/s
-                    speed_info = f"{estimated_speed:.1f} MB/s"
-
-                progress_dialog.update_progress(file_path, estimated_progress, speed_info)
-                time.sleep(0.5)
-
-            # 获取结果
-            stdout, stderr = process.communicate()
-
-            if process.returncode == 0:
-                progress_dialog.update_progress(file_path, 100, "完成")
-                time.sleep(0.5)  # 让用户看到100%
-                return True, stdout
+                speed = f"{item_rate:.1f} 项/秒"
+            eta = job.tracker.eta() if state == RUNNING else None
+            if job.tracker.discovering:
+                progress = f"{done}/已发现 {total}"  # 仍在遍历或列举，总数会继续增加
+            else:
+                progress = f"{done}/{total} ({job.tracker.percent():.0f}%)"
+            values = (job.title, status, progress,
+                      speed if state == RUNNING else "", f"{int(eta) // 60}:{int(eta) % 60:02d}" if eta else "")
+            iid = str(job.id)
+            if iid in shown:
+                self.queue_tree.item(iid, values=values)
+                shown.discard(iid)
             else:
-                return False, stderr
+                self.queue_tree.insert('', tk.END, iid=iid, values=values)
+        for iid in shown:
+            self.queue_tree.delete(iid)
+
+        retries, throttled, exhausted = retry.stats.snapshot()
+        text = f"并发: {self.scheduler.current_limit}/{self.scheduler.limit}   重试: {retries} (限流 {throttled})"
+        if exhausted:
+            text += f", 放弃 {exhausted}"
+        self.concurrency_var.set(text)
+        self.root.after(QUEUE_REFRESH_INTERVAL, self._refresh_queue)
+
+    def _apply_bandwidth_limits(self):
+        """把限速设置应用到共用的限速器，输入不完整时保留原设置"""
+        limiter = default_limiter()
+        for var, direction in ((self.upload_limit, 'upload_rate'), (self.download_limit, 'download_rate')):
+            try:
+                limiter.set_rates(**{direction: max(0, int(var.get())) * 1024})
+            except (tk.TclError, ValueError):
+                pass
+        if not self.offpeak_enabled.get():
+            limiter.set_schedule(None)
+            return
+        try:
+            limiter.set_schedule(parse_schedule(self.offpeak_window.get()))
+        except ValueError:
+            limiter.set_schedule(None)
+
+    def _control_jobs(self, action):
+        """对传输队列中选中的任务执行暂停、继续或取消"""
+        selected = set(self.queue_tree.selection())
+        for job in list(self.scheduler.jobs):
+            if str(job.id) in selected and job.finished is None:
+                getattr(job, action)()
+
+    def _finish_job(self, job, summary):
+        """把批量操作结果记录到任务上，显示在传输队列中"""
+        job.failed = bool(summary.failed)
+        job.message = f"成功 {summary.succeeded}/{summary.total}"
+        if summary.skipped:
+            job.message += f", 跳过 {summary.skipped}"
+
+    def _show_summary(self, title, summary):
+        """显示批量操作结果，有失败项时列出失败详情"""
+        self._set_status_with_timeout(f"{title}完成: 成功 {summary.succeeded}/{summary.total}")
+        if summary.failed:
+            messagebox.showwarning(title, summary.text())
+
+    def show_stats(self):
+        """打开调用统计窗口，已打开时切换到前台"""
+        if self.stats_window is not None and self.stats_window.exists():
+            self.stats_window.window.lift()
+            return
+        self.stats_window = StatsWindow(self.root, default_metrics(), self._format_size)
 
-        except Exception as e:
-            return False, str(e)
+    def browse_buckets(self):
+        """打开 bucket 浏览窗口，Compartment 为空时浏览整个租户"""
+        if self.bucket_picker is not None and self.bucket_picker.exists():
+            self.bucket_picker.window.lift()
+            return
+        self.bucket_picker = BucketPicker(self.root, self.current_profile.get() or 'DEFAULT',
+                                          self.current_compartment.get().strip(), self._open_bucket)
+
+    def _open_bucket(self, bucket):
+        """连接到浏览窗口中选中的 bucket"""
+        self.current_namespace.set(bucket['namespace'])
+        self.current_bucket.set(bucket['name'])
+        self.connect_to_bucket()
+
+    def _fill_namespace(self, connect=False):
+        """自动填写当前 profile 的 namespace：优先使用本地缓存，否则在后台获取；connect 时获取后继续连接"""
+        profile = self.current_profile.get() or 'DEFAULT'
+        namespace = default_catalog().namespace(catalog_key(profile))
+        if namespace:
+            self.current_namespace.set(namespace)
+            if connect:
+                self.connect_to_bucket()
+            return
+        self.status_var.set("正在获取 namespace...")
+        threading.Thread(target=self._fill_namespace_thread, args=(profile, connect), daemon=True).start()
+
+    def _fill_namespace_thread(self, profile, connect):
+        try:
+            namespace = discover_namespace(get_backend(profile), catalog_key(profile))
+        except StorageError as e:
+            error = str(e)
+            if connect:
+                self.root.after(0, lambda: messagebox.showerror("错误", f"获取 namespace 失败: {error}"))
+            self.root.after(0, lambda: self._set_status_with_timeout(f"获取 namespace 失败: {error}"))
+            return
+        self.root.after(0, self._namespace_filled, profile, namespace, connect)
+
+    def _namespace_filled(self, profile, namespace, connect):
+        if profile != (self.current_profile.get() or 'DEFAULT'):
+            return  # 获取期间又切换了 profile
+        self.current_namespace.set(namespace)
+        if connect:
+            self.connect_to_bucket()
+        else:
+            self._set_status_with_timeout(f"Namespace: {namespace}")
 
     def _set_status_with_timeout(self, message):
         """设置状态栏消息并在3秒后恢复为'就绪'"""
         self.status_var.set(message)
         self.root.after(3000, lambda: self.status_var.set("就绪"))
 
+    def _restore_session(self):
+        """恢复上次的 profile、compartment、namespace、bucket、路径和列宽
+
+        有与该位置一致的目录快照时立即显示并标记为未验证。返回 (是否恢复了 bucket, 快照或 None)。
+        """
+        state = load_session()
+        self.current_profile.set(state.get('profile', ''))
+        self.current_compartment.set(state.get('compartment', ''))
+        self.current_namespace.set(state.get('namespace', ''))
+        self.current_bucket.set(state.get('bucket', ''))
+        for column, width in (state.get('columns') or {}).items():
+            try:
+                self.file_tree.column(column, width=int(width))
+            except (tk.TclError, ValueError):
+                pass
+        if state.get('geometry'):
+            self.root.geometry(state['geometry'])
+        if not (self.current_namespace.get() and self.current_bucket.get()):
+            return False, None
+
+        self.current_path = state.get('path', '')
+        self.update_path_display()
+        snapshot = load_snapshot(self._cache_location(), self.current_path)
+        if snapshot is None:
+            return True, None
+        saved = datetime.fromtimestamp(snapshot['saved']).strftime('%Y-%m-%d %H:%M') if snapshot['saved'] else ""
+        self.list_frame.configure(text=f"文件列表（{saved} 的快照，正在验证...）")
+        self._update_file_list(snapshot)
+        return True, snapshot
+
+    def _finish_startup(self, restored, snapshot):
+        """窗口显示后再做的初始化：读取 profiles、提示中断的任务，恢复了会话时在后台重新列举验证快照"""
+        self.load_profiles()
+        self._notify_pending_jobs()
+        if restored:
+            self.status_var.set("正在连接上次的 bucket...")
+            self.refresh_files(connecting=True, snapshot=snapshot)
+        elif not self.current_namespace.get():
+            self._fill_namespace()  # 获取 namespace 时顺带创建后端客户端
+        else:
+            # 提前在后台创建后端客户端（SDK 导入较慢），点击连接时无需等待
+            profile = self.current_profile.get() or 'DEFAULT'
+            threading.Thread(target=self._warm_up_backend, args=(profile,), daemon=True).start()
+
+    def _warm_up_backend(self, profile):
+        try:
+            get_backend(profile)
+        except StorageError:
+            pass  # 真正使用时再报告错误
+
+    def _save_session(self, with_snapshot=True):
+        """保存会话，with_snapshot 时同时保存当前目录的快照"""
+        location = self._cache_location()
+        save_session({'profile': self.current_profile.get(), 'compartment': self.current_compartment.get(),
+                      'namespace': self.current_namespace.get(), 'bucket': self.current_bucket.get(),
+                      'path': self.current_path, 'geometry': self.root.geometry(),
+                      'columns': {column: self.file_tree.column(column, 'width')
+                                  for column in self.file_tree['columns']}})
+        if with_snapshot and self._current_listing and self._current_listing[:2] == (location, self.current_path):
+            save_snapshot(*self._current_listing)
+
+    def on_close(self):
+        """退出前保存会话"""
+        try:
+            self._save_session()
+        except OSError:
+            pass
+        self.root.destroy()
+
     def load_profiles(self):
-        """加载OCI配置文件中的profiles"""
+        """加载OCI配置文件中的profiles，已恢复上次的 profile 时不覆盖"""
         try:
             # 尝试读取OCI配置文件
             config_file = os.path.expanduser("~/.oci/config")
@@ -280,40 +975,44 @@ class OCIStorageGUI:
                                 profiles.insert(0, 'DEFAULT')
 
                 self.profile_combo['values'] = profiles
-                if profiles:
+                if profiles and not self.current_profile.get():
                     self.current_profile.set(profiles[0])
         except Exception as e:
             messagebox.showerror("错误", f"加载配置文件失败: {str(e)}")
 
     def on_profile_changed(self, event=None):
-        """Profile变更事件"""
+        """Profile变更事件：namespace 属于租户，切换 profile 后重新获取"""
         self.status_var.set(f"已选择Profile: {self.current_profile.get()}")
+        self.current_namespace.set("")
+        self._fill_namespace()
 
     def connect_to_bucket(self):
-        """连接到指定的bucket"""
-        if not all([self.current_compartment.get(), self.current_namespace.get(), self.current_bucket.get()]):
-            messagebox.showwarning("警告", "请填写完整的配置信息")
+        """连接到指定的bucket，未填写 namespace 时先自动获取"""
+        if not self.current_bucket.get():
+            messagebox.showwarning("警告", "请填写 Bucket，或点击“浏览 Bucket...”选择")
+            return
+        if not self.current_namespace.get():
+            self._fill_namespace(connect=True)
             return
 
+        # 不单独查询 bucket，直接列举根目录，bucket 不存在或无权限时列举失败即为连接失败
+        self.current_path = ""
+        self.path_var.set("/")
         self.status_var.set("正在连接...")
-        threading.Thread(target=self._connect_to_bucket_thread, daemon=True).start()
-
-    def _connect_to_bucket_thread(self):
-        """在后台线程中连接bucket"""
-        profile_arg = f"--profile {self.current_profile.get()}" if self.current_profile.get() != 'DEFAULT' else ""
+        self.refresh_files(connecting=True)
 
-        # 验证bucket是否存在
-        command = f"oci os bucket get --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} {profile_arg}"
-        success, output = self.run_oci_command(command)
-
-        if success:
-            self.current_path = ""
-            self.root.after(0, lambda: self.path_var.set("/"))
-            self.root.after(0, lambda: self.status_var.set("连接成功"))
-            self.root.after(0, self.refresh_files)
-        else:
-            self.root.after(0, lambda: messagebox.showerror("连接失败", f"无法连接到bucket: {output}"))
-            self.root.after(0, lambda: self.status_var.set("连接失败"))
+    def _listing_done(self, generation, connecting, snapshot):
+        """列举完成：清除快照标记；连接（或启动时恢复会话）后的第一次列举还要保存会话并检查中断的任务"""
+        if generation == self._listing_generation:
+            self.list_frame.configure(text="文件列表")
+        if not connecting:
+            return
+        self.status_var.set("连接成功" if snapshot is None else "文件列表已验证")
+        try:
+            self._save_session(with_snapshot=False)
+        except OSError:
+            pass
+        self._check_pending_jobs()
 
     def go_up(self):
         """返回上级目录"""
@@ -344,15 +1043,14 @@ class OCIStorageGUI:
         if self.is_navigating:  # 防止快速双击
             return
 
-        selected = self.file_tree.selection()
+        selected = self.file_list.selected_rows()
         if not selected:
             return
 
         self.is_navigating = True  # 设置导航锁
         try:
-            item = self.file_tree.item(selected[0])
-            object_name = item['values'][0]
-            object_type = item['values'][3]
+            object_name = selected[0][0]
+            object_type = selected[0][3]
 
             # 如果是".."，返回上级目录
             if object_name == "..":
@@ -367,36 +1065,69 @@ class OCIStorageGUI:
         finally:
             self.is_navigating = False  # 释放导航锁
 
-    def refresh_files(self):
-        """刷新文件列表"""
+    def refresh_files(self, force=False, connecting=False, snapshot=None):
+        """刷新文件列表，命中缓存时立即显示并在后台重新验证；force 时忽略缓存
+
+        connecting 表示连接 bucket 后的第一次列举，失败时按连接失败提示；snapshot 为已显示的上次会话快照。
+        """
         if not self.current_bucket.get():
             messagebox.showwarning("警告", "请先连接到bucket")
             return
 
-        self.status_var.set("正在刷新文件列表...")
-        threading.Thread(target=self._refresh_files_thread, daemon=True).start()
-        self.status_var.set("就绪")
-
-    def _refresh_files_thread(self):
-        """在后台线程中刷新文件列表"""
-        profile_arg = f"--profile {self.current_profile.get()}" if self.current_profile.get() != 'DEFAULT' else ""
-
-        # 添加前缀参数来获取特定路径下的文件
-        prefix_arg = f"--prefix {self.current_path}" if self.current_path else ""
-
-        command = f"oci os object list --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} {prefix_arg} --output json {profile_arg}"
-        success, output = self.run_oci_command(command)
-
-        if success:
-            try:
-                data = json.loads(output)
-                self.root.after(0, lambda: self._update_file_list(data.get('data', [])))
-            except json.JSONDecodeError:
-                self.root.after(0, lambda: self._set_status_with_timeout(f"解析文件列表失败"))
+        self._listing_generation += 1
+        self.prefetcher.cancel()
+        location = self._cache_location()
+        if snapshot is not None:
+            cached = snapshot
         else:
-            self.root.after(0, lambda: self._set_status_with_timeout(f"获取文件列表失败: {output}"))
+            cached = None if force else self.listing_cache.get((*location, self.current_path))
+            if cached:
+                self._update_file_list(cached)
+
+        if not connecting:
+            self.status_var.set("正在刷新文件列表...")
+        threading.Thread(target=self._refresh_files_thread,
+                         args=(self._listing_generation, location, self.current_path, cached, connecting,
+                               snapshot), daemon=True).start()
+        if not connecting:
+            self.status_var.set("就绪")
+
+    def _refresh_files_thread(self, generation, location, prefix, cached=None, connecting=False, snapshot=None):
+        """在后台线程中刷新文件列表，使用delimiter只列举直接子项
+
+        没有缓存时逐页显示；有缓存时列举完成后与缓存比较，有变化才重新显示
+        """
+        objects, prefixes = [], []
+        try:
+            pages = iter_list_pages(self.get_backend(), location[1], location[2], prefix)
+            for index, page in enumerate(pages):
+                if generation != self._listing_generation and not connecting:
+                    return  # 已导航到其他目录，停止请求后续页
+                objects.extend(page['objects'])
+                prefixes.extend(page['prefixes'])
+                if cached is None:
+                    self.root.after(0, lambda p=page, first=index == 0: self._update_file_list(p, first, generation))
+        except StorageError as e:
+            error = str(e)
+            if connecting:
+                if snapshot is not None:
+                    self.root.after(0, lambda: self.list_frame.configure(text="文件列表（上次会话的快照，未能验证）"))
+                self.root.after(0, lambda: messagebox.showerror("连接失败", f"无法连接到bucket: {error}"))
+                self.root.after(0, lambda: self.status_var.set("连接失败"))
+            else:
+                self.root.after(0, lambda: self._set_status_with_timeout(f"获取文件列表失败: {error}"))
+            return
 
-        ### self.root.after(0, lambda: self.status_var.set("就绪"))
+        self.listing_cache.put((*location, prefix), objects, prefixes)
+        if generation == self._listing_generation:
+            self._current_listing = (location, prefix, objects, prefixes)
+        self.root.after(0, self._listing_done, generation, connecting, snapshot)
+        if self.prefetch_enabled.get() and generation == self._listing_generation:
+            # 用户通常会接着进入某个子目录，后台预取
+            self.prefetcher.prefetch(self.get_backend(), location, prefixes)
+        if cached is not None and (objects, prefixes) != (cached['objects'], cached['prefixes']):
+            page = {'objects': objects, 'prefixes': prefixes}
+            self.root.after(0, lambda: self._update_file_list(page, True, generation))
 
     def _normalize_path(self, path):
         """规范化路径，移除多余的斜杠和重复的文件夹名称"""
@@ -417,53 +1148,36 @@ class OCIStorageGUI:
             normalized += '/'
         return normalized
 
-    def _update_file_list(self, objects):
-        """更新文件列表显示"""
-        # 清空现有项目
-        for item in self.file_tree.get_children():
-            self.file_tree.delete(item)
-
-        # 如果不在根目录，添加".."项
-        if self.current_path:
-            self.file_tree.insert('', 'end', values=("..", "", "", "文件夹"))
-
-        # 处理文件和文件夹
-        folders = set()
-        files = []
-
-        current_level = len(self.current_path.split('/')) if self.current_path else 1
+    def _update_file_list(self, page, clear=True, generation=None):
+        """更新文件列表显示，page 为一页列举结果，后续页追加显示"""
+        if generation is not None and generation != self._listing_generation:
+            return
 
-        for obj in objects:
+        if clear:
+            # 清空现有项目，如果不在根目录，添加".."项
+            self.file_list.clear(show_parent=bool(self.current_path))
+
+        # 文件夹项目（服务端已按名称排序）
+        folder_rows = []
+        for prefix in page.get('prefixes', []):
+            folder = prefix[len(self.current_path):] if prefix.startswith(self.current_path) else prefix
+            if folder:
+                folder_rows.append((folder, "", "", "文件夹"))
+
+        # 文件项目，已知的压缩对象同时显示原始大小
+        file_rows = []
+        compressed = default_index().lookup([obj.get('etag') for obj in page.get('objects', [])])
+        for obj in page.get('objects', []):
             name = obj.get('name', '')
-
             # 移除当前路径前缀
-            if self.current_path and name.startswith(self.current_path):
-                relative_name = name[len(self.current_path):]
-            else:
-                relative_name = name
-
-            # 跳过空名称
-            if not relative_name:
+            filename = name[len(self.current_path):] if name.startswith(self.current_path) else name
+            # 跳过当前目录自身的占位对象
+            if not filename or filename.endswith('/'):
                 continue
 
-            # 判断是否为当前目录的直接子项
-            name_parts = relative_name.split('/')
-            if len(name_parts) > 1:
-                # 这是一个子文件夹
-                folder_name = name_parts[0] + '/'
-                folders.add(folder_name)
-            else:
-                # 这是一个文件
-                if not relative_name.endswith('/'):
-                    files.append((relative_name, obj))
-
-        # 添加文件夹项目
-        for folder in sorted(folders):
-            self.file_tree.insert('', 'end', values=(folder, "", "", "文件夹"))
-
-        # 添加文件项目
-        for filename, obj in sorted(files, key=lambda x: x[0]):
             size = self._format_size(obj.get('size', 0))
+            if obj.get('etag') in compressed:
+                size += f" (原始 {self._format_size(compressed[obj['etag']][1])})"
             time_modified = obj.get('time-modified', '')
             if time_modified:
                 try:
@@ -472,7 +1186,9 @@ class OCIStorageGUI:
                 except:
                     pass
 
-            self.file_tree.insert('', 'end', values=(filename, size, time_modified, "文件"))
+            file_rows.append((filename, size, time_modified, "文件"))
+
+        self.file_list.add(folder_rows, file_rows)
 
     def _format_size(self, size_bytes):
         """格式化文件大小"""
@@ -507,42 +1223,59 @@ class OCIStorageGUI:
             messagebox.showwarning("警告", "未选择任何文件")
             return
 
-        # 创建进度对话框
-        progress_dialog = ProgressDialog(self.root, "上传文件", "上传")
-
-        self.status_var.set("正在准备上传...")
-        threading.Thread(target=self._upload_file_thread, args=(files_to_upload, progress_dialog), daemon=True).start()
+        title = f"上传 {os.path.basename(file_paths[0])}" if len(files_to_upload) == 1 else \
+            f"上传 {len(files_to_upload)} 个文件"
+        self._submit_job(title, self._upload_file_thread, files_to_upload, self._get_compression(),
+                         priority=PRIORITY_INTERACTIVE)
+        self.status_var.set("已加入传输队列")
 
-    def _upload_file_thread(self, files, progress_dialog):
-        """在后台线程中上传多个文件"""
-        profile_arg = f"--profile {self.current_profile.get()}" if self.current_profile.get() != 'DEFAULT' else ""
+    def _upload_file_thread(self, job, files, compression=None):
+        """在后台线程中上传多个文件，进度按实际发送的字节计算"""
+        backend = self.get_backend()
+        namespace, bucket = self.current_namespace.get(), self.current_bucket.get()
+        location = self._cache_location()
 
         total_files = len(files)
         success_count = 0
+        tracker = job.tracker
+        tracker.add_total(sum(_size_or_zero(path) for path, _ in files), items=total_files)
 
-        for index, (file_path, full_object_name) in enumerate(files, 1):
-            if progress_dialog.cancelled:
-                self.root.after(0, lambda: self._set_status_with_timeout("上传已取消"))
-                self.root.after(0, progress_dialog.close)
-                return
-
+        for file_path, full_object_name in files:
             file_name = os.path.basename(file_path)
-            self.root.after(0, lambda: self.status_var.set(f"正在上传 {file_name} ({index}/{total_files})"))
+            tracker.set_current(file_name)
 
-            command = f'oci os object put --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --file "{file_path}" --name "{full_object_name}" {profile_arg}'
-            success, output = self.run_oci_command_with_progress(command, progress_dialog, file_path)
-
-            if success and not progress_dialog.cancelled:
-                success_count += 1
-            elif not progress_dialog.cancelled:
-                self.root.after(0, lambda: self._set_status_with_timeout(f"上传文件 {file_name} 失败: {output}"))
-                self.root.after(0, progress_dialog.close)
+            try:
+                with holding_slot(job.slot):
+                    result = upload_file(backend, namespace, bucket, full_object_name, file_path,
+                                         progress=tracker.add_bytes, cancel_event=job.cancel_event,
+                                         compression=compression)
+            except TransferCancelled:
+                job.message = f"{success_count}/{total_files} 文件"
+                self.root.after(0, lambda: self._set_status_with_timeout("上传已取消"))
                 return
+            except (StorageError, OSError) as e:
+                error = str(e)
+                job.failed = True
+                job.message = f"{file_name}: {error}"
+                self.root.after(0, lambda: self._set_status_with_timeout(f"上传文件 {file_name} 失败: {error}"))
+                return
+
+            success_count += 1
+            tracker.item_done(file_name)
+            self.listing_cache.add_object(location, self._uploaded_object_info(full_object_name, file_path, result))
 
+        job.message = f"{success_count}/{total_files} 文件"
         self.root.after(0, lambda: self._set_status_with_timeout(f"上传完成: {success_count}/{total_files} 文件成功"))
-        self.root.after(0, progress_dialog.close)
         self.root.after(0, self.refresh_files)
 
+    def _uploaded_object_info(self, object_name, file_path, result):
+        """根据上传结果构建对象信息，用于修补列举缓存"""
+        result = result or {}
+        size = result['size'] if 'size' in result else _size_or_zero(file_path)
+        return {'name': object_name, 'size': size,
+                'time-modified': datetime.now().astimezone().isoformat(),
+                'md5': result.get('md5'), 'etag': result.get('etag')}
+
     def upload_folder(self):
         """上传文件夹"""
         if not self.current_bucket.get():
@@ -565,76 +1298,127 @@ class OCIStorageGUI:
         # 添加当前路径前缀
         full_target_path = self.current_path + target_folder
 
-        self.status_var.set("正在上传文件夹...")
-        threading.Thread(target=self._upload_folder_thread, args=(folder_path, full_target_path),
-                         daemon=True).start()
+        self._submit_job(f"上传文件夹 {target_folder}", self._upload_folder_thread, folder_path, full_target_path,
+                         self._get_worker_count(), None, self._get_compression())
+        self.status_var.set("已加入传输队列")
 
-    def _upload_folder_thread(self, folder_path, target_path):
-        """在后台线程中上传文件夹"""
-        profile_arg = f"--profile {self.current_profile.get()}" if self.current_profile.get() != 'DEFAULT' else ""
+    def _upload_folder_thread(self, job, folder_path, target_path, workers=DEFAULT_WORKERS, journal=None,
+                              compression=None):
+        """在后台线程中用工作线程池并发上传文件夹，每个文件向调度器申请并发额度
+
+        进度写入任务日志，中断后可在下次连接时继续：已上传的文件跳过，未完成的分段上传补传缺少的分段。
+        journal 不为空时表示继续之前的任务
+        """
+        backend = self.get_backend()
+        namespace, bucket = self.current_namespace.get(), self.current_bucket.get()
+        location = self._cache_location()
+        journal = journal or self._create_journal(job, 'upload', location, {'folder_path': folder_path,
+                                                                            'target_path': target_path,
+                                                                            'compression': compression})
 
         try:
-            # 收集所有文件
-            all_files = []
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, folder_path)
-                    # 将Windows路径分隔符转换为Unix格式
-                    relative_path = relative_path.replace('\\', '/')
-                    all_files.append((file_path, relative_path))
-
-            total_files = len(all_files)
-            success_count = 0
-
-            for i, (file_path, relative_path) in enumerate(all_files):
-                object_name = target_path + relative_path
-
-                # 更新状态
-                self.root.after(0, lambda f=relative_path, c=i + 1, t=total_files:
-                self.status_var.set(f"上传 {f} ({c}/{t})"))
-
-                command = f'oci os object put --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --file "{file_path}" --name "{object_name}" {profile_arg}'
-                success, output = self.run_oci_command(command)
-
-                if success:
-                    success_count += 1
-                else:
-                    print(f"上传失败: {relative_path} - {output}")
+            summary = upload_folder(backend, namespace, bucket, folder_path, target_path, workers, job.tracker,
+                                    job.cancel_event, gate=job.slot, journal=journal,
+                                    compression=journal.params.get('compression'))
+        except Exception as e:
+            error = str(e)
+            job.failed = True
+            job.message = error
+            journal.flush()
+            self.root.after(0, lambda: self._set_status_with_timeout(f"文件夹上传失败: {error}"))
+            return
 
-            # 显示结果
-            self.root.after(0, lambda: self._set_status_with_timeout(f"文件夹上传完成\n成功: {success_count}/{total_files}"))
-            self.root.after(0, self.refresh_files)
+        self._close_journal(journal, summary)
 
-        except Exception as e:
-            self.root.after(0, lambda: self._set_status_with_timeout(f"文件夹上传失败: {str(e)}"))
+        # 目标文件夹下的缓存全部失效，上级目录补上该文件夹
+        self.listing_cache.invalidate(location, target_path, recursive=True)
+        self.listing_cache.add_prefix(location, target_path)
 
-        self.root.after(0, lambda: self.status_var.set("就绪"))
+        # 显示结果
+        self._finish_job(job, summary)
+        self.root.after(0, lambda: self._show_summary("文件夹上传", summary))
+        self.root.after(0, self.refresh_files)
+
+    def sync_folder(self):
+        """增量同步文件夹：只上传新增或变化的文件"""
+        if not self.current_bucket.get():
+            messagebox.showwarning("警告", "请先连接到bucket")
+            return
+
+        folder_path = filedialog.askdirectory(title="选择要同步的文件夹")
+        if not folder_path:
+            return
+
+        # 询问目标文件夹名称
+        folder_name = os.path.basename(folder_path)
+        target_folder = simpledialog.askstring("目标文件夹名称", "请输入目标文件夹名称:", initialvalue=folder_name)
+        if not target_folder:
+            return
+
+        if not target_folder.endswith('/'):
+            target_folder += '/'
+
+        options = SyncOptionsDialog(self.root, "同步选项").result
+        if options is None:
+            return
+        delete_orphans, full_scan = options
+
+        self._submit_job(f"同步文件夹 {target_folder}", self._sync_folder_thread, folder_path,
+                         self.current_path + target_folder, delete_orphans, full_scan, self._get_worker_count())
+        self.status_var.set("已加入传输队列")
+
+    def _sync_folder_thread(self, job, folder_path, target_path, delete_orphans, full_scan, workers=DEFAULT_WORKERS):
+        """在后台线程中比较本地与远端并上传差异"""
+        backend = self.get_backend()
+        location = self._cache_location()
+
+        try:
+            job.tracker.set_current("正在比较文件...")
+            plan, manifest = plan_sync(backend, location, folder_path, target_path, full_scan, delete_orphans)
+            self.root.after(0, lambda: self.status_var.set(
+                f"需上传 {len(plan.uploads)} 个, 删除 {len(plan.deletes)} 个, 未变化 {plan.unchanged} 个"
+                + (f", 无法读取 {len(plan.errors)} 个" if plan.errors else "")))
+            summary = run_sync(backend, plan, manifest, workers, job.tracker, job.cancel_event, gate=job.slot)
+        except (StorageError, OSError) as e:
+            error = str(e)
+            job.failed = True
+            job.message = error
+            self.root.after(0, lambda: self._set_status_with_timeout(f"同步失败: {error}"))
+            return
+
+        self.listing_cache.invalidate(location, target_path, recursive=True)
+        self.listing_cache.add_prefix(location, target_path)
+
+        title = f"同步 (未变化 {plan.unchanged} 个)"
+        self._finish_job(job, summary)
+        self.root.after(0, lambda: self._show_summary(title, summary))
+        self.root.after(0, self.refresh_files)
 
     def download_file(self):
-        """下载选中的多个文件"""
+        """下载选中的多个文件或文件夹"""
         if not self.current_bucket.get():
             messagebox.showwarning("警告", "请先连接到bucket")
             return
 
-        selected = self.file_tree.selection()
+        selected = self.file_list.selected_rows()
         if not selected:
             messagebox.showwarning("警告", "请选择要下载的文件")
             return
 
-        # 收集选中的文件
+        # 收集选中的文件和文件夹
         files_to_download = []
-        for item_id in selected:
-            item = self.file_tree.item(item_id)
-            object_name = item['values'][0]
-            object_type = item['values'][3]
-            if object_type == "文件夹" or object_name == "..":
-                messagebox.showwarning("警告", f"无法下载文件夹或'..'，请仅选择文件")
+        folders_to_download = []
+        for object_name, _, _, object_type in selected:
+            if object_name == "..":
+                messagebox.showwarning("警告", "无法下载'..'")
                 return
             full_object_name = self.current_path + object_name
-            files_to_download.append((object_name, full_object_name))
+            if object_type == "文件夹":
+                folders_to_download.append((object_name, full_object_name))
+            else:
+                files_to_download.append((object_name, full_object_name))
 
-        if not files_to_download:
+        if not files_to_download and not folders_to_download:
             messagebox.showwarning("警告", "未选择任何文件")
             return
 
@@ -643,47 +1427,90 @@ class OCIStorageGUI:
         if not save_dir:
             return
 
-        # 创建进度对话框
-        progress_dialog = ProgressDialog(self.root, "下载文件", "下载")
-
-        threading.Thread(target=self._download_file_thread, args=(files_to_download, save_dir, progress_dialog),
-                         daemon=True).start()
+        if folders_to_download:
+            self._submit_job(f"下载 {len(folders_to_download) + len(files_to_download)} 项", self._download_folder_thread,
+                             folders_to_download, files_to_download, save_dir, self._get_worker_count())
+        else:
+            title = f"下载 {files_to_download[0][0]}" if len(files_to_download) == 1 else \
+                f"下载 {len(files_to_download)} 个文件"
+            self._submit_job(title, self._download_file_thread, files_to_download, save_dir,
+                             priority=PRIORITY_INTERACTIVE)
+        self.status_var.set("已加入传输队列")
 
-    def _download_file_thread(self, files, save_dir, progress_dialog):
-        """在后台线程中下载多个文件"""
-        profile_arg = f"--profile {self.current_profile.get()}" if self.current_profile.get() != 'DEFAULT' else ""
+    def _download_file_thread(self, job, files, save_dir):
+        """在后台线程中下载多个文件，大对象并发分段下载，中断后可续传"""
+        backend = self.get_backend()
+        namespace, bucket = self.current_namespace.get(), self.current_bucket.get()
 
         total_files = len(files)
         success_count = 0
+        tracker = job.tracker
+        tracker.add_total(0, items=total_files)
 
-        for index, (object_name, full_object_name) in enumerate(files, 1):
-            if progress_dialog.cancelled:
+        for object_name, full_object_name in files:
+            # 构建保存路径
+            save_path = os.path.join(save_dir, object_name).replace('\\', '/')
+            tracker.set_current(object_name)
+
+            # 执行下载
+            try:
+                with holding_slot(job.slot):
+                    download_file(backend, namespace, bucket, full_object_name, save_path, progress=tracker.add_bytes,
+                                  cancel_event=job.cancel_event, on_size=tracker.add_total)
+            except TransferCancelled:
+                job.message = f"{success_count}/{total_files} 文件"
                 self.root.after(0, lambda: self._set_status_with_timeout("下载已取消"))
-                self.root.after(0, progress_dialog.close)
-                self.root.after(0, lambda: self.status_var.set("就绪"))
+                return
+            except (StorageError, OSError) as e:
+                error = str(e)
+                job.failed = True
+                job.message = f"{object_name}: {error}"
+                self.root.after(0, lambda: self._set_status_with_timeout(f"下载文件 {object_name} 失败: {error}"))
                 return
 
-            # 构建保存路径
-            save_path = os.path.join(save_dir, object_name).replace('\\', '/')
+            success_count += 1
+            tracker.item_done(object_name)
 
-            # 更新状态
-            self.root.after(0, lambda: self.status_var.set(f"正在下载 {object_name} ({index}/{total_files})"))
+        job.message = f"{success_count}/{total_files} 文件"
+        self.root.after(0, lambda: self._set_status_with_timeout(f"下载完成: {success_count}/{total_files} 文件成功"))
 
-            # 执行下载命令
-            command = f'oci os object get --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --name "{full_object_name}" --file "{save_path}" {profile_arg}'
-            success, output = self.run_oci_command_with_progress(command, progress_dialog, save_path)
+    def _download_folder_thread(self, job, folders, files, save_dir, workers=DEFAULT_WORKERS):
+        """在后台线程中递归下载文件夹（以及同时选中的文件），边列举边下载"""
+        backend = self.get_backend()
+        namespace, bucket = self.current_namespace.get(), self.current_bucket.get()
 
-            if success and not progress_dialog.cancelled:
-                success_count += 1
-            elif not progress_dialog.cancelled:
-                self.root.after(0, lambda: self._set_status_with_timeout( f"下载文件 {object_name} 失败: {output}"))
-                self.root.after(0, progress_dialog.close)
-                self.root.after(0, lambda: self.status_var.set("就绪"))
-                return
+        tracker = job.tracker
+        cancel_event = job.cancel_event
+        summary = TransferSummary()
 
-        self.root.after(0, lambda: self._set_status_with_timeout(f"下载完成: {success_count}/{total_files} 文件成功"))
-        self.root.after(0, progress_dialog.close)
-        self.root.after(0, lambda: self.status_var.set("就绪"))
+        for folder_name, prefix in folders:
+            if cancel_event.is_set():
+                break
+            self.root.after(0, lambda: self.status_var.set(f"正在下载文件夹 {folder_name}"))
+            try:
+                download_prefix(backend, namespace, bucket, prefix, os.path.join(save_dir, folder_name.rstrip('/')),
+                                workers, tracker, cancel_event, summary, gate=job.slot)
+            except (StorageError, OSError) as e:
+                summary.add_failure(folder_name, e)
+
+        def fetch(item):
+            object_name, full_object_name = item
+            try:
+                download_file(backend, namespace, bucket, full_object_name, os.path.join(save_dir, object_name),
+                              progress=tracker.add_bytes, cancel_event=cancel_event,
+                              on_size=lambda size: tracker.add_total(size, items=1))
+                return os.path.getsize(os.path.join(save_dir, object_name))
+            finally:
+                tracker.item_done(object_name)
+
+        if files and not cancel_event.is_set():
+            run_pool(files, fetch, workers, cancel_event, label=lambda item: item[0], summary=summary,
+                     gate=job.slot)
+        summary.finish(cancelled=cancel_event.is_set())
+
+        title = f"下载 ({summary.items_per_second:.1f} 文件/秒, {self._format_size(summary.bytes_per_second)}/s)"
+        self._finish_job(job, summary)
+        self.root.after(0, lambda: self._show_summary(title, summary))
 
     def delete_file(self):
         """删除选中的多个文件或文件夹"""
@@ -691,17 +1518,14 @@ class OCIStorageGUI:
             messagebox.showwarning("警告", "请先连接到bucket")
             return
 
-        selected = self.file_tree.selection()
+        selected = self.file_list.selected_rows()
         if not selected:
             messagebox.showwarning("警告", "请选择要删除的文件或文件夹")
             return
 
         # 收集选中的文件和文件夹
         items_to_delete = []
-        for item_id in selected:
-            item = self.file_tree.item(item_id)
-            object_name = item['values'][0]
-            object_type = item['values'][3]
+        for object_name, _, _, object_type in selected:
             if object_name == "..":
                 messagebox.showwarning("警告", "无法删除'..'")
                 return
@@ -717,56 +1541,69 @@ class OCIStorageGUI:
         if not messagebox.askyesno("确认删除", confirm_message):
             return
 
-        self.status_var.set("正在删除...")
-        threading.Thread(target=self._delete_file_thread, args=(items_to_delete,), daemon=True).start()
+        bulk = any(object_type == "文件夹" for _, _, object_type in items_to_delete)
+        self._submit_job(f"删除 {len(items_to_delete)} 项", self._delete_file_thread, items_to_delete,
+                         self._get_worker_count(), priority=PRIORITY_BULK if bulk else PRIORITY_INTERACTIVE)
+        self.status_var.set("已加入传输队列")
 
-    def _delete_file_thread(self, items):
-        """在后台线程中删除多个文件或文件夹"""
-        profile_arg = f"--profile {self.current_profile.get()}" if self.current_profile.get() != 'DEFAULT' else ""
+    def _delete_file_thread(self, job, items, workers=DEFAULT_WORKERS, journal=None):
+        """在后台线程中并发删除多个文件或文件夹
 
-        total_items = len(items)
-        success_count = 0
+        文件夹按流水线删除：列举结果逐页送入删除线程池；单个对象失败不会中断，最后汇总失败项。
+        进度写入任务日志，journal 不为空时表示继续之前的任务
+        """
+        backend = self.get_backend()
+        namespace, bucket = self.current_namespace.get(), self.current_bucket.get()
+        location = self._cache_location()
+        journal = journal or self._create_journal(job, 'delete', location, {'items': [list(item) for item in items]})
 
-        for index, (object_name, full_object_name, object_type) in enumerate(items, 1):
-            self.root.after(0, lambda: self.status_var.set(f"正在删除 {object_name} ({index}/{total_items})"))
+        tracker = job.tracker
+        cancel_event = job.cancel_event
+        summary = TransferSummary()
 
-            if object_type == "文件夹":
-                # 删除文件夹需要删除所有以该前缀开头的对象
-                prefix_arg = f"--prefix {full_object_name}"
-                command = f"oci os object list --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} {prefix_arg} --output json {profile_arg}"
-                success, output = self.run_oci_command(command)
+        files = [full_object_name for _, full_object_name, object_type in items if object_type != "文件夹"]
+        folders = [(object_name, full_object_name) for object_name, full_object_name, object_type in items
+                   if object_type == "文件夹"]
 
-                if not success:
-                    self.root.after(0, lambda: self._set_status_with_timeout(f"获取文件夹内容 {object_name} 失败: {output}"))
-                    return
+        # 删除单个文件，跳过之前运行中已删除的
+        remaining = [name for name in files if not journal.is_done(name)]
+        if remaining:
+            tracker.add_total(0, items=len(remaining))
 
+            def delete(name):
                 try:
-                    data = json.loads(output)
-                    objects = data.get('data', [])
-                    for obj in objects:
-                        obj_name = obj.get('name', '')
-                        if obj_name:
-                            delete_command = f'oci os object delete --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --name "{obj_name}" --force {profile_arg}'
-                            success, output = self.run_oci_command(delete_command)
-                            if not success:
-                                self.root.after(0, lambda: self._set_status_with_timeout(f"删除对象 {obj_name} 失败: {output}"))
-                                return
-                except json.JSONDecodeError:
-                    self.root.after(0, lambda: self._set_status_with_timeout(f"解析文件夹内容 {object_name} 失败"))
-                    return
-            else:
-                # 删除单个文件
-                command = f'oci os object delete --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --name "{full_object_name}" --force {profile_arg}'
-                success, output = self.run_oci_command(command)
-
-                if not success:
-                    self.root.after(0,
-                                    lambda: self._set_status_with_timeout(f"删除文件 {object_name} 失败: {output}"))
-                    return
-
-            success_count += 1
-
-        self.root.after(0, lambda: self._set_status_with_timeout( f"删除完成: {success_count}/{total_items} 项目成功"))
+                    delete_object(backend, namespace, bucket, name, cancel_event)
+                    journal.record_done(name)
+                    return 0
+                finally:
+                    tracker.item_done(name)
+
+            run_pool(remaining, delete, workers, cancel_event, summary=summary, gate=job.slot)
+
+        # 删除文件夹需要删除所有以该前缀开头的对象
+        for object_name, prefix in folders:
+            if cancel_event.is_set():
+                break
+            tracker.set_current(object_name)
+            try:
+                delete_prefix(backend, namespace, bucket, prefix, workers, tracker, cancel_event, summary,
+                              gate=job.slot, journal=journal)
+            except StorageError as e:
+                summary.add_failure(object_name, f"获取文件夹内容失败: {e}")
+
+        summary.finish(cancelled=cancel_event.is_set())
+        self._close_journal(journal, summary)
+
+        failed_names = {name for name, _ in summary.failed}
+        for name in files:
+            if name not in failed_names:
+                self.listing_cache.remove_object(location, name)
+        for _, prefix in folders:
+            self.listing_cache.remove_prefix(location, prefix)
+
+        title = f"删除 ({summary.items_per_second:.1f} 对象/秒)"
+        self._finish_job(job, summary)
+        self.root.after(0, lambda: self._show_summary(title, summary))
         self.root.after(0, self.refresh_files)
 
     def rename_file(self):
@@ -775,14 +1612,16 @@ class OCIStorageGUI:
             messagebox.showwarning("警告", "请先连接到bucket")
             return
 
-        selected = self.file_tree.selection()
+        selected = self.file_list.selected_rows()
         if not selected:
             messagebox.showwarning("警告", "请选择要重命名的文件或文件夹")
             return
 
-        item = self.file_tree.item(selected[0])
-        old_name = item['values'][0]
-        object_type = item['values'][3]
+        old_name = selected[0][0]
+        object_type = selected[0][3]
+        if old_name == "..":
+            messagebox.showwarning("警告", "无法重命名'..'")
+            return
 
         new_name = simpledialog.askstring("重命名", f"请输入新的{object_type}名称:", initialvalue=old_name)
         if not new_name or new_name == old_name:
@@ -796,81 +1635,149 @@ class OCIStorageGUI:
         full_old_name = self.current_path + old_name
         full_new_name = self.current_path + new_name
 
-        self.status_var.set(f"正在重命名{object_type}...")
-        threading.Thread(target=self._rename_file_thread, args=(full_old_name, full_new_name, object_type),
-                         daemon=True).start()
+        if object_type == "文件夹" and full_new_name.startswith(full_old_name):
+            messagebox.showwarning("警告", "新文件夹不能位于原文件夹内部")
+            return
 
-    def _rename_file_thread(self, old_name, new_name, object_type):
-        """在后台线程中重命名文件或文件夹"""
-        profile_arg = f"--profile {self.current_profile.get()}" if self.current_profile.get() != 'DEFAULT' else ""
+        self._submit_job(f"重命名 {old_name} → {new_name}", self._rename_file_thread, full_old_name, full_new_name,
+                         object_type, priority=PRIORITY_BULK if object_type == "文件夹" else PRIORITY_INTERACTIVE)
+        self.status_var.set(f"正在重命名{object_type}...")
 
-        if object_type == "文件夹":
-            # 重命名文件夹：复制所有以旧前缀开头的对象到新前缀
-            prefix_arg = f"--prefix {old_name}"
-            command = f"oci os object list --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} {prefix_arg} --output json {profile_arg}"
-            success, output = self.run_oci_command(command)
+    def _rename_file_thread(self, job, old_name, new_name, object_type, journal=None):
+        """在后台线程中重命名文件或文件夹
 
-            if not success:
-                self.root.after(0, lambda: self._set_status_with_timeout( f"获取文件夹内容失败: {output}"))
-                return
+        使用服务端RenameObject只修改元数据；文件夹内的对象边列举边并发重命名，
+        进度写入日志，中断后可在下次连接时继续或回滚。journal 不为空时表示继续之前的操作
+        """
+        backend = self.get_backend()
+        namespace, bucket = self.current_namespace.get(), self.current_bucket.get()
+        location = self._cache_location()
 
+        if object_type != "文件夹":
+            # 重命名单个文件
+            job.tracker.add_total(0, items=1)
             try:
-                data = json.loads(output)
-                objects = data.get('data', [])
-                success_count = 0
-                total_objects = len(objects)
-
-                for obj in objects:
-                    obj_name = obj.get('name', '')
-                    if obj_name:
-                        # 计算新对象名称
-                        relative_name = obj_name[len(old_name):] if obj_name.startswith(old_name) else obj_name
-                        new_obj_name = new_name + relative_name
-
-                        copy_command = f'oci os object copy --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --source-object-name "{obj_name}" --destination-bucket {self.current_bucket.get()} --destination-object-name "{new_obj_name}" {profile_arg}'
-                        success, output = self.run_oci_command(copy_command)
-
-                        if not success:
-                            self.root.after(0, lambda: self._set_status_with_timeout(f"复制对象 {obj_name} 失败: {output}"))
-                            return
-
-                        success_count += 1
-                        self.root.after(0, lambda: self.status_var.set(
-                            f"正在重命名文件夹 ({success_count}/{total_objects})"))
-
-                # 删除旧对象
-                for obj in objects:
-                    obj_name = obj.get('name', '')
-                    if obj_name:
-                        delete_command = f'oci os object delete --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --name "{obj_name}" --force {profile_arg}'
-                        success, output = self.run_oci_command(delete_command)
-                        if not success:
-                            self.root.after(0, lambda: self._set_status_with_timeout(f"删除旧对象 {obj_name} 失败: {output}"))
-                            return
-
-            except json.JSONDecodeError:
-                self.root.after(0, lambda: self._set_status_with_timeout("重命名失败 - 解析文件夹内容失败"))
+                with job.slot():
+                    rename_object(backend, namespace, bucket, old_name, new_name, job.cancel_event)
+            except StorageError as e:
+                error = str(e)
+                job.failed = True
+                job.message = error
+                self.root.after(0, lambda: self._set_status_with_timeout(f"重命名失败: {error}"))
                 return
+
+            job.tracker.item_done(new_name)
+
+            self.listing_cache.rename_object(location, old_name, new_name)
+            self.root.after(0, lambda: self._set_status_with_timeout(f"{object_type}重命名成功"))
+            self.root.after(0, self.refresh_files)
+            return
+
+        # 重命名文件夹：把所有以旧前缀开头的对象移动到新前缀
+        journal = journal or self._create_journal(job, 'rename', location, {'old_prefix': old_name,
+                                                                            'new_prefix': new_name})
+
+        try:
+            summary = rename_prefix(backend, namespace, bucket, old_name, new_name, journal, self._get_worker_count(),
+                                    job.tracker, job.cancel_event, gate=job.slot)
+        except StorageError as e:
+            summary = TransferSummary()
+            summary.add_failure(old_name, f"获取文件夹内容失败: {e}")
+            summary.finish()
+
+        if not summary.failed and not summary.cancelled:
+            journal.remove()
         else:
-            # 重命名单个文件
-            copy_command = f'oci os object copy --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --source-object-name "{old_name}" --destination-bucket {self.current_bucket.get()} --destination-object-name "{new_name}" {profile_arg}'
-            success, output = self.run_oci_command(copy_command)
+            journal.flush()
 
-            if success:
-                # 删除原文件
-                delete_command = f'oci os object delete --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --name "{old_name}" --force {profile_arg}'
-                success, output = self.run_oci_command(delete_command)
+        self.listing_cache.remove_prefix(location, old_name)
+        self.listing_cache.add_prefix(location, new_name)
+        self._finish_job(job, summary)
+        self.root.after(0, lambda: self._show_summary("文件夹重命名", summary))
+        self.root.after(0, self.refresh_files)
 
-                if not success:
-                    self.root.after(0, lambda: self._set_status_with_timeout(f"重命名失败 - 删除原文件失败: {output}"))
-                    return
-            else:
-                self.root.after(0, lambda: self._set_status_with_timeout(f"重命名失败 - 复制文件失败: {output}"))
-                return
+    def _rollback_rename_thread(self, job, journal):
+        """在后台线程中按日志回滚未完成的文件夹重命名"""
+        summary = rollback_rename(self.get_backend(), journal.location[1], journal.location[2], journal,
+                                  self._get_worker_count(), job.tracker, job.cancel_event, gate=job.slot)
+        if not summary.failed and not summary.cancelled:
+            journal.remove()
+        else:
+            journal.flush()
 
-        self.root.after(0, lambda: self._set_status_with_timeout(f"{object_type}重命名成功"))
+        self.listing_cache.invalidate(journal.location, "", recursive=True)
+        self._finish_job(job, summary)
+        self.root.after(0, lambda: self._show_summary("回滚重命名", summary))
         self.root.after(0, self.refresh_files)
-        self.root.after(0, lambda: self.status_var.set("就绪"))
+
+    def _notify_pending_jobs(self):
+        """启动时提示有中断的批量任务"""
+        pending = JobJournal.pending()
+        if pending:
+            self.status_var.set(f"有 {len(pending)} 个中断的任务，连接对应的 bucket 后可以继续")
+
+    def _close_journal(self, journal, summary):
+        """任务结束后处理日志：全部成功或用户取消时删除，有失败项时保留以便继续"""
+        if summary.failed and not summary.cancelled:
+            journal.flush()
+        else:
+            journal.remove()
+
+    def _check_pending_jobs(self):
+        """连接bucket后检查中断的批量任务，询问继续还是放弃
+
+        每个 bucket 在本次运行中只询问一次；传输队列中未结束的任务正在使用的日志不是中断的任务，不询问。
+        """
+        location = self._cache_location()
+        if location in self._checked_job_locations:
+            return
+        self._checked_job_locations.add(location)
+        with self._journal_lock:
+            running = self.scheduler.journal_ids()
+            pending = [journal for journal in JobJournal.pending(location) if journal.id not in running]
+        for journal in pending:
+            done = len(journal.done_names())
+            if journal.kind == 'rename':
+                old_prefix, new_prefix = journal.params['old_prefix'], journal.params['new_prefix']
+                answer = messagebox.askyesnocancel(
+                    "未完成的重命名",
+                    f"上次将文件夹 {old_prefix} 重命名为 {new_prefix} 时中断（已移动 {done} 个对象）。\n\n"
+                    f"是: 继续重命名\n否: 回滚已移动的对象\n取消: 暂不处理")
+                if answer is True:
+                    self._resume_job(f"继续重命名 {old_prefix}", self._rename_file_thread, journal, old_prefix,
+                                     new_prefix, "文件夹", journal)
+                elif answer is False:
+                    self._resume_job(f"回滚重命名 {old_prefix}", self._rollback_rename_thread, journal, journal)
+                continue
+
+            if journal.kind == 'upload':
+                description = f"上传文件夹 {journal.params['folder_path']}（已上传 {done} 个文件）"
+            else:
+                description = f"删除 {len(journal.params['items'])} 项（已删除 {done} 个对象）"
+            answer = messagebox.askyesnocancel(
+                "未完成的任务", f"上次{description}时中断。\n\n是: 继续\n否: 放弃\n取消: 暂不处理")
+            if answer is True:
+                if journal.kind == 'upload':
+                    self._resume_job(f"继续上传文件夹 {journal.params['target_path']}", self._upload_folder_thread,
+                                     journal, journal.params['folder_path'], journal.params['target_path'],
+                                     self._get_worker_count(), journal)
+                else:
+                    items = [tuple(item) for item in journal.params['items']]
+                    self._resume_job(f"继续删除 {len(items)} 项", self._delete_file_thread, journal, items,
+                                     self._get_worker_count(), journal)
+            elif answer is False:
+                self._resume_job("放弃任务", self._discard_job_thread, journal, journal, priority=PRIORITY_INTERACTIVE)
+
+    def _discard_job_thread(self, job, journal):
+        """放弃中断的任务：释放未完成的分段上传并删除日志"""
+        backend = get_backend(journal.location[0])
+        for name, upload_id in journal.uploads():
+            try:
+                with job.slot():
+                    backend.abort_multipart_upload(journal.location[1], journal.location[2], name, upload_id)
+            except StorageError:
+                pass
+        journal.remove()
 
     def create_folder(self):
         """创建文件夹"""
@@ -893,30 +1800,24 @@ class OCIStorageGUI:
 
     def _create_folder_thread(self, folder_name):
         """在后台线程中创建文件夹"""
-        profile_arg = f"--profile {self.current_profile.get()}" if self.current_profile.get() != 'DEFAULT' else ""
-
         # 创建一个空对象作为文件夹
-        tmp_file_path = None
         try:
-            with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                tmp_file.write(b'')
-                tmp_file_path = tmp_file.name
-
-            command = f'oci os object put --namespace {self.current_namespace.get()} --bucket-name {self.current_bucket.get()} --file "{tmp_file_path}" --name "{folder_name}" {profile_arg}'
-            success, output = self.run_oci_command(command)
-
-            if success:
-                self.root.after(0, lambda: self._set_status_with_timeout("文件夹创建成功"))
-                self.root.after(0, self.refresh_files)
-            else:
-                self.root.after(0, lambda: self._set_status_with_timeout(f"文件夹创建失败: {output}"))
-        finally:
-            if tmp_file_path and os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
+            self.get_backend().put_object(self.current_namespace.get(), self.current_bucket.get(), folder_name, b'',
+                                          content_length=0)
+            self.listing_cache.add_prefix(self._cache_location(), folder_name)
+            self.root.after(0, lambda: self._set_status_with_timeout("文件夹创建成功"))
+            self.root.after(0, self.refresh_files)
+        except StorageError as e:
+            error = str(e)
+            self.root.after(0, lambda: self._set_status_with_timeout(f"文件夹创建失败: {error}"))
 
         self.root.after(0, lambda: self.status_var.set("就绪"))
 
 def main():
+    # 带参数时进入命令行模式，不创建窗口
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
     root = tk.Tk()
     app = OCIStorageGUI(root)
     root.mainloop()
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+调用统计
+每次后端调用都计时，按操作类型（列举、上传、下载、删除、复制、重命名等）记录到滚动直方图，
+同时记录传输字节数、错误和限流次数，用于在统计面板中显示 p50/p95/p99 延迟和当前吞吐量。
+可以把统计快照导出为 JSON Lines，或把每次调用实时记录到 JSON Lines 文件，便于事后分析慢会话。
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+WINDOW_SLOT = 10.0  # 滚动窗口每个时间片的长度（秒）
+WINDOW_SLOTS = 6  # 时间片个数，即统计最近 60 秒
+THROUGHPUT_WINDOW = 5.0  # 计算当前吞吐量的时间窗口（秒）
+BUCKET_BASE = 0.001  # 最小桶的上界（秒）
+BUCKET_GROWTH = 1.25  # 相邻桶上界之比，百分位的相对误差不超过 25%
+BUCKET_COUNT = 64  # 约覆盖 1 毫秒到 1.6 小时
+RECENT_ERRORS = 50  # 保留的最近错误条数
+
+# 后端方法 -> 操作类型
+OPERATIONS = {
+    'get_bucket': 'bucket',
+    'get_namespace': 'bucket',
+    'list_buckets': 'bucket',
+    'list_compartments': 'bucket',
+    'list_objects': 'list',
+    'list_multipart_upload_parts': 'list',
+    'head_object': 'head',
+    'put_object': 'put',
+    'put_file': 'put',
+    'upload_part': 'put',
+    'get_object': 'get',
+    'get_file': 'get',
+    'create_multipart_upload': 'multipart',
+    'commit_multipart_upload': 'multipart',
+    'abort_multipart_upload': 'multipart',
+    'delete_object': 'delete',
+    'copy_object': 'copy',
+    'rename_object': 'rename',
+}
+
+
+def _bucket_index(seconds):
+    if seconds <= BUCKET_BASE:
+        return 0
+    return min(BUCKET_COUNT - 1, int(math.ceil(math.log(seconds / BUCKET_BASE, BUCKET_GROWTH))))
+
+
+def _bucket_bound(index):
+    return BUCKET_BASE * BUCKET_GROWTH ** index
+
+
+class RollingHistogram:
+    """最近 WINDOW_SLOT * WINDOW_SLOTS 秒内的延迟分布
+
+    延迟按对数间隔分桶，每个时间片一组计数，过期的时间片整体清零，记录和查询都是常数开销。
+    """
+
+    def __init__(self):
+        self._slots = [[0] * BUCKET_COUNT for _ in range(WINDOW_SLOTS)]
+        self._slot_ids = [None] * WINDOW_SLOTS
+
+    def add(self, seconds, now):
+        slot_id = int(now // WINDOW_SLOT)
+        index = slot_id % WINDOW_SLOTS
+        if self._slot_ids[index] != slot_id:
+            self._slot_ids[index] = slot_id
+            self._slots[index] = [0] * BUCKET_COUNT
+        self._slots[index][_bucket_index(seconds)] += 1
+
+    def counts(self, now):
+        """窗口内各桶的计数"""
+        current = int(now // WINDOW_SLOT)
+        totals = [0] * BUCKET_COUNT
+        for slot_id, counts in zip(self._slot_ids, self._slots):
+            if slot_id is not None and current - slot_id < WINDOW_SLOTS:
+                totals = [a + b for a, b in zip(totals, counts)]
+        return totals
+
+    def percentiles(self, now, quantiles=(0.5, 0.95, 0.99)):
+        """窗口内的延迟百分位（秒，取所在桶的上界），没有样本时返回 None"""
+        counts = self.counts(now)
+        total = sum(counts)
+        if not total:
+            return [None] * len(quantiles)
+        results = []
+        for quantile in quantiles:
+            rank, seen = quantile * total, 0
+            for index, count in enumerate(counts):
+                seen += count
+                if seen >= rank:
+                    results.append(_bucket_bound(index))
+                    break
+        return results
+
+
+class OperationStats:
+    """一种操作的累计计数和滚动延迟"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+        self.bytes = 0
+        self.seconds = 0.0  # 累计耗时
+        self.histogram = RollingHistogram()
+
+
+class Metrics:
+    """所有后端调用共用的统计，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trace = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.operations = {}
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self._transfers = deque()  # (时间, 发送字节, 接收字节)，用于计算当前吞吐量
+            self.recent_errors = deque(maxlen=RECENT_ERRORS)  # (时间, 操作, 信息)
+
+    def record(self, operation, seconds, sent=0, received=0, error=None, method=None):
+        """记录一次调用：耗时、发送和接收的字节数；error 不为空表示调用失败"""
+        now = time.time()
+        with self._lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = OperationStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.bytes += sent + received
+            stats.histogram.add(seconds, now)
+            if error is not None:
+                stats.errors += 1
+                if getattr(error, 'throttled', False):
+                    stats.throttled += 1
+                self.recent_errors.append((now, operation, str(error)))
+            self._add_transfer(now, sent, received)
+            trace = self._trace
+            if trace is not None:
+                trace.write(json.dumps({'time': round(now, 3), 'op': operation, 'method': method,
+                                        'seconds': round(seconds, 6), 'sent': sent, 'received': received,
+                                        'status': getattr(error, 'status', None) if error else 200,
+                                        'error': str(error) if error else None}, ensure_ascii=False) + "\n")
+
+    def record_bytes(self, operation, sent=0, received=0):
+        """记录调用返回之后才传输的字节（下载的响应体）"""
+        now = time.time()
+        with self._lock:
+            stats = self.operations.get(operation)
+            if stats is not None:
+                stats.bytes += sent + received
+            self._add_transfer(now, sent, received)
+
+    def _add_transfer(self, now, sent, received):
+        self.bytes_sent += sent
+        self.bytes_received += received
+        if sent or received:
+            self._transfers.append((now, sent, received))
+        while self._transfers and now - self._transfers[0][0] > THROUGHPUT_WINDOW:
+            self._transfers.popleft()
+
+    def throughput(self):
+        """最近 THROUGHPUT_WINDOW 秒的 (上传, 下载) 字节/秒"""
+        now = time.time()
+        with self._lock:
+            while self._transfers and now - self._transfers[0][0] > THROUGHPUT_WINDOW:
+                self._transfers.popleft()
+            sent = sum(item[1] for item in self._transfers)
+            received = sum(item[2] for item in self._transfers)
+        window = min(THROUGHPUT_WINDOW, max(now - self.started, 1e-3))
+        return sent / window, received / window
+
+    def snapshot(self):
+        """各操作的统计 {操作: {'calls', 'errors', 'throttled', 'bytes', 'mean', 'p50', 'p95', 'p99'}}，延迟单位为秒"""
+        now = time.time()
+        with self._lock:
+            result = {}
+            for operation, stats in sorted(self.operations.items()):
+                p50, p95, p99 = stats.histogram.percentiles(now)
+                result[operation] = {'calls': stats.calls, 'errors': stats.errors, 'throttled': stats.throttled,
+                                     'bytes': stats.bytes, 'mean': stats.seconds / stats.calls if stats.calls else None,
+                                     'p50': p50, 'p95': p95, 'p99': p99}
+            return result
+
+    def export(self, path):
+        """把当前快照追加到 JSON Lines 文件，每个操作一行"""
+        upload, download = self.throughput()
+        now = round(time.time(), 3)
+        with open(path, 'a', encoding='utf-8') as f:
+            for operation, stats in self.snapshot().items():
+                f.write(json.dumps(dict(stats, time=now, op=operation), ensure_ascii=False) + "\n")
+            f.write(json.dumps({'time': now, 'op': 'total', 'bytes_sent': self.bytes_sent,
+                                'bytes_received': self.bytes_received, 'upload_rate': upload,
+                                'download_rate': download}) + "\n")
+
+    def set_trace(self, path):
+        """把之后的每次调用实时追加到 path（JSON Lines），path 为 None 时停止"""
+        trace = open(path, 'a', encoding='utf-8', buffering=1) if path else None
+        with self._lock:
+            previous, self._trace = self._trace, trace
+        if previous is not None:
+            previous.close()
+
+    @property
+    def tracing(self):
+        return self._trace is not None
+
+
+_default_metrics = Metrics()
+
+
+def default_metrics():
+    """进程内共享的统计"""
+    return _default_metrics
+
+
+class _CountingStream:
+    """包装下载的响应流，按实际读取的字节数记录接收量"""
+
+    def __init__(self, stream, metrics, operation):
+        self._stream = stream
+        self._metrics = metrics
+        self._operation = operation
+
+    def read(self, *args, **kwargs):
+        data = self._stream.read(*args, **kwargs)
+        if data:
+            self._metrics.record_bytes(self._operation, received=len(data))
+        return data
+
+    def readinto(self, buffer):
+        n = self._stream.readinto(buffer)
+        if n:
+            self._metrics.record_bytes(self._operation, received=n)
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class InstrumentedBackend:
+    """给后端的每次调用计时的包装，其余属性原样转发"""
+
+    def __init__(self, backend, metrics=None):
+        self.backend = backend
+        self.metrics = metrics or default_metrics()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.backend, name)
+        operation = OPERATIONS.get(name)
+        if operation is None or not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            sent = _sent_bytes(name, args, kwargs)
+            started = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                if _is_backend_error(e):
+                    self.metrics.record(operation, time.perf_counter() - started, error=e, method=name)
+                raise
+            self.metrics.record(operation, time.perf_counter() - started, sent=sent, method=name)
+            if name == 'get_object':
+                return _CountingStream(result, self.metrics, operation)
+            if name == 'get_file':
+                self.metrics.record_bytes(operation, received=_file_size(args[3] if len(args) > 3 else
+                                                                         kwargs.get('file_path')))
+            return result
+
+        return call
+
+    def __repr__(self):
+        return f"InstrumentedBackend({self.backend!r})"
+
+
+def _is_backend_error(error):
+    """只有 StorageError 是后端调用失败；NotImplementedError（重命名回退到复制）和用户取消不计入统计"""
+    from backends import StorageError  # backends 导入了本模块，这里延迟导入
+    return isinstance(error, StorageError)
+
+
+def _sent_bytes(name, args, kwargs):
+    """从调用参数中得到上传的字节数"""
+    if name in ('put_object', 'upload_part'):
+        length = kwargs.get('content_length')
+        if length is None:
+            # put_object(namespace, bucket, name, body, content_length)
+            # upload_part(namespace, bucket, name, upload_id, part_num, body, content_length)
+            position = 4 if name == 'put_object' else 6
+            length = args[position] if len(args) > position else None
+        return length or 0
+    if name == 'put_file':
+        return _file_size(args[3] if len(args) > 3 else kwargs.get('file_path'))
+    return 0
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+带宽限制
+上传和下载各有一个令牌桶，所有传输线程按实际读写的字节数从中取令牌。
+速率可随时调整，对进行中的传输立即生效；可设置不限速时段（例如夜间）。
+"""
+
+import re
+import threading
+import time
+from datetime import datetime
+
+MIN_BURST = 64 * 1024  # 令牌桶的最小容量（字节）
+SCHEDULE_CHECK_INTERVAL = 1.0  # 重新判断是否处于不限速时段的间隔（秒）
+WAIT_STEP = 0.1  # 等待令牌时重新检查取消和不限速时段的间隔（秒）
+
+
+class TokenBucket:
+    """令牌桶，rate 为每秒字节数，0 表示不限速
+
+    取令牌时允许欠账，但最多欠一块：桶中令牌不为负时直接取走需要的令牌，大块读写不会被桶容量卡住；
+    否则等待之前的欠账还清。等待中的线程在调整速率时被唤醒，按新速率重新计算，多个线程的总速率仍不超过 rate。
+    """
+
+    def __init__(self, rate=0):
+        self.rate = 0
+        self._tokens = 0.0
+        self._burst = MIN_BURST
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self._cond:
+            self._refill(time.monotonic())
+            self.rate = max(0, int(rate))
+            self._burst = max(MIN_BURST, self.rate)
+            self._tokens = min(self._tokens, self._burst)
+            self._cond.notify_all()
+
+    def wake(self):
+        """唤醒等待中的线程重新检查是否需要等待（例如进入不限速时段）"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _refill(self, now):
+        if self.rate:
+            self._tokens = min(self._burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def consume(self, amount, cancel_event=None, bypass=None):
+        """取走 amount 字节的令牌，必要时等待
+
+        等待期间速率变为 0、bypass() 返回真或 cancel_event 置位时不再等待，直接返回。
+        """
+        with self._cond:
+            while self.rate:
+                if (cancel_event is not None and cancel_event.is_set()) or (bypass is not None and bypass()):
+                    return
+                self._refill(time.monotonic())
+                if self._tokens >= 0:
+                    self._tokens -= amount
+                    return
+                # 分步等待：取消和不限速时段无法通知条件变量，需要定期检查
+                self._cond.wait(min(-self._tokens / self.rate, WAIT_STEP))
+
+
+def parse_schedule(text):
+    """解析 "22:00-07:00" 形式的时段，返回 (起始分钟, 结束分钟)，格式错误时抛出 ValueError"""
+    match = re.fullmatch(r"\s*(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?\s*", text or "")
+    if not match:
+        raise ValueError(f"时段格式错误: {text}")
+    start_hour, start_minute, end_hour, end_minute = match.groups()
+    start = int(start_hour) * 60 + int(start_minute or 0)
+    end = int(end_hour) * 60 + int(end_minute or 0)
+    if not (0 <= start <= 24 * 60 and 0 <= end <= 24 * 60):
+        raise ValueError(f"时段格式错误: {text}")
+    return start, end
+
+
+class BandwidthLimiter:
+    """上传、下载两个方向的限速器，可设置不限速时段"""
+
+    def __init__(self, upload_rate=0, download_rate=0):
+        self.upload = TokenBucket(upload_rate)
+        self.download = TokenBucket(download_rate)
+        self.schedule = None  # (起始分钟, 结束分钟)，该时段内不限速
+        self._unlimited = False
+        self._checked = 0.0
+
+    def set_rates(self, upload_rate=None, download_rate=None):
+        """调整速率（字节/秒，0 为不限速），立即生效"""
+        if upload_rate is not None:
+            self.upload.set_rate(upload_rate)
+        if download_rate is not None:
+            self.download.set_rate(download_rate)
+
+    def set_schedule(self, schedule):
+        """设置不限速时段 (起始分钟, 结束分钟)，None 表示不启用；起始晚于结束时跨越午夜"""
+        self.schedule = schedule
+        self._checked = 0.0
+        self.upload.wake()
+        self.download.wake()
+
+    def unlimited_now(self):
+        """当前是否处于不限速时段"""
+        now = time.monotonic()
+        if now - self._checked >= SCHEDULE_CHECK_INTERVAL:
+            self._checked = now
+            schedule = self.schedule
+            if schedule is None:
+                self._unlimited = False
+            else:
+                current = datetime.now()
+                minute = current.hour * 60 + current.minute
+                start, end = schedule
+                self._unlimited = start <= minute < end if start <= end else (minute >= start or minute < end)
+        return self._unlimited
+
+    def sent(self, amount, cancel_event=None):
+        """记录已发送的字节，超出上传速率时等待"""
+        if self.upload.rate and not self.unlimited_now():
+            self.upload.consume(amount, cancel_event, self.unlimited_now)
+
+    def received(self, amount, cancel_event=None):
+        """记录已接收的字节，超出下载速率时等待"""
+        if self.download.rate and not self.unlimited_now():
+            self.download.consume(amount, cancel_event, self.unlimited_now)
+
+
+_default_limiter = BandwidthLimiter()
+
+
+def default_limiter():
+    """所有传输共用的限速器，默认不限速"""
+    return _default_limiter
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+重试
+限流（429/503）、服务端暂时错误和网络错误按指数退避加随机抖动重试，服务端给出 Retry-After 时至少等待该时间。
+每次遇到限流都会通知监听者（例如调度器的并发控制器），并计入全局统计。
+"""
+
+import random
+import threading
+import time
+
+from backends import StorageError
+
+DEFAULT_RETRIES = 5  # 最大重试次数
+DEFAULT_BACKOFF = 0.5  # 首次重试的退避上限（秒），之后翻倍
+MAX_BACKOFF = 20.0  # 单次退避上限（秒）
+
+
+class TransferCancelled(Exception):
+    """传输被用户取消"""
+
+
+class RetryStats:
+    """全局重试统计，供界面显示"""
+
+    def __init__(self):
+        self.retries = 0  # 重试次数
+        self.throttled = 0  # 其中因限流而重试的次数
+        self.exhausted = 0  # 用完重试次数仍失败的调用
+        self._lock = threading.Lock()
+
+    def record_retry(self, throttled):
+        with self._lock:
+            self.retries += 1
+            if throttled:
+                self.throttled += 1
+
+    def record_exhausted(self):
+        with self._lock:
+            self.exhausted += 1
+
+    def snapshot(self):
+        """返回 (重试次数, 限流次数, 放弃次数)"""
+        with self._lock:
+            return self.retries, self.throttled, self.exhausted
+
+
+stats = RetryStats()
+_throttle_listeners = []
+
+
+def add_throttle_listener(listener):
+    """注册限流监听者，每次遇到限流时调用 listener()"""
+    _throttle_listeners.append(listener)
+
+
+def remove_throttle_listener(listener):
+    try:
+        _throttle_listeners.remove(listener)
+    except ValueError:
+        pass
+
+
+def backoff_delay(attempt, error=None, backoff=DEFAULT_BACKOFF, max_backoff=MAX_BACKOFF):
+    """第 attempt 次重试前的等待秒数：在 [0, backoff * 2^attempt] 内随机取值，不少于 Retry-After"""
+    delay = random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_backoff * 3))
+    return delay
+
+
+def with_retry(func, *args, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, cancel_event=None, **kwargs):
+    """调用 func，遇到可重试的 StorageError 时退避后重试
+
+    cancel_event 在等待期间置位时抛出 TransferCancelled。
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except StorageError as e:
+            if not e.retryable:
+                raise
+            if e.throttled:
+                for listener in list(_throttle_listeners):
+                    listener()
+            if attempt == retries:
+                stats.record_exhausted()
+                raise
+            stats.record_retry(e.throttled)
+            delay = backoff_delay(attempt, e, backoff)
+        if cancel_event is not None:
+            if cancel_event.wait(delay):
+                raise TransferCancelled()
+        else:
+            time.sleep(delay)
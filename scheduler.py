@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+传输调度
+所有传输任务共享一个全局并发额度：任务中的每一项在执行前申请一个额度，大文件的每个分段和 Range 请求也各自申请，
+额度按优先级分配，交互式的单文件操作优先于批量任务。任务可以暂停、继续和取消。
+实际额度由 AIMD 控制：额度用满且吞吐量提高时逐步增加，遇到限流时减半，不超过用户设置的并发数。
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import retry
+from transfer import DEFAULT_WORKERS, MAX_WORKERS, ProgressTracker, TransferCancelled
+
+PRIORITY_INTERACTIVE = 0  # 单文件上传下载等交互操作
+PRIORITY_BULK = 10  # 文件夹上传下载、同步、批量删除等
+RATE_WINDOW = 5.0  # 计算任务实时速度的时间窗口（秒）
+AIMD_WINDOW = 2.0  # 评估吞吐量、调整并发的时间窗口（秒）
+AIMD_GAIN = 1.05  # 吞吐量至少提高该比例才继续增加并发
+AIMD_HOLD_WINDOWS = 5  # 增加并发没有带来提升时，保持多少个窗口后再尝试
+
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class TransferJob:
+    """调度器中的一个任务
+
+    tracker 汇总进度，cancel_event 通知工作线程取消；工作线程通过 slot() 申请并发额度。
+    """
+
+    def __init__(self, scheduler, job_id, title, priority):
+        self.scheduler = scheduler
+        self.id = job_id
+        self.title = title
+        self.priority = priority
+        self.tracker = ProgressTracker()
+        self.cancel_event = threading.Event()
+        self.message = ""  # 完成后的结果描述
+        self.failed = False
+        self.created = time.monotonic()
+        self.finished = None
+        self.active = 0  # 当前占用的额度数
+        self.journal_id = None  # 任务正在写入的任务日志
+        self._paused = False
+        self._samples = deque()
+
+    @property
+    def paused(self):
+        return self._paused
+
+    @property
+    def state(self):
+        if self.finished is not None:
+            if self.cancel_event.is_set():
+                return CANCELLED
+            return FAILED if self.failed else DONE
+        if self.cancel_event.is_set():
+            return CANCELLED
+        if self._paused:
+            return PAUSED
+        return RUNNING if self.active else QUEUED
+
+    def pause(self):
+        """暂停：进行中的项目完成后不再申请新的额度"""
+        self._paused = True
+        self.scheduler._wake()
+
+    def resume(self):
+        self._paused = False
+        self.scheduler._wake()
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.scheduler._wake()
+
+    @contextmanager
+    def slot(self):
+        """申请一个并发额度，暂停时等待，取消时抛出 TransferCancelled"""
+        self.scheduler._acquire(self)
+        try:
+            yield
+        finally:
+            self.scheduler._release(self)
+
+    def rate(self):
+        """最近 RATE_WINDOW 秒内的速度，返回 (字节/秒, 项/秒)"""
+        now = time.monotonic()
+        done_items, _, done_bytes, _, _, _ = self.tracker.snapshot()
+        self._samples.append((now, done_bytes, done_items))
+        while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW:
+            self._samples.popleft()
+        start, start_bytes, start_items = self._samples[0]
+        elapsed = now - start
+        if elapsed <= 0 or self._paused:
+            return 0.0, 0.0
+        return (done_bytes - start_bytes) / elapsed, (done_items - start_items) / elapsed
+
+
+class ConcurrencyController:
+    """AIMD 并发控制
+
+    额度用满时每个窗口尝试加 1，只要吞吐量（字节或项目）比加之前提高就继续增加；
+    没有提高则撤销这次增加，保持 AIMD_HOLD_WINDOWS 个窗口后再尝试。
+    遇到限流时额度减半，一个窗口内最多减半一次。
+    """
+
+    def __init__(self, maximum, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = max(minimum, maximum // 2)
+        self.decreases = 0  # 因限流减半的次数
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_progress = (0, 0)
+        self._baseline = None  # 上次增加额度前的吞吐量
+        self._probing = False  # 上个窗口是否增加了额度
+        self._hold = 0
+        self._last_decrease = 0.0
+        self._saturated = False
+
+    def set_maximum(self, maximum):
+        with self._lock:
+            self.maximum = maximum
+            self.limit = max(self.minimum, min(self.limit, maximum))
+
+    def mark_saturated(self):
+        """有项目因额度用满而等待"""
+        self._saturated = True
+
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < AIMD_WINDOW:
+                return
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit // 2)
+            self.decreases += 1
+            self._baseline = None
+            self._probing = False
+
+    def update(self, progress):
+        """progress 为所有任务累计的 (字节, 项目)；窗口结束时按吞吐量调整额度"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed < AIMD_WINDOW:
+                return
+            rates = tuple((done - start) / elapsed for done, start in zip(progress, self._window_progress))
+            if now - self._last_decrease < elapsed:
+                pass  # 本窗口内减过额度，吞吐量不可比
+            elif self._hold:
+                self._hold -= 1
+                if not self._hold:
+                    self._baseline = None
+            elif self._baseline is None or any(rate > base * AIMD_GAIN for rate, base in zip(rates, self._baseline)):
+                self._baseline = rates
+                self._probing = self._saturated and self.limit < self.maximum
+                if self._probing:
+                    self.limit += 1
+            else:
+                if self._probing:
+                    self.limit = max(self.minimum, self.limit - 1)
+                self._probing = False
+                self._hold = AIMD_HOLD_WINDOWS
+            self._window_start = now
+            self._window_progress = progress
+            self._saturated = False
+
+
+class TransferScheduler:
+    """持有全局并发额度的任务调度器
+
+    submit() 为每个任务启动一个协调线程运行 func(job, *args)；
+    func 内部的工作线程在处理每一项前通过 job.slot() 申请额度。
+    """
+
+    def __init__(self, limit=DEFAULT_WORKERS, adaptive=True):
+        self.limit = limit  # 用户设置的并发上限
+        self.adaptive = adaptive
+        self.controller = ConcurrencyController(limit)
+        retry.add_throttle_listener(self.controller.on_throttle)
+        self.jobs = []
+        self._cleared_progress = (0, 0)  # 已从列表移除的任务的累计进度
+        self._in_use = 0
+        self._waiting = []  # (priority, seq, job)
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+
+    @property
+    def current_limit(self):
+        """当前生效的并发额度"""
+        return self.controller.limit if self.adaptive else self.limit
+
+    def set_limit(self, limit):
+        """调整并发上限，立即生效"""
+        with self._cond:
+            self.limit = max(1, min(int(limit), MAX_WORKERS))
+            self.controller.set_maximum(self.limit)
+            self._cond.notify_all()
+
+    def set_adaptive(self, adaptive):
+        with self._cond:
+            self.adaptive = adaptive
+            self._cond.notify_all()
+
+    def _progress(self):
+        """所有任务累计完成的 (字节, 项目)"""
+        done_bytes, done_items = self._cleared_progress
+        for job in self.jobs:
+            items, _, transferred, _, _, _ = job.tracker.snapshot()
+            done_bytes += transferred
+            done_items += items
+        return done_bytes, done_items
+
+    def submit(self, title, func, *args, priority=PRIORITY_BULK):
+        """提交任务并立即开始调度，返回 TransferJob"""
+        job = TransferJob(self, next(self._ids), title, priority)
+        with self._cond:
+            self.jobs.append(job)
+
+        def run():
+            try:
+                func(job, *args)
+            except TransferCancelled:
+                pass
+            except Exception as e:
+                job.failed = True
+                job.message = str(e)
+            finally:
+                job.finished = time.monotonic()
+                self._wake()
+
+        threading.Thread(target=run, daemon=True, name=f"job-{job.id}").start()
+        return job
+
+    def busy(self):
+        """是否有未完成的任务"""
+        with self._cond:
+            return any(job.finished is None for job in self.jobs)
+
+    def journal_ids(self):
+        """未结束的任务正在使用的任务日志 id"""
+        with self._cond:
+            return {job.journal_id for job in self.jobs if job.finished is None and job.journal_id is not None}
+
+    def clear_finished(self):
+        """移除已结束的任务"""
+        with self._cond:
+            finished = [job for job in self.jobs if job.finished is not None]
+            self.jobs = [job for job in self.jobs if job.finished is None]
+            for job in finished:
+                items, _, transferred, _, _, _ = job.tracker.snapshot()
+                self._cleared_progress = (self._cleared_progress[0] + transferred,
+                                          self._cleared_progress[1] + items)
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _next_waiter(self):
+        runnable = [entry for entry in self._waiting if not entry[2].paused and not entry[2].cancel_event.is_set()]
+        return min(runnable, key=lambda entry: entry[:2]) if runnable else None
+
+    def _acquire(self, job):
+        with self._cond:
+            entry = (job.priority, next(self._seq), job)
+            self._waiting.append(entry)
+            try:
+                while True:
+                    if job.cancel_event.is_set():
+                        raise TransferCancelled()
+                    if self._in_use >= self.current_limit:
+                        self.controller.mark_saturated()
+                    elif self._next_waiter() is entry:
+                        break
+                    self._cond.wait(0.5)
+            finally:
+                self._waiting.remove(entry)
+                self._cond.notify_all()
+            self._in_use += 1
+            job.active += 1
+
+    def _release(self, job):
+        with self._cond:
+            self._in_use -= 1
+            job.active -= 1
+            if self.adaptive:
+                self.controller.update(self._progress())
+            self._cond.notify_all()
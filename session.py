@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+会话
+退出时保存上次的会话（profile、compartment、namespace、bucket、路径、列宽）和当前目录列举结果的快照，
+下次启动时立即恢复并显示快照（标记为未验证），再在后台重新列举验证。快照为 gzip 压缩的 JSON。
+"""
+
+import gzip
+import json
+import os
+import time
+
+from appdata import data_dir
+
+SESSION_FILE = "session.json"
+SNAPSHOT_FILE = "listing-snapshot.json.gz"
+SNAPSHOT_MAX_ROWS = 50000  # 超过该行数的目录不保存快照，启动时解压和显示都要足够快
+
+
+def _write_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_session():
+    """上次保存的会话，没有或无法读取时返回空字典"""
+    try:
+        with open(os.path.join(data_dir(), SESSION_FILE), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def save_session(state):
+    """保存会话 {'profile', 'compartment', 'namespace', 'bucket', 'path', 'columns', ...}"""
+    _write_atomic(os.path.join(data_dir(), SESSION_FILE),
+                  json.dumps(state, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def save_snapshot(location, prefix, objects, prefixes):
+    """保存一个目录的列举结果，location 为 (profile, namespace, bucket)；目录过大时删除旧快照"""
+    path = os.path.join(data_dir(), SNAPSHOT_FILE)
+    if len(objects) + len(prefixes) > SNAPSHOT_MAX_ROWS:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return
+    snapshot = {'location': list(location), 'prefix': prefix, 'objects': objects, 'prefixes': prefixes,
+                'saved': time.time()}
+    _write_atomic(path, gzip.compress(json.dumps(snapshot, ensure_ascii=False).encode('utf-8'), compresslevel=5))
+
+
+def load_snapshot(location, prefix):
+    """返回与 location、prefix 一致的快照 {'objects', 'prefixes', 'saved'}，没有或不一致时返回 None"""
+    try:
+        with open(os.path.join(data_dir(), SNAPSHOT_FILE), 'rb') as f:
+            snapshot = json.loads(gzip.decompress(f.read()).decode('utf-8'))
+    except (OSError, EOFError, ValueError):
+        return None
+    if snapshot.get('location') != list(location) or snapshot.get('prefix') != prefix:
+        return None
+    return {'objects': snapshot.get('objects', []), 'prefixes': snapshot.get('prefixes', []),
+            'saved': snapshot.get('saved')}
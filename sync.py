@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+增量同步
+比较本地目录与远端前缀，只上传新增或变化的文件，可选删除远端多余对象。
+远端状态保存在本地清单中，再次同步时只需检查本地变化，无需重新列举远端。
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from appdata import data_dir
+from hashcache import default_cache
+from listing import iter_objects
+from transfer import (DEFAULT_WORKERS, TransferSummary, delete_object, local_matches, parse_time, run_pool,
+                      upload_file)
+
+MTIME_METADATA = "mtime"  # 上传时写入对象元数据的本地修改时间
+MANIFEST_SAVE_INTERVAL = 500  # 每完成多少项保存一次清单
+
+
+class SyncManifest:
+    """同步清单：记录某个远端前缀下每个对象对应的本地文件状态
+
+    objects 为 {相对路径: {'size', 'mtime', 'md5', 'etag'}}，md5 为 base64 格式。
+    """
+
+    def __init__(self, location, prefix, objects=None, path=None):
+        self.location = tuple(location)
+        self.prefix = prefix
+        self.objects = objects or {}
+        self.path = path or self.path_for(location, prefix)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path_for(location, prefix):
+        key = hashlib.sha1(json.dumps([*location, prefix]).encode('utf-8')).hexdigest()
+        return os.path.join(data_dir("manifests"), f"{key}.json")
+
+    @classmethod
+    def load(cls, location, prefix):
+        """读取清单，不存在或损坏时返回 None"""
+        path = cls.path_for(location, prefix)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(location, prefix, data.get('objects', {}), path)
+
+    def update(self, relative_path, entry):
+        with self._lock:
+            self.objects[relative_path] = entry
+
+    def remove(self, relative_path):
+        with self._lock:
+            self.objects.pop(relative_path, None)
+
+    def save(self):
+        """原子写入清单"""
+        with self._lock:
+            data = {'location': list(self.location), 'prefix': self.prefix, 'objects': dict(self.objects)}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class SyncPlan:
+    """同步计划：需要上传、删除和无需处理的项目"""
+
+    def __init__(self):
+        self.uploads = []  # (本地路径, 相对路径, size, mtime)
+        self.deletes = []  # 相对路径
+        self.unchanged = 0
+        self.errors = []  # (相对路径, 错误信息)，无法读取而跳过的文件或目录
+
+    @property
+    def upload_bytes(self):
+        return sum(size for _, _, size, _ in self.uploads)
+
+
+def scan_local(local_dir, on_error=None):
+    """遍历本地目录，返回 {相对路径: (本地路径, size, mtime)}
+
+    与 walk_files 一样，无法读取的文件或目录（失效的符号链接、遍历中被删除等）跳过，并调用 on_error(相对路径, 异常)。
+    """
+    def relative(path):
+        path = os.path.relpath(path, local_dir).replace('\\', '/')
+        return "" if path == "." else path
+
+    def directory_error(error):
+        if on_error:
+            on_error(relative(error.filename or local_dir), error)
+
+    files = {}
+    for root, dirs, names in os.walk(local_dir, onerror=directory_error):
+        for name in names:
+            file_path = os.path.join(root, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                if on_error:
+                    on_error(relative(file_path), e)
+                continue
+            files[relative(file_path)] = (file_path, stat.st_size, stat.st_mtime)
+    return files
+
+
+def _is_under(relative_path, skipped):
+    """relative_path 是否为跳过的文件本身或在跳过的目录下（空字符串表示整个目录）"""
+    return any(not path or relative_path == path or relative_path.startswith(path + '/') for path in skipped)
+
+
+def scan_remote(backend, namespace, bucket, prefix):
+    """列举远端前缀，返回 {相对路径: {'size', 'mtime', 'md5', 'etag', 'time'}}
+
+    mtime 取自上传时写入的对象元数据（列举结果带元数据时），time 为对象的 time-modified。
+    """
+    remote = {}
+    for obj in iter_objects(backend, namespace, bucket, prefix):
+        relative_path = obj['name'][len(prefix):]
+        if relative_path and not relative_path.endswith('/'):
+            remote[relative_path] = {'size': obj.get('size', 0), 'mtime': _metadata_mtime(obj), 'md5': obj.get('md5'),
+                                     'etag': obj.get('etag'), 'time': obj.get('time-modified')}
+    return remote
+
+
+def _metadata_mtime(obj):
+    try:
+        return float((obj.get('metadata') or {})[MTIME_METADATA])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _same_mtime(mtime, entry):
+    """本地修改时间是否说明文件自上传后没有变化
+
+    有上传时记录的 mtime 时要求一致；没有时（列举结果不带元数据）本地修改时间不晚于对象的 time-modified 即视为未修改。
+    """
+    if entry.get('mtime') is not None:
+        return abs(entry['mtime'] - mtime) < 1e-3
+    remote_time = parse_time(entry.get('time'))
+    return remote_time is not None and mtime <= remote_time
+
+
+def _is_unchanged(file_path, size, mtime, entry):
+    """判断本地文件与远端记录是否一致
+
+    大小不同直接视为变化；大小一致且修改时间未变视为未变化；否则按哈希缓存中的 MD5 比较。
+    """
+    if entry is None or entry.get('size') != size:
+        return False
+    if _same_mtime(mtime, entry):
+        return True
+    return local_matches(file_path, entry)
+
+
+def _needs_hash(size, mtime, entry):
+    """只有 MD5 才能判断是否变化的文件"""
+    return (entry is not None and entry.get('size') == size and entry.get('md5') and '-' not in entry['md5']
+            and not _same_mtime(mtime, entry))
+
+
+def plan_sync(backend, location, local_dir, prefix, full_scan=False, delete_orphans=False):
+    """生成同步计划，location 为 (profile, namespace, bucket)
+
+    有清单且不要求完整扫描时，以清单作为远端状态，只检查本地变化；
+    否则列举远端并据此重建清单。返回 (SyncPlan, SyncManifest)。
+    """
+    manifest = None if full_scan else SyncManifest.load(location, prefix)
+    if manifest is None:
+        manifest = SyncManifest(location, prefix, scan_remote(backend, location[1], location[2], prefix))
+    remote = dict(manifest.objects)
+
+    plan = SyncPlan()
+    local = scan_local(local_dir, lambda relative_path, error: plan.errors.append((relative_path, str(error))))
+    # 首次同步等场景下大量文件需要比对 MD5，先批量计算（未命中缓存的部分并行处理）
+    default_cache().md5_many([file_path for relative_path, (file_path, size, mtime) in local.items()
+                              if _needs_hash(size, mtime, remote.get(relative_path))])
+    for relative_path, (file_path, size, mtime) in local.items():
+        entry = remote.get(relative_path)
+        if _is_unchanged(file_path, size, mtime, entry):
+            plan.unchanged += 1
+            if entry.get('mtime') is None or abs(entry['mtime'] - mtime) >= 1e-3:
+                # 内容一致但修改时间变了，更新清单，下次无需再计算 MD5
+                manifest.update(relative_path, dict(entry, mtime=mtime))
+        else:
+            plan.uploads.append((file_path, relative_path, size, mtime))
+
+    if delete_orphans:
+        # 无法读取的本地文件和目录不代表已删除，不删除对应的远端对象
+        skipped = [relative_path for relative_path, _ in plan.errors]
+        plan.deletes = sorted(relative_path for relative_path in set(remote) - set(local)
+                              if not _is_under(relative_path, skipped))
+    return plan, manifest
+
+
+def run_sync(backend, plan, manifest, workers=DEFAULT_WORKERS, tracker=None, cancel_event=None, gate=None):
+    """执行同步计划，完成的项目即时写入清单，返回 TransferSummary；计划中无法读取的项目计为失败"""
+    summary = TransferSummary()
+    for relative_path, error in plan.errors:
+        summary.add_failure(relative_path or "/", f"无法读取: {error}")
+    namespace, bucket = manifest.location[1], manifest.location[2]
+    prefix = manifest.prefix
+    completed = [0]
+    completed_lock = threading.Lock()
+
+    def checkpoint():
+        with completed_lock:
+            completed[0] += 1
+            due = completed[0] % MANIFEST_SAVE_INTERVAL == 0
+        if due:
+            manifest.save()
+
+    def upload(item):
+        file_path, relative_path, size, mtime = item
+        try:
+            result = upload_file(backend, namespace, bucket, prefix + relative_path, file_path,
+                                 progress=tracker.add_bytes if tracker else None, cancel_event=cancel_event,
+                                 metadata={MTIME_METADATA: repr(mtime)})
+            md5 = result.get('md5')
+            if not md5 or '-' in md5:
+                md5 = default_cache().md5(file_path)  # 分段上传的对象没有整体 MD5，记录本地计算值
+            manifest.update(relative_path, {'size': size, 'mtime': mtime, 'md5': md5, 'etag': result.get('etag')})
+            checkpoint()
+            return size
+        finally:
+            if tracker:
+                tracker.item_done(relative_path)
+
+    def delete(relative_path):
+        try:
+            delete_object(backend, namespace, bucket, prefix + relative_path, cancel_event)
+            manifest.remove(relative_path)
+            checkpoint()
+            return 0
+        finally:
+            if tracker:
+                tracker.item_done(relative_path)
+
+    if tracker:
+        tracker.add_total(plan.upload_bytes, items=len(plan.uploads) + len(plan.deletes))
+    run_pool(plan.uploads, upload, workers, cancel_event, label=lambda item: item[1], summary=summary, gate=gate)
+    if plan.deletes and not (cancel_event is not None and cancel_event.is_set()):
+        run_pool(plan.deletes, delete, workers, cancel_event, summary=summary, gate=gate)
+    summary.finish(cancelled=cancel_event is not None and cancel_event.is_set())
+    manifest.save()
+    return summary
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""测试公共设置：模块位于仓库根目录，本地数据目录指向临时目录"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import FAKE_NAMESPACE, FakeBackend, StorageError  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def data_home(tmp_path, monkeypatch):
+    """每个测试使用独立的 OSSGUI_HOME"""
+    home = tmp_path / "home"
+    monkeypatch.setenv("OSSGUI_HOME", str(home))
+    return home
+
+
+@pytest.fixture
+def fake():
+    return FakeBackend()
+
+
+@pytest.fixture
+def namespace():
+    return FAKE_NAMESPACE
+
+
+class FailingBackend:
+    """包装后端：记录每个方法的调用参数，按 fail(方法名, 条件) 让匹配的调用失败（不可重试）"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = {}
+        self._failures = {}
+
+    def fail(self, method, when=lambda *args, **kwargs: True):
+        self._failures[method] = when
+
+    def heal(self):
+        self._failures.clear()
+
+    def __getattr__(self, attr):
+        value = getattr(self.backend, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            self.calls.setdefault(attr, []).append((args, kwargs))
+            when = self._failures.get(attr)
+            if when is not None and when(*args, **kwargs):
+                raise StorageError(f"injected failure: {attr}", status=400)
+            return value(*args, **kwargs)
+
+        return call
+
+
+@pytest.fixture
+def failing(fake):
+    return FailingBackend(fake)
+
+
+@pytest.fixture
+def journal_store(tmp_path):
+    from journal import JournalStore
+    return JournalStore(str(tmp_path / "journal.sqlite3"))
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from backends import FAKE_TENANCY, StorageError
+from buckets import BucketCatalog, discover_buckets, discover_namespace, search_buckets
+
+
+class SlowBackend:
+    """每次列举等待一小段时间，记录同时进行中的请求数"""
+
+    def __init__(self, backend, delay=0.05, denied=()):
+        self.backend = backend
+        self.delay = delay
+        self.denied = set(denied)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def _call(self, method, compartment_id, *args):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if compartment_id in self.denied:
+                raise StorageError(f"NotAuthorized: {compartment_id}", status=403)
+            return method(*args)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def list_compartments(self, compartment_id):
+        return self._call(self.backend.list_compartments, compartment_id, compartment_id)
+
+    def list_buckets(self, namespace, compartment_id):
+        return self._call(self.backend.list_buckets, compartment_id, namespace, compartment_id)
+
+
+def build_tree(fake):
+    """租户下 3 个 compartment，各有一个子 compartment，每个 compartment 一个 bucket"""
+    for i in range(3):
+        fake.add_compartment(f"c{i}", f"team{i}")
+        fake.add_compartment(f"c{i}.dev", "dev", parent=f"c{i}")
+        fake.add_bucket(f"team{i}-data", f"c{i}")
+        fake.add_bucket(f"team{i}-scratch", f"c{i}.dev")
+
+
+def test_discovers_whole_tree_concurrently(fake, namespace):
+    build_tree(fake)
+    slow = SlowBackend(fake)
+    progress = []
+    buckets, errors = discover_buckets(slow, namespace, FAKE_TENANCY, workers=8,
+                                       on_progress=lambda done, found: progress.append((done, found)))
+    assert errors == []
+    assert [(b['name'], b['compartment']) for b in buckets] == [
+        ("team0-data", "team0"), ("team0-scratch", "team0/dev"),
+        ("team1-data", "team1"), ("team1-scratch", "team1/dev"),
+        ("team2-data", "team2"), ("team2-scratch", "team2/dev"),
+        ("test", "")]
+    assert slow.peak > 2  # 兄弟 compartment 同时列举
+    assert progress[-1] == (7, 7)
+
+
+def test_denied_compartment_does_not_stop_discovery(fake, namespace):
+    build_tree(fake)
+    slow = SlowBackend(fake, delay=0, denied={"c1"})
+    buckets, errors = discover_buckets(slow, namespace, FAKE_TENANCY)
+    names = [b['name'] for b in buckets]
+    assert "team1-data" not in names and "team1-scratch" not in names
+    assert "team0-scratch" in names and "team2-data" in names
+    assert len(errors) == 2 and all(error.startswith("team1: ") for error in errors)
+
+
+def test_search_matches_name_and_compartment_path(fake, namespace):
+    build_tree(fake)
+    buckets, _ = discover_buckets(fake, namespace, FAKE_TENANCY)
+    assert [b['name'] for b in search_buckets(buckets, "DEV team2")] == ["team2-scratch"]
+    assert len(search_buckets(buckets, "  ")) == len(buckets)
+
+
+def test_catalog_persists_namespace_and_buckets(fake, tmp_path):
+    path = str(tmp_path / "buckets.json")
+    catalog = BucketCatalog(path, ttl=60)
+    assert discover_namespace(fake, "DEFAULT", catalog) == fake.namespace
+    catalog.set_buckets("DEFAULT", "", [{'name': "test", 'compartment': ""}], errors=["x: denied"])
+
+    reloaded = BucketCatalog(path, ttl=60)
+    fake.namespace = "changed"
+    assert discover_namespace(fake, "DEFAULT", reloaded) != "changed"  # 使用缓存，不再请求
+    assert discover_namespace(fake, "DEFAULT", reloaded, refresh=True) == "changed"
+    entry = reloaded.buckets("DEFAULT")
+    assert entry['buckets'] == [{'name': "test", 'compartment': ""}] and entry['errors'] == ["x: denied"]
+    assert reloaded.is_fresh(entry)
+    reloaded.ttl = 0
+    assert not reloaded.is_fresh(entry)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+import pytest
+
+import transfer
+from bufferpool import BufferPool, MemoryReader, default_pool
+from retry import TransferCancelled
+from scheduler import TransferScheduler
+from transfer import download_file, holding_slot, upload_file, upload_folder
+
+MiB = 1024 * 1024
+
+
+def test_buffers_are_reused_within_budget():
+    pool = BufferPool(budget=2 * MiB, buffer_size=MiB)
+    with pool.buffer() as first:
+        first[:3] = b"abc"
+    with pool.buffer():
+        with pool.buffer():
+            assert pool.snapshot()['in_use'] == 2 * MiB
+    snapshot = pool.snapshot()
+    assert snapshot['in_use'] == 0
+    assert snapshot['allocated'] == 2 * MiB
+    assert snapshot['peak'] == 2 * MiB
+
+
+def test_reservation_waits_until_released():
+    pool = BufferPool(budget=2 * MiB, buffer_size=MiB)
+    held = pool.reserve(2 * MiB)
+    acquired = threading.Event()
+
+    def take():
+        with pool.reserve(MiB):
+            acquired.set()
+
+    thread = threading.Thread(target=take)
+    thread.start()
+    assert not acquired.wait(0.3)
+    held.release()
+    held.release()  # 重复释放不影响计数
+    thread.join(5)
+    assert acquired.is_set()
+    assert pool.snapshot()['in_use'] == 0
+    assert pool.snapshot()['waits'] == 1
+
+
+def test_oversized_reservation_is_capped_to_budget():
+    pool = BufferPool(budget=2 * MiB, buffer_size=MiB)
+    with pool.reserve(10 * MiB) as reservation:
+        assert reservation.size == 2 * MiB
+
+
+def test_wait_is_cancellable():
+    pool = BufferPool(budget=MiB, buffer_size=MiB)
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pool.reserve(MiB):
+        with pytest.raises(TransferCancelled):
+            pool.reserve(MiB, cancel_event)
+
+
+def test_memory_reader_reads_view_in_chunks():
+    reader = MemoryReader(memoryview(b"0123456789"))
+    assert reader.read(4) == b"0123"
+    assert len(reader) == 6
+    assert reader.read() == b"456789"
+    assert reader.read(1) == b""
+
+
+@pytest.fixture
+def small_budget():
+    pool = default_pool()
+    budget = pool.budget
+    pool.set_budget(4 * MiB)
+    yield pool
+    pool.set_budget(budget)
+
+
+def test_compressed_folder_upload_under_tiny_budget_does_not_deadlock(tmp_path, fake, namespace, small_budget):
+    """并发压缩上传持有分段额度时不能再向缓冲池借缓冲，否则额度用尽后全部卡住"""
+    folder = tmp_path / "src"
+    folder.mkdir()
+    contents = {}
+    for i in range(12):
+        data = os.urandom(MiB + MiB // 2)
+        (folder / f"f{i:02d}.bin").write_bytes(data)
+        contents[f"f{i:02d}.bin"] = data
+
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('summary', upload_folder(
+        fake, namespace, "test", str(folder), "dst/", workers=8, compression="gzip")), daemon=True)
+    thread.start()
+    thread.join(60)
+    assert not thread.is_alive(), f"上传卡住: {small_budget.snapshot()}"
+    summary = result['summary']
+    assert summary.succeeded == 12 and not summary.failed
+    assert small_budget.snapshot()['in_use'] == 0
+    assert small_budget.snapshot()['peak'] <= 4 * MiB
+
+    target = tmp_path / "f00.bin"
+    download_file(fake, namespace, "test", "dst/f00.bin", str(target))
+    assert target.read_bytes() == contents["f00.bin"]
+
+
+class SlowBackend:
+    """每个分段和 Range 请求稍作等待，让上传和下载的请求交错"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        attribute = getattr(self.backend, name)
+        if name not in ('upload_part', 'get_object'):
+            return attribute
+
+        def call(*args, **kwargs):
+            time.sleep(0.02)
+            return attribute(*args, **kwargs)
+        return call
+
+
+def test_compressed_upload_and_ranged_download_share_budget_and_slot(tmp_path, fake, namespace, small_budget,
+                                                                     monkeypatch):
+    """压缩上传先占内存再申请额度，下载持有额度时等内存要先归还额度，否则两者互相等待"""
+    monkeypatch.setattr(transfer, 'COMPRESSED_PART_SIZE', MiB)
+    backend = SlowBackend(fake)
+    source = tmp_path / "up.bin"
+    source.write_bytes(os.urandom(6 * MiB))
+    data = os.urandom(8 * MiB)
+    fake.put_object(namespace, "test", "down.bin", data)
+    target = tmp_path / "down.bin"
+    scheduler = TransferScheduler(limit=1, adaptive=False)
+
+    def upload(job):
+        with holding_slot(job.slot):
+            upload_file(backend, namespace, "test", "up.bin", str(source), cancel_event=job.cancel_event,
+                        compression="gzip")
+
+    def download(job):
+        with holding_slot(job.slot):
+            download_file(backend, namespace, "test", "down.bin", str(target), cancel_event=job.cancel_event,
+                          range_size=MiB, range_workers=4)
+
+    jobs = [scheduler.submit("upload", upload)]
+    deadline = time.monotonic() + 60
+    while small_budget.snapshot()['in_use'] < small_budget.budget:  # 等压缩分段占满内存再开始下载
+        assert time.monotonic() < deadline and jobs[0].finished is None
+        time.sleep(0.001)
+    jobs.append(scheduler.submit("download", download))
+    while any(job.finished is None for job in jobs):
+        if time.monotonic() > deadline:
+            for job in jobs:
+                job.cancel_event.set()
+            pytest.fail(f"上传和下载互相等待: {small_budget.snapshot()}")
+        time.sleep(0.01)
+    assert not any(job.failed for job in jobs), [job.message for job in jobs]
+    assert target.read_bytes() == data
+    copy = tmp_path / "up.copy"
+    download_file(fake, namespace, "test", "up.bin", str(copy))
+    assert copy.read_bytes() == source.read_bytes()
+    assert small_budget.snapshot()['in_use'] == 0
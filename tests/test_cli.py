@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+import cli
+from backends import get_backend
+from compression import default_index
+from cli import EXIT_FAILED, EXIT_OK, EXIT_USAGE
+
+
+@pytest.fixture
+def store():
+    return get_backend(kind='fake').backend
+
+
+def run(capsys, *args):
+    code = cli.main(['--backend', 'fake', '--progress-interval', '0', *args])
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    return code, events
+
+
+def names(store, prefix):
+    return [obj['name'] for obj in store.list_objects("fakens", "test", prefix=prefix)['objects']]
+
+
+def test_mv_object_into_directory_keeps_basename(capsys, store):
+    store.put_object("fakens", "test", "mv/a/report.txt", b"x", 1)
+    code, _ = run(capsys, 'mv', 'oci://test/mv/a/report.txt', 'oci://test/mv/b/')
+    assert code == EXIT_OK
+    assert names(store, "mv/") == ["mv/b/report.txt"]
+
+
+def test_mv_object_to_new_name(capsys, store):
+    store.put_object("fakens", "test", "mv2/old.txt", b"x", 1)
+    code, _ = run(capsys, 'mv', 'oci://test/mv2/old.txt', 'oci://test/mv2/new.txt')
+    assert code == EXIT_OK
+    assert names(store, "mv2/") == ["mv2/new.txt"]
+
+
+def test_rm_missing_object_fails(capsys, store):
+    code, events = run(capsys, 'rm', 'oci://test/rm/missing.txt')
+    assert code == EXIT_FAILED
+    summary = events[-1]
+    assert summary['event'] == 'summary' and summary['failed'] == 1
+
+
+def test_rm_existing_object(capsys, store):
+    store.put_object("fakens", "test", "rm/there.txt", b"x", 1)
+    code, _ = run(capsys, 'rm', 'oci://test/rm/there.txt')
+    assert code == EXIT_OK
+    assert names(store, "rm/") == []
+
+
+def test_invalid_memory_budget_is_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(['--backend', 'fake', '--memory-budget', 'abc', 'ls', 'oci://test/'])
+    assert exc.value.code == EXIT_USAGE
+    assert "--memory-budget" in capsys.readouterr().err
+
+
+def test_recursive_ls_looks_up_compression_once_per_page(capsys, store, monkeypatch):
+    for i in range(5):
+        store.put_object("fakens", "test", f"ls/{i}/f.txt", b"x", 1)
+    index = default_index()
+    lookups = []
+    lookup = index.lookup
+    monkeypatch.setattr(index, 'lookup', lambda etags: lookups.append(list(etags)) or lookup(etags))
+    code, events = run(capsys, 'ls', '-r', 'oci://test/ls/')
+    assert code == EXIT_OK
+    assert [event['name'] for event in events if event['event'] == 'object'] == [f"ls/{i}/f.txt" for i in range(5)]
+    assert len(lookups) == 1 and len(lookups[0]) == 5
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+import sys
+
+import pytest
+
+from backends import OCICLIBackend, StorageError
+
+SCRIPT = """#!{python}
+import os, sys
+mode = os.environ["FAKE_OCI_MODE"]
+if mode == "ok":
+    sys.stdout.buffer.write(b"x" * 100000)
+elif mode == "missing":
+    sys.stderr.write('ServiceError:\\n{{"code": "ObjectNotFound", "message": "not found", "status": 404}}\\n')
+    sys.exit(1)
+elif mode == "throttled":
+    sys.stderr.write('ServiceError:\\n{{"code": "TooManyRequests", "message": "slow down", "status": 429}}\\n')
+    sys.exit(1)
+elif mode == "truncated":
+    sys.stdout.buffer.write(b"partial")
+    sys.stdout.flush()
+    sys.stderr.write('ServiceError:\\n{{"code": "InternalServerError", "message": "reset", "status": 500}}\\n')
+    sys.exit(1)
+"""
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    script = tmp_path / "bin" / "oci"
+    script.parent.mkdir()
+    script.write_text(SCRIPT.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+
+    def backend(mode):
+        monkeypatch.setenv("FAKE_OCI_MODE", mode)
+        return OCICLIBackend()
+    return backend
+
+
+def test_get_object_streams_and_reaps_process(cli):
+    stream = cli("ok").get_object("ns", "b", "o")
+    data = stream.read()
+    assert len(data) == 100000
+    assert stream.read() == b""
+    stream.close()
+    assert stream._process.returncode == 0
+
+
+def test_get_object_error_raises_with_status(cli):
+    with pytest.raises(StorageError) as error:
+        cli("missing").get_object("ns", "b", "o")
+    assert error.value.status == 404 and not error.value.retryable
+
+    with pytest.raises(StorageError) as error:
+        cli("throttled").get_object("ns", "b", "o", byte_range=(0, 9))
+    assert error.value.throttled
+
+
+def test_get_object_failure_after_data_is_not_a_silent_short_read(cli):
+    stream = cli("truncated").get_object("ns", "b", "o")
+    buffer = bytearray(64)
+    assert stream.readinto(buffer) == len(b"partial")
+    with pytest.raises(StorageError) as error:
+        stream.readinto(buffer)
+    assert error.value.status == 500
+    stream.close()
+
+
+def test_closing_early_kills_the_process(cli):
+    stream = cli("ok").get_object("ns", "b", "o")
+    stream.read(10)
+    stream.close()
+    assert stream._process.returncode is not None
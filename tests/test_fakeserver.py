@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import http.client
+import json
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import pytest
+
+from backends import FAKE_NAMESPACE, StorageError
+from fakeserver import FakeObjectStorageServer
+from retry import with_retry
+
+BASE = f"/n/{FAKE_NAMESPACE}/b/test"
+
+
+@pytest.fixture
+def server():
+    with FakeObjectStorageServer(retry_after=0.2) as server:
+        yield server
+
+
+def request(server, method, path, body=None, headers=None):
+    """发送一个请求，返回 (状态码, 响应头, 响应体)；不经过 SDK，直接检查 REST 接口"""
+    url = urlsplit(server.url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, response.read()
+    finally:
+        conn.close()
+
+
+def test_object_round_trip(server):
+    data = bytes(range(256)) * 4
+    status, headers, _ = request(server, 'PUT', f"{BASE}/o/{quote('dir/a b.bin', safe='')}", data,
+                                 {'opc-meta-mtime': "123"})
+    assert status == 200 and headers['etag']
+
+    status, headers, _ = request(server, 'HEAD', f"{BASE}/o/{quote('dir/a b.bin', safe='')}")
+    assert status == 200 and int(headers['content-length']) == len(data)
+    assert headers['opc-meta-mtime'] == "123"
+
+    status, headers, body = request(server, 'GET', f"{BASE}/o/{quote('dir/a b.bin', safe='')}",
+                                    headers={'Range': "bytes=10-19"})
+    assert status == 206 and body == data[10:20]
+    assert headers['content-range'] == f"bytes 10-19/{len(data)}"
+
+    status, _, body = request(server, 'GET', f"{BASE}/o/{quote('dir/a b.bin', safe='')}",
+                              headers={'If-Match': "stale"})
+    assert status == 412
+
+    status, _, _ = request(server, 'DELETE', f"{BASE}/o/{quote('dir/a b.bin', safe='')}")
+    assert status == 204
+    status, _, body = request(server, 'GET', f"{BASE}/o/{quote('dir/a b.bin', safe='')}")
+    assert status == 404 and json.loads(body)['code'] == "ObjectNotFound"
+
+
+def test_listing_pages_and_prefixes(server):
+    for i in range(5):
+        server.store.put_object(FAKE_NAMESPACE, "test", f"d/{i}.txt", b"x")
+    server.store.put_object(FAKE_NAMESPACE, "test", "d/sub/x.txt", b"x")
+
+    names, prefixes, start = [], [], None
+    while True:
+        query = "prefix=d/&delimiter=/&limit=2" + (f"&start={quote(start)}" if start else "")
+        status, _, body = request(server, 'GET', f"{BASE}/o?{query}")
+        assert status == 200
+        page = json.loads(body)
+        names += [o['name'] for o in page['objects']]
+        prefixes += page['prefixes']
+        start = page.get('nextStartWith')
+        if not start:
+            break
+    assert names == [f"d/{i}.txt" for i in range(5)]
+    assert prefixes == ["d/sub/"]
+
+
+def test_multipart_round_trip(server):
+    status, _, body = request(server, 'POST', f"{BASE}/u", json.dumps({'object': "big.bin"}))
+    upload_id = json.loads(body)['uploadId']
+    etags = []
+    for num, chunk in enumerate((b"a" * 10, b"b" * 10, b"c" * 3), 1):
+        status, headers, _ = request(server, 'PUT', f"{BASE}/u/big.bin?uploadId={upload_id}&uploadPartNum={num}",
+                                     chunk)
+        assert status == 200
+        etags.append(headers['etag'])
+
+    status, _, body = request(server, 'GET', f"{BASE}/u/big.bin?uploadId={upload_id}")
+    assert [part['size'] for part in json.loads(body)] == [10, 10, 3]
+
+    commit = {'partsToCommit': [{'partNum': num, 'etag': etag} for num, etag in enumerate(etags, 1)]}
+    status, headers, _ = request(server, 'POST', f"{BASE}/u/big.bin?uploadId={upload_id}", json.dumps(commit))
+    assert status == 200 and headers['opc-multipart-md5'].endswith("-3")
+    assert server.store.get_object(FAKE_NAMESPACE, "test", "big.bin").read() == b"a" * 10 + b"b" * 10 + b"c" * 3
+
+
+def test_throttle_returns_429_with_retry_after(server):
+    server.inject(throttle=1.0)
+    status, headers, body = request(server, 'GET', "/n")
+    assert status == 429 and headers['retry-after'] == "0.2"
+    assert json.loads(body)['code'] == "TooManyRequests"
+    assert server.throttled == 1 and server.requests == 1
+
+    def get_namespace():
+        status, headers, body = request(server, 'GET', "/n")
+        if status != 200:
+            raise StorageError(json.loads(body)['message'], status=status, headers=headers)
+        return json.loads(body)
+
+    # 限流在重试等待期间解除，重试至少等待 Retry-After
+    threading.Timer(0.05, server.inject, kwargs={'throttle': 0.0}).start()
+    started = time.monotonic()
+    assert with_retry(get_namespace, backoff=0.001) == FAKE_NAMESPACE
+    assert time.monotonic() - started >= 0.2
+    assert server.throttled == 2
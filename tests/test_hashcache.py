@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+
+import hashcache
+from hashcache import HashCache, hash_file, multipart_md5
+
+
+def md5_b64(data):
+    return base64.b64encode(hashlib.md5(data).digest()).decode()
+
+
+def test_hash_file_parts(tmp_path):
+    data = b"0123456789" * 1000
+    path = tmp_path / "f"
+    path.write_bytes(data)
+    md5, parts = hash_file(str(path), part_size=4096)
+    assert md5 == md5_b64(data)
+    assert parts == [hashlib.md5(data[i:i + 4096]).hexdigest() for i in range(0, len(data), 4096)]
+    assert multipart_md5(parts).endswith("-3")
+
+
+def test_md5_many_in_parallel_skips_missing_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(hashcache, 'PARALLEL_MIN_BYTES', 1)
+    cache = HashCache(str(tmp_path / "hashes.sqlite3"))
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"f{i}"
+        path.write_bytes(bytes([i]) * 5000)
+        paths.append(str(path))
+    results = cache.md5_many(paths + [str(tmp_path / "missing")], workers=3)
+    assert results == {path: md5_b64(open(path, 'rb').read()) for path in paths}
+
+    monkeypatch.setattr(hashcache, 'hash_file', None)  # 命中缓存时不再读取文件
+    assert cache.md5_many(paths) == results
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from backends import StorageError
+from journal import JobJournal
+from transfer import upload_file, upload_folder
+
+LOCATION = ("DEFAULT", "fakens", "test")
+DATA = bytes(range(40))
+PART = 8  # 40 字节切成 5 个分段
+
+
+def names(fake, namespace, prefix=""):
+    return sorted(o['name'] for o in fake.list_objects(namespace, "test", prefix=prefix or None)['objects'])
+
+
+def test_pending_filters_and_remove(journal_store):
+    upload = JobJournal.create('upload', LOCATION, {'folder': "/tmp/x"}, store=journal_store)
+    JobJournal.create('delete', LOCATION, {}, store=journal_store)
+    JobJournal.create('upload', ("DEFAULT", "fakens", "other"), {}, store=journal_store)
+
+    upload.record_done("a.txt")
+    upload.record_upload("big.bin", "upload-1", 8)
+    [found] = JobJournal.pending(LOCATION, kind='upload', store=journal_store)
+    assert found.id == upload.id and found.params == {'folder': "/tmp/x"}
+    assert found.is_done("a.txt") and not found.is_done("b.txt")
+    assert found.uploads() == [("big.bin", "upload-1")]
+
+    found.remove()
+    assert JobJournal.pending(LOCATION, kind='upload', store=journal_store) == []
+    assert len(JobJournal.pending(store=journal_store)) == 2
+
+
+def test_resumed_folder_upload_skips_done_files(failing, fake, namespace, tmp_path, journal_store):
+    folder = tmp_path / "src"
+    folder.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (folder / name).write_bytes(name.encode())
+    journal = JobJournal.create('upload', LOCATION, {}, store=journal_store)
+
+    failing.fail('put_object', lambda *args, **kwargs: args[2] == "dst/b.txt")
+    summary = upload_folder(failing, namespace, "test", str(folder), "dst/", workers=2, journal=journal)
+    assert summary.succeeded == 2 and [name for name, _ in summary.failed] == ["b.txt"]
+    failing.heal()
+    failing.calls.clear()
+
+    resumed = JobJournal.pending(LOCATION, kind='upload', store=journal_store)[0]
+    summary = upload_folder(failing, namespace, "test", str(folder), "dst/", workers=2, journal=resumed)
+    assert summary.succeeded == 3 and summary.skipped == 2 and not summary.failed
+    assert [args[2] for args, _ in failing.calls['put_object']] == ["dst/b.txt"]
+    assert names(fake, namespace, "dst/") == ["dst/a.txt", "dst/b.txt", "dst/c.txt"]
+
+
+def test_multipart_upload_reuses_journaled_parts(failing, fake, namespace, tmp_path, journal_store):
+    source = tmp_path / "big.bin"
+    source.write_bytes(DATA)
+    journal = JobJournal.create('upload', LOCATION, {}, store=journal_store)
+
+    def upload():
+        return upload_file(failing, namespace, "test", "big.bin", str(source), threshold=1, part_size=PART,
+                           part_workers=1, journal=journal)
+
+    failing.fail('upload_part', lambda *args, **kwargs: args[4] == 3)
+    with pytest.raises(StorageError):
+        upload()
+    assert journal.upload_for("big.bin") is not None  # 有任务日志时保留分段上传
+    failing.heal()
+    failing.calls.clear()
+
+    upload()
+    assert 'create_multipart_upload' not in failing.calls
+    assert [args[4] for args, _ in failing.calls['upload_part']] == [3]
+    assert fake.get_object(namespace, "test", "big.bin").read() == DATA
+    assert journal.upload_for("big.bin") is None
+
+
+def test_multipart_upload_resends_changed_parts(failing, fake, namespace, tmp_path, journal_store):
+    source = tmp_path / "big.bin"
+    source.write_bytes(DATA)
+    journal = JobJournal.create('upload', LOCATION, {}, store=journal_store)
+
+    def upload():
+        return upload_file(failing, namespace, "test", "big.bin", str(source), threshold=1, part_size=PART,
+                           part_workers=1, journal=journal)
+
+    failing.fail('upload_part', lambda *args, **kwargs: args[4] == 5)
+    with pytest.raises(StorageError):
+        upload()
+    failing.heal()
+    failing.calls.clear()
+
+    # 中断后本地文件第一段被修改：MD5 不一致的分段不能复用
+    changed = b"\xff" * PART + DATA[PART:]
+    source.write_bytes(changed)
+    os.utime(str(source), (1, 1))
+    upload()
+    assert sorted(args[4] for args, _ in failing.calls['upload_part']) == [1, 5]
+    assert fake.get_object(namespace, "test", "big.bin").read() == changed
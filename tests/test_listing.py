@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import wait
+
+import pytest
+
+from backends import StorageError
+from listing import ListingCache, Prefetcher, iter_list_pages, iter_objects, parent_prefix
+from retry import add_throttle_listener, remove_throttle_listener
+
+LOCATION = ("DEFAULT", "fakens", "test")
+
+
+def obj(name, size=1):
+    return {'name': name, 'size': size}
+
+
+def test_pages_cover_every_object(fake, namespace):
+    for i in range(25):
+        fake.put_object(namespace, "test", f"dir/{i:02d}.txt", b"x")
+    fake.put_object(namespace, "test", "dir/sub/deep.txt", b"x")
+
+    pages = list(iter_list_pages(fake, namespace, "test", "dir/", page_size=10))
+    assert len(pages) == 3
+    assert all(page.get('next_start_with') for page in pages[:-1])
+    assert not pages[-1].get('next_start_with')
+    names = [o['name'] for page in pages for o in page['objects']]
+    assert names == [f"dir/{i:02d}.txt" for i in range(25)]
+    assert [p for page in pages for p in page['prefixes']] == ["dir/sub/"]
+
+    recursive = [o['name'] for o in iter_objects(fake, namespace, "test", "dir/", page_size=7)]
+    assert len(recursive) == 26 and "dir/sub/deep.txt" in recursive
+
+
+def test_pages_are_fetched_lazily(fake, namespace, monkeypatch):
+    for i in range(30):
+        fake.put_object(namespace, "test", f"{i:02d}.txt", b"x")
+    requests = []
+    list_objects = fake.list_objects
+    monkeypatch.setattr(fake, 'list_objects', lambda *args, **kwargs: requests.append(kwargs) or
+                        list_objects(*args, **kwargs))
+
+    first = next(iter_list_pages(fake, namespace, "test", page_size=10))
+    assert len(first['objects']) == 10 and len(requests) == 1
+
+
+def test_parent_prefix():
+    assert parent_prefix("a/b/c.txt") == "a/b/"
+    assert parent_prefix("a/b/") == "a/"
+    assert parent_prefix("c.txt") == ""
+
+
+def test_cache_expires_and_evicts_least_recent():
+    cache = ListingCache(ttl=60, max_entries=2)
+    cache.put((*LOCATION, "a/"), [], [])
+    cache.put((*LOCATION, "b/"), [], [])
+    assert cache.get((*LOCATION, "a/")) is not None  # a/ 变为最近使用
+    cache.put((*LOCATION, "c/"), [], [])
+    assert cache.get((*LOCATION, "b/")) is None
+    assert cache.get((*LOCATION, "a/")) is not None
+
+    cache.ttl = -1
+    assert cache.get((*LOCATION, "a/")) is None
+
+
+def test_add_and_remove_object_patch_parents():
+    cache = ListingCache()
+    cache.put((*LOCATION, ""), [obj("z.txt")], [])
+    cache.put((*LOCATION, "a/"), [obj("a/1.txt")], [])
+
+    cache.add_object(LOCATION, obj("a/0.txt"))
+    cache.add_object(LOCATION, obj("a/b/c/deep.txt"))
+    assert [o['name'] for o in cache.get((*LOCATION, "a/"))['objects']] == ["a/0.txt", "a/1.txt"]
+    assert cache.get((*LOCATION, "a/"))['prefixes'] == ["a/b/"]
+    assert cache.get((*LOCATION, ""))['prefixes'] == ["a/"]
+
+    cache.add_object(LOCATION, obj("a/1.txt", size=5))
+    assert [o['size'] for o in cache.get((*LOCATION, "a/"))['objects']] == [1, 5]
+
+    cache.remove_object(LOCATION, "a/0.txt")
+    cache.remove_object(LOCATION, "a/1.txt")
+    # a/ 仍有子目录 a/b/，上级目录不受影响
+    assert cache.get((*LOCATION, "a/"))['objects'] == []
+    assert cache.get((*LOCATION, "")) is not None
+
+
+def test_removing_last_object_drops_parent_listing():
+    cache = ListingCache()
+    cache.put((*LOCATION, ""), [], ["a/"])
+    cache.put((*LOCATION, "a/"), [obj("a/only.txt")], [])
+    cache.remove_object(LOCATION, "a/only.txt")
+    assert cache.get((*LOCATION, "")) is None
+
+
+def test_prefix_helpers_and_rename():
+    cache = ListingCache()
+    cache.put((*LOCATION, ""), [], ["a/", "b/"])
+    cache.put((*LOCATION, "a/"), [obj("a/x.txt")], ["a/sub/"])
+    cache.put((*LOCATION, "a/sub/"), [obj("a/sub/y.txt")], [])
+    cache.put(("OTHER", "fakens", "test", "a/"), [obj("a/x.txt")], [])
+
+    cache.add_prefix(LOCATION, "c/new/")
+    assert cache.get((*LOCATION, ""))['prefixes'] == ["a/", "b/", "c/"]
+
+    cache.rename_object(LOCATION, "a/x.txt", "a/renamed.txt")
+    assert [o['name'] for o in cache.get((*LOCATION, "a/"))['objects']] == ["a/renamed.txt"]
+
+    cache.remove_prefix(LOCATION, "a/")
+    assert cache.get((*LOCATION, "a/")) is None and cache.get((*LOCATION, "a/sub/")) is None
+    assert cache.get((*LOCATION, ""))['prefixes'] == ["b/", "c/"]
+    assert cache.get(("OTHER", "fakens", "test", "a/")) is not None
+
+    cache.put((*LOCATION, "b/"), [], [])
+    cache.put((*LOCATION, "b/c/"), [], [])
+    cache.invalidate(LOCATION, "b/", recursive=True)
+    assert cache.get((*LOCATION, "b/")) is None and cache.get((*LOCATION, "b/c/")) is None
+    assert cache.get((*LOCATION, "")) is not None
+
+
+class CountingBackend:
+    """记录 list_objects 调用次数，可让调用抛出指定错误"""
+
+    def __init__(self, backend, error=None):
+        self.backend = backend
+        self.error = error
+        self.lists = 0
+
+    def list_objects(self, *args, **kwargs):
+        self.lists += 1
+        if self.error is not None:
+            raise self.error
+        return self.backend.list_objects(*args, **kwargs)
+
+
+def finish(prefetcher):
+    wait(list(prefetcher._futures))
+
+
+@pytest.mark.parametrize("count, cached", [(15, True), (30, False)])
+def test_prefetch_stops_at_max_pages(fake, namespace, count, cached):
+    for i in range(count):
+        fake.put_object(namespace, "test", f"d/{i:02d}.txt", b"x")
+    backend = CountingBackend(fake)
+    cache = ListingCache()
+    prefetcher = Prefetcher(cache, max_pages=2, page_size=10)
+    prefetcher.prefetch(backend, LOCATION, ["d/"])
+    finish(prefetcher)
+    assert backend.lists == 2  # 不会为判断超限多请求一页
+    assert (cache.get((*LOCATION, "d/")) is not None) == cached
+    prefetcher.shutdown()
+
+
+def test_prefetch_pauses_on_throttle_without_notifying_listeners(namespace):
+    throttles = []
+
+    def listener():
+        throttles.append(1)
+
+    backend = CountingBackend(None, StorageError("TooManyRequests", status=429, headers={'retry-after': "60"}))
+    prefetcher = Prefetcher(ListingCache())
+    add_throttle_listener(listener)
+    try:
+        prefetcher.prefetch(backend, LOCATION, ["a/", "b/", "c/"])
+        finish(prefetcher)
+    finally:
+        remove_throttle_listener(listener)
+    assert throttles == []  # 预取限流不影响传输的并发控制
+    assert prefetcher.paused()
+    calls = backend.lists
+    assert 1 <= calls <= 2  # 第一个限流后其余预取不再发请求（另一个线程可能已在请求中）
+    prefetcher.prefetch(backend, LOCATION, ["d/"])
+    finish(prefetcher)
+    assert backend.lists == calls
+    prefetcher.shutdown()
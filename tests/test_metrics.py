@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from backends import StorageError
+from metrics import InstrumentedBackend, Metrics, RollingHistogram
+from retry import TransferCancelled
+
+
+class Backend:
+    def head_object(self, namespace, bucket, name):
+        raise StorageError("missing", status=404)
+
+    def rename_object(self, namespace, bucket, source_name, new_name):
+        raise NotImplementedError
+
+    def delete_object(self, namespace, bucket, name):
+        raise TransferCancelled()
+
+    def put_object(self, namespace, bucket, name, body, content_length=None, metadata=None, content_encoding=None):
+        return {'etag': "e"}
+
+
+def test_only_storage_errors_count_as_errors():
+    metrics = Metrics()
+    backend = InstrumentedBackend(Backend(), metrics)
+    for call, error in ((lambda: backend.head_object("n", "b", "o"), StorageError),
+                        (lambda: backend.rename_object("n", "b", "a", "b"), NotImplementedError),
+                        (lambda: backend.delete_object("n", "b", "o"), TransferCancelled)):
+        with pytest.raises(error):
+            call()
+    backend.put_object("n", "b", "o", b"abc", 3)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['head'] == dict(snapshot['head'], calls=1, errors=1)
+    assert 'rename' not in snapshot and 'delete' not in snapshot
+    assert snapshot['put']['calls'] == 1 and snapshot['put']['errors'] == 0
+    assert metrics.bytes_sent == 3
+    assert [operation for _, operation, _ in metrics.recent_errors] == ['head']
+
+
+def test_histogram_percentiles():
+    histogram = RollingHistogram()
+    for ms in range(1, 101):
+        histogram.add(ms / 1000, now=1000.0)
+    p50, p95, p99 = histogram.percentiles(now=1000.0)
+    assert 0.04 <= p50 <= 0.0625 and 0.095 <= p95 <= 0.125 and p99 >= 0.099
+    assert histogram.percentiles(now=1000.0 + 3600) == [None, None, None]
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+
+from ratelimit import BandwidthLimiter, TokenBucket, parse_schedule
+
+
+def consume_in_thread(consume, *args):
+    """在线程中调用 consume，返回 (线程, 完成事件)"""
+    done = threading.Event()
+
+    def run():
+        consume(*args)
+        done.set()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, done
+
+
+def test_paces_consumers_to_rate():
+    bucket = TokenBucket(200_000)
+    started = time.monotonic()
+    threads = [consume_in_thread(bucket.consume, 50_000)[0] for _ in range(4)]
+    for thread in threads:
+        thread.join(5)
+    # 第一块不用等待，之后每块等前一块的欠账还清
+    assert 0.6 <= time.monotonic() - started < 1.5
+    assert bucket._tokens >= -50_000  # 最多欠一块
+
+
+@pytest.mark.parametrize("new_rate", [0, 100_000_000])
+def test_rate_change_wakes_waiting_thread(new_rate):
+    bucket = TokenBucket(1000)
+    bucket.consume(10_000)  # 欠账 10 秒
+    _, done = consume_in_thread(bucket.consume, 1)
+    assert not done.wait(0.2)
+    started = time.monotonic()
+    bucket.set_rate(new_rate)
+    assert done.wait(1)
+    assert time.monotonic() - started < 0.5
+
+
+def test_cancel_stops_waiting():
+    bucket = TokenBucket(1000)
+    bucket.consume(10_000)
+    cancel_event = threading.Event()
+    _, done = consume_in_thread(bucket.consume, 1, cancel_event)
+    assert not done.wait(0.2)
+    cancel_event.set()
+    assert done.wait(1)
+
+
+def test_unlimited_schedule_wakes_waiting_thread():
+    limiter = BandwidthLimiter(upload_rate=1000)
+    limiter.sent(10_000)
+    _, done = consume_in_thread(limiter.sent, 1)
+    assert not done.wait(0.2)
+    limiter.set_schedule(parse_schedule("0:00-24:00"))
+    assert done.wait(1)
+    limiter.sent(1_000_000)  # 不限速时段内不等待，也不计入欠账
+    assert limiter.upload._tokens > -1_000_000
+
+
+def test_parse_schedule():
+    assert parse_schedule("22:00-07:30") == (22 * 60, 7 * 60 + 30)
+    assert parse_schedule(" 1 - 2 ") == (60, 120)
+    with pytest.raises(ValueError):
+        parse_schedule("25:00-01:00")
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+import retry
+from backends import StorageError
+from retry import TransferCancelled, add_throttle_listener, backoff_delay, remove_throttle_listener, with_retry
+
+
+def flaky(errors, result="ok"):
+    """依次抛出 errors 中的异常，之后返回 result"""
+    errors = list(errors)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return call, calls
+
+
+def test_retries_throttling_and_notifies_listeners():
+    throttles = []
+
+    def listener():
+        throttles.append(1)
+
+    add_throttle_listener(listener)
+    try:
+        call, calls = flaky([StorageError("slow down", status=429), StorageError("bad gateway", status=502)])
+        before = retry.stats.snapshot()
+        assert with_retry(call, backoff=0.001) == "ok"
+    finally:
+        remove_throttle_listener(listener)
+    assert len(calls) == 3
+    assert throttles == [1]  # 只有限流通知监听者
+    retries, throttled, _ = retry.stats.snapshot()
+    assert (retries - before[0], throttled - before[1]) == (2, 1)
+
+
+def test_non_retryable_errors_fail_at_once():
+    call, calls = flaky([StorageError("not found", status=404)])
+    with pytest.raises(StorageError):
+        with_retry(call, backoff=0.001)
+    assert len(calls) == 1
+
+
+def test_gives_up_after_retries():
+    call, calls = flaky([StorageError("busy", status=503)] * 10)
+    with pytest.raises(StorageError):
+        with_retry(call, retries=2, backoff=0.001)
+    assert len(calls) == 3
+
+
+def test_backoff_honours_retry_after():
+    error = StorageError("slow down", status=429, headers={'retry-after': "3"})
+    assert all(3 <= backoff_delay(attempt, error, backoff=0.001) for attempt in range(5))
+    assert all(0 <= backoff_delay(attempt, backoff=0.5) <= 0.5 * 2 ** attempt for attempt in range(5))
+
+
+def test_cancel_while_backing_off():
+    cancel_event = threading.Event()
+    call, calls = flaky([StorageError("slow down", status=429, headers={'retry-after': "30"})])
+    threading.Timer(0.05, cancel_event.set).start()
+    with pytest.raises(TransferCancelled):
+        with_retry(call, cancel_event=cancel_event)
+    assert len(calls) == 1
+
+
+def test_removed_listener_is_not_called():
+    throttles = []
+
+    def listener():
+        throttles.append(1)
+
+    add_throttle_listener(listener)
+    remove_throttle_listener(listener)
+    call, _ = flaky([StorageError("slow down", status=429)])
+    with_retry(call, backoff=0.001)
+    assert throttles == []
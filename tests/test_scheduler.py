@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+import pytest
+
+import scheduler
+from scheduler import AIMD_HOLD_WINDOWS, AIMD_WINDOW, ConcurrencyController, TransferScheduler
+from transfer import download_file, holding_slot, run_pool, upload_file
+
+
+class InFlightBackend:
+    """记录同时进行中的分段和 Range 请求数的包装"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def _track(self, method):
+        def call(*args, **kwargs):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                time.sleep(0.01)
+                return method(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.active -= 1
+        return call
+
+    def __getattr__(self, name):
+        attribute = getattr(self.backend, name)
+        if name in ('upload_part', 'get_object', 'put_object'):
+            return self._track(attribute)
+        return attribute
+
+
+def run_job(scheduler, func):
+    job = scheduler.submit("test", func)
+    deadline = time.monotonic() + 30
+    while job.finished is None:
+        assert time.monotonic() < deadline, "任务没有完成"
+        time.sleep(0.01)
+    assert not job.failed, job.message
+    return job
+
+
+def test_parts_and_ranges_share_the_global_limit(tmp_path, fake, namespace):
+    backend = InFlightBackend(fake)
+    scheduler = TransferScheduler(limit=2, adaptive=False)
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"f{i}.bin"
+        path.write_bytes(os.urandom(64 * 1024))
+        paths.append(path)
+
+    def upload(job):
+        def upload_one(path):
+            upload_file(backend, namespace, "test", path.name, str(path), threshold=1, part_size=8 * 1024,
+                        part_workers=4)
+            return path.stat().st_size
+
+        summary = run_pool(paths, upload_one, 4, job.cancel_event, gate=job.slot)
+        assert summary.succeeded == 4 and not summary.failed
+
+    run_job(scheduler, upload)
+    assert backend.peak <= 2
+
+    backend.peak = 0
+    target = tmp_path / "copy.bin"
+
+    def download(job):
+        with holding_slot(job.slot):
+            download_file(backend, namespace, "test", "f0.bin", str(target), range_size=8 * 1024, range_workers=4)
+
+    run_job(scheduler, download)
+    assert target.read_bytes() == paths[0].read_bytes()
+    assert 1 <= backend.peak <= 2
+    assert scheduler._in_use == 0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler, 'time', clock)
+    return clock
+
+
+def test_throttle_halves_once_per_window(clock):
+    controller = ConcurrencyController(16, minimum=2)
+    assert controller.limit == 8
+    controller.on_throttle()
+    controller.on_throttle()  # 同一窗口内只减半一次
+    assert controller.limit == 4 and controller.decreases == 1
+    for _ in range(3):
+        clock.now += AIMD_WINDOW
+        controller.on_throttle()
+    assert controller.limit == 2 and controller.decreases == 4
+
+
+def test_update_probes_while_throughput_grows(clock):
+    controller = ConcurrencyController(8)
+    controller.update((0, 0))
+    progress, rate = 0, 100
+    for expected in (5, 6, 7):
+        rate *= 2
+        clock.now += AIMD_WINDOW
+        progress += rate * AIMD_WINDOW
+        controller.mark_saturated()
+        controller.update((progress, 0))
+        assert controller.limit == expected
+
+    # 增加额度后吞吐量没有提高：撤销这次增加并保持若干窗口
+    for _ in range(AIMD_HOLD_WINDOWS + 1):
+        clock.now += AIMD_WINDOW
+        progress += rate * AIMD_WINDOW
+        controller.mark_saturated()
+        controller.update((progress, 0))
+        assert controller.limit == 6
+
+
+def test_update_never_exceeds_maximum_or_grows_unsaturated(clock):
+    controller = ConcurrencyController(4)
+    progress = 0
+    for i in range(10):
+        clock.now += AIMD_WINDOW
+        progress += 100 * 2 ** i
+        controller.update((progress, 0))
+    assert controller.limit == 2  # 额度没有用满，不增加
+
+    for i in range(10, 20):
+        clock.now += AIMD_WINDOW
+        progress += 100 * 2 ** i
+        controller.mark_saturated()
+        controller.update((progress, 0))
+    assert controller.limit == 4
+
+
+def test_journal_ids_cover_only_unfinished_jobs():
+    scheduler = TransferScheduler(limit=2)
+    release = threading.Event()
+
+    def work(job, journal_id):
+        job.journal_id = journal_id
+        release.wait(10)
+
+    jobs = [scheduler.submit("a", work, 1), scheduler.submit("b", work, 2), scheduler.submit("c", work, None)]
+    deadline = time.monotonic() + 5
+    while scheduler.journal_ids() != {1, 2}:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    release.set()
+    while any(job.finished is None for job in jobs):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert scheduler.journal_ids() == set()
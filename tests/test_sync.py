@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import pytest
+
+import sync
+from sync import plan_sync, run_sync
+from transfer import local_matches
+
+LOCATION = ("DEFAULT", "fakens", "test")
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "src"
+    path.mkdir()
+    return path
+
+
+def touch(path, offset=100):
+    """把修改时间设为晚于上传时间"""
+    mtime = time.time() + offset
+    os.utime(path, (mtime, mtime))
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_first_sync_uploads_everything_then_nothing(src, fake):
+    write(src / "a.txt", b"a")
+    write(src / "sub" / "b.txt", b"bb")
+
+    plan, manifest = plan_sync(fake, LOCATION, str(src), "site/")
+    assert sorted(item[1] for item in plan.uploads) == ["a.txt", "sub/b.txt"]
+    summary = run_sync(fake, plan, manifest)
+    assert summary.succeeded == 2 and not summary.failed
+    assert fake.head_object("fakens", "test", "site/sub/b.txt")['size'] == 2
+
+    plan, _ = plan_sync(fake, LOCATION, str(src), "site/")
+    assert plan.uploads == [] and plan.unchanged == 2
+
+
+def test_changed_and_orphaned_files(src, fake):
+    write(src / "a.txt", b"a")
+    write(src / "b.txt", b"b")
+    run_sync(fake, *plan_sync(fake, LOCATION, str(src), "site/"))
+
+    write(src / "a.txt", b"changed")
+    os.remove(src / "b.txt")
+    plan, manifest = plan_sync(fake, LOCATION, str(src), "site/", delete_orphans=True)
+    assert [item[1] for item in plan.uploads] == ["a.txt"]
+    assert plan.deletes == ["b.txt"]
+    run_sync(fake, plan, manifest)
+    assert set(manifest.objects) == {"a.txt"}
+    assert [obj['name'] for obj in fake.list_objects("fakens", "test", prefix="site/")['objects']] == ["site/a.txt"]
+
+
+def test_full_scan_ignores_manifest_and_matches_by_md5(src, fake):
+    fake.put_object("fakens", "test", "site/a.txt", b"same", 4)
+    write(src / "a.txt", b"same")
+    touch(src / "a.txt")
+    plan, _ = plan_sync(fake, LOCATION, str(src), "site/", full_scan=True)
+    assert plan.uploads == [] and plan.unchanged == 1
+
+
+def test_full_scan_hashes_only_files_modified_after_upload(src, fake, monkeypatch):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        write(src / name, b"old")
+    run_sync(fake, *plan_sync(fake, LOCATION, str(src), "site/"))
+    hashed = []
+
+    def spy(file_path, entry):
+        hashed.append(os.path.basename(file_path))
+        return local_matches(file_path, entry)
+
+    monkeypatch.setattr(sync, 'local_matches', spy)
+    plan, _ = plan_sync(fake, LOCATION, str(src), "site/", full_scan=True)
+    assert plan.uploads == [] and plan.unchanged == 3 and hashed == []
+
+    touch(src / "b.txt")  # 只改修改时间，大小和内容不变
+    write(src / "c.txt", b"new")  # 大小不变，内容改变
+    touch(src / "c.txt")
+    plan, manifest = plan_sync(fake, LOCATION, str(src), "site/", full_scan=True)
+    assert sorted(hashed) == ["b.txt", "c.txt"]
+    assert [item[1] for item in plan.uploads] == ["c.txt"] and plan.unchanged == 2
+    assert manifest.objects["b.txt"]['mtime'] == os.stat(src / "b.txt").st_mtime
+
+
+def test_unreadable_entries_are_reported_not_fatal(src, fake):
+    write(src / "a.txt", b"a")
+    write(src / "gone.txt", b"g")
+    run_sync(fake, *plan_sync(fake, LOCATION, str(src), "site/"))
+
+    os.remove(src / "gone.txt")
+    os.symlink(src / "missing-target", src / "gone.txt")  # 失效的符号链接
+    plan, manifest = plan_sync(fake, LOCATION, str(src), "site/", delete_orphans=True)
+    assert [path for path, _ in plan.errors] == ["gone.txt"]
+    assert plan.deletes == []  # 读不到不等于已删除
+    summary = run_sync(fake, plan, manifest)
+    assert [name for name, _ in summary.failed] == ["gone.txt"]
+    fake.head_object("fakens", "test", "site/gone.txt")
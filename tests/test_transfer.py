@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+
+import pytest
+
+from backends import StorageError
+from journal import JobJournal
+from retry import TransferCancelled
+from transfer import download_file, rename_prefix, rollback_rename, run_pool
+
+DATA = bytes(range(40))
+NEW_DATA = bytes(range(100, 140))
+RANGE = 8  # 40 字节切成 5 个范围
+LOCATION = ("DEFAULT", "fakens", "test")
+
+
+def test_run_pool_aggregates_failures():
+    def worker(item):
+        if item % 2 == 0:
+            raise ValueError(f"bad {item}")
+        return item
+
+    summary = run_pool(range(1, 7), worker, max_workers=3, label=lambda item: f"item {item}")
+    assert summary.succeeded == 3 and summary.bytes == 1 + 3 + 5
+    assert sorted(summary.failed) == [("item 2", "bad 2"), ("item 4", "bad 4"), ("item 6", "bad 6")]
+    assert not summary.cancelled
+
+
+def test_run_pool_cancel_stops_submitting():
+    cancel_event = threading.Event()
+    seen = []
+
+    def worker(item):
+        seen.append(item)
+        if item == 2:
+            cancel_event.set()
+            raise TransferCancelled()
+        return 0
+
+    summary = run_pool(range(1000), worker, max_workers=1, cancel_event=cancel_event)
+    assert summary.cancelled
+    assert summary.failed == []  # 取消不记为失败
+    assert len(seen) < 1000
+
+
+def interrupted_download(failing, namespace, target):
+    """第 3 个范围失败，其余范围完成并记录在断点中"""
+    failing.fail('get_object', lambda *args, byte_range=None, **kwargs: byte_range[0] == 2 * RANGE)
+    with pytest.raises(StorageError):
+        download_file(failing, namespace, "test", "obj", str(target), range_size=RANGE, range_workers=1)
+    with open(str(target) + ".part.json") as f:
+        assert sorted(json.load(f)['done']) == [0, 1, 3, 4]
+    failing.heal()
+    failing.calls.clear()
+
+
+def fetched_ranges(failing):
+    return sorted(kwargs['byte_range'] for _, kwargs in failing.calls['get_object'])
+
+
+def test_download_resumes_missing_ranges(failing, fake, namespace, tmp_path):
+    fake.put_object(namespace, "test", "obj", DATA)
+    target = tmp_path / "obj"
+    interrupted_download(failing, namespace, target)
+
+    download_file(failing, namespace, "test", "obj", str(target), range_size=RANGE, range_workers=1)
+    assert fetched_ranges(failing) == [(16, 23)]
+    assert target.read_bytes() == DATA
+    assert not os.path.exists(str(target) + ".part") and not os.path.exists(str(target) + ".part.json")
+
+
+def test_download_restarts_when_etag_changes(failing, fake, namespace, tmp_path):
+    fake.put_object(namespace, "test", "obj", DATA)
+    target = tmp_path / "obj"
+    interrupted_download(failing, namespace, target)
+
+    fake.put_object(namespace, "test", "obj", NEW_DATA)
+    download_file(failing, namespace, "test", "obj", str(target), range_size=RANGE, range_workers=1)
+    assert len(fetched_ranges(failing)) == 5
+    assert target.read_bytes() == NEW_DATA
+
+
+def names(fake, namespace, prefix=""):
+    return sorted(o['name'] for o in fake.list_objects(namespace, "test", prefix=prefix or None)['objects'])
+
+
+def test_rename_rollback_restores_original_names(fake, namespace, journal_store):
+    for name in ("old/a.txt", "old/sub/b.txt", "keep.txt"):
+        fake.put_object(namespace, "test", name, name.encode())
+    journal = JobJournal.create('rename', LOCATION, {'old_prefix': "old/", 'new_prefix': "new/"},
+                                store=journal_store)
+
+    summary = rename_prefix(fake, namespace, "test", "old/", "new/", journal=journal, workers=2)
+    assert summary.succeeded == 2
+    assert names(fake, namespace) == ["keep.txt", "new/a.txt", "new/sub/b.txt"]
+    assert sorted(journal.done_names()) == ["old/a.txt", "old/sub/b.txt"]
+
+    summary = rollback_rename(fake, namespace, "test", journal, workers=2)
+    assert summary.succeeded == 2 and not summary.failed
+    assert names(fake, namespace) == ["keep.txt", "old/a.txt", "old/sub/b.txt"]
+    assert fake.get_object(namespace, "test", "old/sub/b.txt").read() == b"old/sub/b.txt"
+    assert journal.done_names() == []
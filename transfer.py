@@ -0,0 +1,1127 @@
+# -*- coding: utf-8 -*-
+"""
+传输引擎
+1.固定大小的工作线程池处理批量任务
+2.跨线程汇总进度与结果
+3.大文件并行分段上传，按实际发送的字节统计进度
+4.大对象并发 Range 下载，支持断点续传和完整性校验
+5.文件夹递归上传和下载：边遍历本地目录边上传，边列举边下载，内存占用与文件数无关
+6.前缀删除流水线：列举结果逐页送入并发删除
+7.服务端重命名，文件夹重命名并发执行并记录日志
+8.本地文件哈希经缓存复用，用于跳过判断和下载校验
+9.按实际收发的字节限速，所有传输共用上传、下载两个令牌桶
+10.可选 gzip/zstd 流式压缩上传，下载时透明解压
+"""
+
+import base64
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime
+
+from backends import StorageError
+from bufferpool import MemoryReader, default_pool, readinto
+from compression import (ORIGINAL_MD5_METADATA, ORIGINAL_SIZE_METADATA, compressor, decompressor, default_index,
+                         is_compressed)
+from hashcache import default_cache, hash_file, multipart_md5
+from listing import iter_objects
+from ratelimit import default_limiter
+from retry import TransferCancelled, with_retry
+
+DEFAULT_WORKERS = 8  # 默认并发数
+MAX_WORKERS = 64
+MULTIPART_THRESHOLD = 128 * 1024 * 1024  # 超过该大小的文件使用分段上传
+DEFAULT_PART_SIZE = 64 * 1024 * 1024  # 分段大小
+MAX_PARTS = 10000  # 服务端允许的最大分段数
+DEFAULT_PART_WORKERS = 4  # 单个文件的分段并发数
+DEFAULT_RANGE_SIZE = 32 * 1024 * 1024  # 下载时每个 Range 请求的大小
+DEFAULT_RANGE_WORKERS = 4  # 单个对象的 Range 并发数
+PART_SUFFIX = ".part"  # 下载中的临时文件后缀，已完成范围记录在 <文件>.part.json
+COMPRESSED_PART_SIZE = 16 * 1024 * 1024  # 压缩上传时的分段大小（压缩后），分段在内存中生成
+COMPRESSED_PART_WORKERS = 2  # 压缩上传时同时上传的分段数
+WALK_QUEUE_SIZE = 1000  # 遍历本地目录时最多领先上传的文件数
+PART_SIZE_METADATA = "part-size"  # 分段上传时写入对象元数据的分段大小，下载时据此校验分段 MD5
+
+
+class TransferSummary:
+    """批量操作结果汇总：成功数、失败列表、字节数和耗时"""
+
+    def __init__(self):
+        self.succeeded = 0
+        self.skipped = 0  # 成功项中因无需传输而跳过的数量
+        self.failed = []  # (名称, 错误信息)
+        self.bytes = 0
+        self.cancelled = False
+        self.started = time.monotonic()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def add_success(self, size=0):
+        with self._lock:
+            self.succeeded += 1
+            self.bytes += size or 0
+
+    def add_skipped(self):
+        with self._lock:
+            self.skipped += 1
+
+    def add_failure(self, name, error):
+        with self._lock:
+            self.failed.append((name, str(error)))
+
+    def finish(self, cancelled=False):
+        self.cancelled = cancelled
+        self.finished = time.monotonic()
+
+    @property
+    def total(self):
+        return self.succeeded + len(self.failed)
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def items_per_second(self):
+        return self.total / max(self.elapsed, 1e-6)
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes / max(self.elapsed, 1e-6)
+
+    def text(self, max_failures=10):
+        """结果描述，最多列出 max_failures 个失败项"""
+        lines = [f"成功: {self.succeeded}", f"失败: {len(self.failed)}", f"耗时: {self.elapsed:.1f} 秒",
+                 f"速度: {self.items_per_second:.1f} 文件/秒, {self.bytes_per_second / 1024 / 1024:.2f} MB/s"]
+        if self.skipped:
+            lines.insert(1, f"跳过: {self.skipped}")
+        if self.cancelled:
+            lines.insert(0, "已取消")
+        if self.failed:
+            lines.append("")
+            lines += [f"{name}: {error}" for name, error in self.failed[:max_failures]]
+            if len(self.failed) > max_failures:
+                lines.append(f"... 另有 {len(self.failed) - max_failures} 个失败")
+        return "\n".join(lines)
+
+
+class ProgressTracker:
+    """汇总所有工作线程的进度，供界面定时读取"""
+
+    def __init__(self, total_items=0, total_bytes=0):
+        self.total_items = total_items
+        self.total_bytes = total_bytes
+        self.done_items = 0
+        self.done_bytes = 0
+        self.current = ""
+        self.discovering = False  # 总数仍在增加（边遍历边传输），此时总数为"已发现"的数量
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add_bytes(self, size):
+        with self._lock:
+            self.done_bytes += size
+
+    def add_total(self, size, items=0):
+        with self._lock:
+            self.total_bytes += size
+            self.total_items += items
+
+    def start_discovery(self):
+        self.discovering = True
+
+    def finish_discovery(self):
+        self.discovering = False
+
+    def set_current(self, name):
+        with self._lock:
+            self.current = name
+
+    def item_done(self, name=""):
+        with self._lock:
+            self.done_items += 1
+            if name:
+                self.current = name
+
+    def eta(self):
+        """按当前平均速度估算的剩余秒数，总数未知或无法估算时返回 None"""
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            if self.discovering or not self.total_bytes or not self.done_bytes or elapsed <= 0:
+                return None
+            speed = self.done_bytes / elapsed
+            return max(0.0, (self.total_bytes - self.done_bytes) / speed)
+
+    def items_per_second(self):
+        with self._lock:
+            return self.done_items / max(time.monotonic() - self.started, 1e-6)
+
+    def snapshot(self):
+        """返回 (已完成项, 总项, 已完成字节, 总字节, 速度 B/s, 当前项)"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-6)
+            return (self.done_items, self.total_items, self.done_bytes, self.total_bytes,
+                    self.done_bytes / elapsed, self.current)
+
+    def percent(self):
+        with self._lock:
+            if self.total_bytes:
+                return min(100.0, self.done_bytes * 100.0 / self.total_bytes)
+            if self.total_items:
+                return min(100.0, self.done_items * 100.0 / self.total_items)
+            return 0.0
+
+
+def run_pool(items, worker, max_workers=DEFAULT_WORKERS, cancel_event=None, label=str, summary=None, gate=None):
+    """用固定大小的线程池处理 items
+
+    worker(item) 返回处理的字节数，抛出异常记为该项失败，不影响其他项。
+    同时在途的任务不超过 max_workers 的两倍，cancel_event 置位后不再提交新任务并丢弃排队任务。
+    gate 不为空时，每一项在 holding_slot(gate) 中执行，用于向调度器申请全局并发额度。
+    返回 TransferSummary。
+    """
+    summary = summary or TransferSummary()
+    max_workers = max(1, min(int(max_workers), MAX_WORKERS))
+    if gate is not None:
+        worker = _gated(worker, gate)
+    items = iter(items)
+    pending = {}
+
+    def submit_more(executor):
+        while len(pending) < max_workers * 2:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            pending[executor.submit(worker, item)] = item
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="transfer") as executor:
+        submit_more(executor)
+        while pending:
+            done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                if future.cancelled():
+                    continue
+                error = future.exception()
+                if error is None:
+                    summary.add_success(future.result())
+                elif not isinstance(error, TransferCancelled):
+                    summary.add_failure(label(item), error)
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+            else:
+                submit_more(executor)
+
+    summary.finish(cancelled=cancel_event is not None and cancel_event.is_set())
+    return summary
+
+
+def _gated(worker, gate):
+    def run(item):
+        with holding_slot(gate):
+            return worker(item)
+    return run
+
+
+_slots = threading.local()
+
+
+class _SlotHolder:
+    """工作线程当前持有的一个调度器额度，可以暂时归还再重新申请"""
+
+    def __init__(self, gate):
+        self.gate = gate
+        self._slot = None
+
+    def acquire(self):
+        slot = self.gate()
+        slot.__enter__()
+        self._slot = slot
+
+    def release(self):
+        slot, self._slot = self._slot, None
+        if slot is not None:
+            slot.__exit__(None, None, None)
+
+    @property
+    def held(self):
+        return self._slot is not None
+
+
+@contextmanager
+def holding_slot(gate):
+    """在 gate() 申请的一个全局并发额度内执行一项传输
+
+    其中的分段上传和 Range 下载经 _fan_out 执行：先归还这个额度，每个分段或 Range 请求再各自申请，
+    实际在途的请求数因此不超过调度器的额度，限流也能反映到并发控制上。
+    """
+    holder = _SlotHolder(gate)
+    holder.acquire()
+    previous = getattr(_slots, 'holder', None)
+    _slots.holder = holder
+    try:
+        yield
+    finally:
+        _slots.holder = previous
+        holder.release()
+
+
+@contextmanager
+def _slot_released():
+    """等待缓冲池额度期间暂时归还当前线程持有的调度器额度，占到内存后再重新申请
+
+    压缩上传先占内存再申请额度，若持有额度的线程再去等内存，内存和额度可能各被一方占满而互相等待。
+    等内存时不占额度，持有额度的线程就不会阻塞在内存上。传给缓冲池的 while_waiting 参数。
+    """
+    holder = getattr(_slots, 'holder', None)
+    if holder is None or not holder.held:
+        yield
+        return
+    holder.release()
+    try:
+        yield
+    finally:
+        holder.acquire()
+
+
+def _fan_out(items, worker, max_workers, cancel_event, label):
+    """单个文件内的并发请求（分段、Range），调用方持有调度器额度时每个请求都计入该额度"""
+    holder = getattr(_slots, 'holder', None)
+    if holder is None:
+        return run_pool(items, worker, max_workers, cancel_event, label=label)
+    # 等待分段完成期间不占用额度，否则所有额度都被等待中的文件占用时分段无法执行
+    holder.release()
+    try:
+        return run_pool(items, worker, max_workers, cancel_event, label=label, gate=holder.gate)
+    finally:
+        holder.acquire()
+
+
+class ProgressReader:
+    """包装文件对象，统计被 HTTP 层实际读走的字节数
+
+    limit 限制最多读取的字节数（用于分段），读取时检查取消并按上传限速等待。
+    只暴露 read 和 __len__，避免 HTTP 库通过 fileno 把整个文件长度当作请求体长度。
+    """
+
+    def __init__(self, fileobj, callback=None, cancel_event=None, limit=None):
+        self._fileobj = fileobj
+        self._callback = callback
+        self._cancel_event = cancel_event
+        self._limit = limit
+        self.bytes_read = 0
+
+    def __len__(self):
+        if self._limit is None:
+            return max(0, os.fstat(self._fileobj.fileno()).st_size - self._fileobj.tell())
+        return self._limit - self.bytes_read
+
+    def read(self, size=-1):
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise TransferCancelled()
+        if self._limit is not None:
+            remaining = self._limit - self.bytes_read
+            if remaining <= 0:
+                return b''
+            size = remaining if size is None or size < 0 else min(size, remaining)
+        data = self._fileobj.read(size)
+        self.bytes_read += len(data)
+        if data:
+            default_limiter().sent(len(data), self._cancel_event)
+            if self._callback:
+                self._callback(len(data))
+        return data
+
+    def rollback(self):
+        """请求失败时撤销已统计的字节"""
+        if self._callback and self.bytes_read:
+            self._callback(-self.bytes_read)
+        self.bytes_read = 0
+
+
+def effective_part_size(size, part_size=DEFAULT_PART_SIZE):
+    """实际使用的分段大小：分段数不超过 MAX_PARTS"""
+    return max(part_size, -(-size // MAX_PARTS))
+
+
+def plan_parts(size, part_size=DEFAULT_PART_SIZE):
+    """把文件切分为 (part_num, offset, length)，分段数不超过 MAX_PARTS"""
+    part_size = effective_part_size(size, part_size)
+    return [(index + 1, offset, min(part_size, size - offset))
+            for index, offset in enumerate(range(0, size, part_size))]
+
+
+def upload_file(backend, namespace, bucket, name, file_path, progress=None, cancel_event=None, metadata=None,
+                threshold=MULTIPART_THRESHOLD, part_size=DEFAULT_PART_SIZE, part_workers=DEFAULT_PART_WORKERS,
+                journal=None, compression=None):
+    """上传本地文件，大文件自动并行分段上传
+
+    progress(n) 在每次实际发送 n 字节后调用，失败时以负数撤销。返回 {'etag', 'md5'}。
+    journal 不为空时分段上传记录在任务日志中，中断后再次上传会复用已上传的分段。
+    compression 为 'gzip' 或 'zstd' 时边读边压缩上传，progress 按原始字节数报告。
+    """
+    if compression:
+        return _compressed_upload(backend, namespace, bucket, name, file_path, compression, progress, cancel_event,
+                                  metadata)
+    size = os.path.getsize(file_path)
+    if not backend.supports_multipart:
+        # 命令行后端自行处理分段，只能在完成后报告进度
+        result = backend.put_file(namespace, bucket, name, file_path, metadata=metadata)
+        if progress:
+            progress(size)
+        return result
+
+    if size < threshold:
+        def put():
+            with open(file_path, 'rb') as f:
+                reader = ProgressReader(f, progress, cancel_event, limit=size)
+                try:
+                    return backend.put_object(namespace, bucket, name, reader, content_length=size,
+                                              metadata=metadata)
+                except BaseException:
+                    reader.rollback()
+                    raise
+
+        return with_retry(put, cancel_event=cancel_event)
+
+    part_size = effective_part_size(size, part_size)
+    metadata = dict(metadata or {}, **{PART_SIZE_METADATA: str(part_size)})
+    return _multipart_upload(backend, namespace, bucket, name, file_path, part_size, progress, cancel_event, metadata,
+                             part_workers, journal)
+
+
+def _reusable_parts(backend, namespace, bucket, name, upload_id, file_path, parts, part_size):
+    """之前中断的分段上传中可以复用的分段 {part_num: etag}，大小和 MD5 都与本地一致才复用"""
+    uploaded = with_retry(backend.list_multipart_upload_parts, namespace, bucket, name, upload_id)
+    digests = default_cache().part_md5s(file_path, part_size)
+    reusable = {}
+    for part_num, _, length in parts:
+        part = uploaded.get(part_num)
+        if part is None or part.get('size') != length:
+            continue
+        if part.get('md5') and base64.b64decode(part['md5']).hex() != digests[part_num - 1]:
+            continue
+        reusable[part_num] = part['etag']
+    return reusable
+
+
+def _multipart_upload(backend, namespace, bucket, name, file_path, part_size, progress, cancel_event, metadata,
+                      part_workers, journal=None):
+    """并行上传各分段后提交
+
+    没有任务日志或被取消时放弃分段上传；有任务日志时失败后保留分段上传，继续任务时只补传缺少的分段。
+    """
+    parts = plan_parts(os.path.getsize(file_path), part_size)
+    cancel_event = cancel_event or threading.Event()
+    etags = {}
+
+    upload_id = None
+    previous = journal.upload_for(name) if journal else None
+    if previous and previous[1] == part_size:
+        try:
+            etags = _reusable_parts(backend, namespace, bucket, name, previous[0], file_path, parts, part_size)
+            upload_id = previous[0]
+        except StorageError as e:
+            if e.status != 404:
+                raise
+    if upload_id is None:
+        upload_id = with_retry(backend.create_multipart_upload, namespace, bucket, name, metadata=metadata,
+                               cancel_event=cancel_event)
+        if journal:
+            journal.record_upload(name, upload_id, part_size)
+    if progress and etags:
+        progress(sum(length for part_num, _, length in parts if part_num in etags))
+    parts = [part for part in parts if part[0] not in etags]
+
+    def send_once(part_num, offset, length):
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            reader = ProgressReader(f, progress, cancel_event, limit=length)
+            try:
+                return backend.upload_part(namespace, bucket, name, upload_id, part_num, reader, length)
+            except BaseException:
+                reader.rollback()
+                raise
+
+    def send(part):
+        part_num, offset, length = part
+        etags[part_num] = with_retry(send_once, part_num, offset, length, cancel_event=cancel_event)
+        return length
+
+    try:
+        summary = _fan_out(parts, send, part_workers, cancel_event, label=lambda part: f"part {part[0]}")
+        if summary.cancelled:
+            raise TransferCancelled()
+        if summary.failed:
+            failed_part, error = summary.failed[0]
+            raise StorageError(f"分段上传失败 ({failed_part}): {error}")
+        result = with_retry(backend.commit_multipart_upload, namespace, bucket, name, upload_id,
+                            sorted(etags.items()), cancel_event=cancel_event)
+    except BaseException:
+        if journal is None or cancel_event.is_set():
+            try:
+                backend.abort_multipart_upload(namespace, bucket, name, upload_id)
+            except StorageError:
+                pass
+            if journal:
+                journal.clear_upload(name)
+        raise
+    if journal:
+        journal.clear_upload(name)
+    return result
+
+
+class _ScaledProgress:
+    """把压缩后数据的发送进度换算为原始字节数"""
+
+    def __init__(self, progress, original, compressed):
+        self._progress = progress
+        self._original = original
+        self._compressed = max(1, compressed)
+        self._sent = 0
+        self._reported = 0
+
+    def __call__(self, n):
+        self._sent += n
+        reported = self._original * self._sent // self._compressed
+        if self._progress and reported != self._reported:
+            self._progress(reported - self._reported)
+        self._reported = reported
+
+
+def _compressed_parts(file_path, encoding, part_size, cancel_event, digest, reservations):
+    """读取并压缩文件，逐个返回 (原始字节数, 压缩后数据 memoryview, 预留额度)
+
+    每个分段压缩后为 part_size（最后一块可能更小），生成前先从缓冲池一次预留 part_size 加一块读缓冲的额度，
+    额度在分段上传后释放；reservations 收集所有预留，出错时统一释放。
+    读缓冲由本次上传独占并计入当前分段的额度，持有额度时不再向缓冲池借用，并发上传不会互相等待而卡死。
+    """
+    pool = default_pool()
+    compress = compressor(encoding)
+    buffer = bytearray(pool.buffer_size)
+    view = memoryview(buffer)
+
+    def new_part():
+        reservation = pool.reserve(part_size + len(buffer), cancel_event, _slot_released)
+        reservations.append(reservation)
+        return bytearray(part_size), reservation
+
+    part, reservation = new_part()
+    filled, original, produced = 0, 0, 0
+    with open(file_path, 'rb') as f:
+        while True:
+            if cancel_event.is_set():
+                raise TransferCancelled()
+            n = f.readinto(view)
+            digest.update(view[:n])
+            data = memoryview(compress.compress(view[:n]) if n else compress.flush())
+            original += n
+            while data:
+                take = min(len(data), part_size - filled)
+                part[filled:filled + take] = data[:take]
+                filled += take
+                data = data[take:]
+                if filled == part_size:
+                    yield original, memoryview(part), reservation
+                    produced += 1
+                    part, reservation = new_part()
+                    filled, original = 0, 0
+            if not n:
+                break
+    if filled or not produced:
+        yield original, memoryview(part)[:filled], reservation
+    else:
+        reservation.release()
+
+
+def _compressed_upload(backend, namespace, bucket, name, file_path, encoding, progress, cancel_event, metadata):
+    """边读边压缩上传，不写临时文件
+
+    压缩结果一定不超过一个分段的小文件单次上传（附带原始 MD5），其余文件依次生成分段并上传。
+    分段数据占用缓冲池的内存预算，额度不足时等待已生成的分段上传完成。
+    对象带 Content-Encoding 和原始大小元数据，上传后记入压缩索引。返回值另含 'size'（存储的大小）。
+    """
+    size = os.path.getsize(file_path)
+    cancel_event = cancel_event or threading.Event()
+    metadata = dict(metadata or {}, **{ORIGINAL_SIZE_METADATA: str(size)})
+    digest = hashlib.md5()
+    reservations = []
+    # 压缩后最坏情况下略大于原始数据（gzip、zstd 都不超过 1/64 加上固定开销）
+    bound = size + size // 64 + 64 * 1024
+    single = bound <= COMPRESSED_PART_SIZE
+
+    def send_once(send, original, data):
+        reader = ProgressReader(MemoryReader(data), _ScaledProgress(progress, original, len(data)), cancel_event,
+                                limit=len(data))
+        try:
+            return send(reader, len(data))
+        except BaseException:
+            reader.rollback()
+            raise
+
+    if single:
+        try:
+            chunks = _compressed_parts(file_path, encoding, bound, cancel_event, digest, reservations)
+            original, data, _ = next(chunks)
+            if next(chunks, None) is not None:
+                raise StorageError(f"压缩 {name} 的结果超出预期大小")
+            original_md5 = base64.b64encode(digest.digest()).decode()
+            metadata[ORIGINAL_MD5_METADATA] = original_md5
+            result = with_retry(send_once, lambda body, length: backend.put_object(
+                namespace, bucket, name, body, content_length=length, metadata=metadata, content_encoding=encoding),
+                original, data, cancel_event=cancel_event)
+        finally:
+            for reservation in reservations:
+                reservation.release()
+        default_index().put(result.get('etag'), encoding, size, original_md5)
+        return dict(result, size=len(data))
+    if not backend.supports_multipart:
+        raise StorageError(f"{backend.name} 后端不支持压缩上传超过 {COMPRESSED_PART_SIZE // (1024 * 1024)} MB 的文件")
+
+    upload_id = with_retry(backend.create_multipart_upload, namespace, bucket, name, metadata=metadata,
+                           content_encoding=encoding, cancel_event=cancel_event)
+    etags = {}
+    stored = []
+
+    def send(item):
+        part_num, (original, data, reservation) = item
+        with reservation:
+            etags[part_num] = with_retry(send_once, lambda body, length: backend.upload_part(
+                namespace, bucket, name, upload_id, part_num, body, length), original, data,
+                cancel_event=cancel_event)
+        stored.append(len(data))
+        return len(data)
+
+    try:
+        # run_pool 按需从生成器取分段，分段的内存受缓冲池预算约束
+        chunks = _compressed_parts(file_path, encoding, COMPRESSED_PART_SIZE, cancel_event, digest, reservations)
+        summary = _fan_out(enumerate(chunks, start=1), send, COMPRESSED_PART_WORKERS, cancel_event,
+                           label=lambda item: f"part {item[0]}")
+        if summary.cancelled:
+            raise TransferCancelled()
+        if summary.failed:
+            failed_part, error = summary.failed[0]
+            raise StorageError(f"分段上传失败 ({failed_part}): {error}")
+        result = with_retry(backend.commit_multipart_upload, namespace, bucket, name, upload_id,
+                            sorted(etags.items()), cancel_event=cancel_event)
+    except BaseException:
+        try:
+            backend.abort_multipart_upload(namespace, bucket, name, upload_id)
+        except StorageError:
+            pass
+        raise
+    finally:
+        for reservation in reservations:
+            reservation.release()
+    default_index().put(result.get('etag'), encoding, size)
+    return dict(result, size=sum(stored))
+
+
+def local_matches(file_path, obj):
+    """按内容判断本地文件与对象是否一致，MD5 取自哈希缓存
+
+    单次上传的对象比对 MD5；分段上传的对象按上传时的分段大小重算分段 MD5。无法判断时返回 False。
+    """
+    try:
+        if obj.get('md5') and '-' not in obj['md5']:
+            return default_cache().md5(file_path) == obj['md5']
+        remote = obj.get('multipart-md5') or obj.get('md5')
+        if remote and '-' in remote:
+            part_size = (obj.get('metadata') or {}).get(PART_SIZE_METADATA)
+            part_size = int(part_size) if part_size else effective_part_size(os.path.getsize(file_path))
+            return default_cache().multipart_md5(file_path, part_size) == remote
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+def _verify_download(part_path, info):
+    """校验下载结果，返回文件 MD5；无法校验时也返回计算出的 MD5，不一致时返回 None"""
+    part_size = (info.get('metadata') or {}).get(PART_SIZE_METADATA)
+    try:
+        part_size = int(part_size) if part_size and info.get('multipart-md5') else None
+    except ValueError:
+        part_size = None
+    md5, parts = hash_file(part_path, part_size)
+    if info.get('md5'):
+        return md5 if md5 == info['md5'] else None
+    if parts is not None:
+        return md5 if multipart_md5(parts) == info['multipart-md5'] else None
+    return md5
+
+
+def _load_download_state(state_path):
+    try:
+        with open(state_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_download_state(state_path, state):
+    """原子写入断点记录"""
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _decompress_file(source_path, target_path, encoding, cancel_event=None):
+    """流式解压 source_path 到 target_path，返回解压后内容的 MD5（base64）"""
+    decompress = decompressor(encoding)
+    digest = hashlib.md5()
+    try:
+        with open(source_path, 'rb') as source, open(target_path, 'wb') as target, \
+                default_pool().buffer(cancel_event, _slot_released) as buffer:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise TransferCancelled()
+                n = source.readinto(buffer)
+                if not n:
+                    break
+                data = decompress.decompress(buffer[:n])
+                digest.update(data)
+                target.write(data)
+            data = decompress.flush()
+            digest.update(data)
+            target.write(data)
+    except ValueError as e:
+        os.remove(target_path)
+        raise StorageError(f"解压失败 ({encoding}): {e}")
+    except BaseException:
+        os.remove(target_path)
+        raise
+    return base64.b64encode(digest.digest()).decode()
+
+
+def download_file(backend, namespace, bucket, name, file_path, progress=None, cancel_event=None, on_size=None,
+                  range_size=DEFAULT_RANGE_SIZE, range_workers=DEFAULT_RANGE_WORKERS, mtime=None, decompress=True):
+    """下载对象到本地文件
+
+    对象按 range_size 切分为多个 Range 请求并发写入预分配的 <file_path>.part，
+    已完成的范围记录在 <file_path>.part.json，重试或重启后从中断处继续。
+    每个请求都带 If-Match，保证各范围来自同一版本；完成后按 MD5 校验再重命名到 file_path。
+    mtime 不为空时设置为本地修改时间。校验得到的 MD5 写入哈希缓存，之后的比对无需重读文件。
+    压缩对象（Content-Encoding 为 gzip/zstd）在 decompress 为真时校验后流式解压，有原始 MD5 时再校验一次。
+    on_size(size) 在得知对象大小后调用，size 为存储的大小。返回对象信息。
+    """
+    info = with_retry(backend.head_object, namespace, bucket, name, cancel_event=cancel_event)
+    size, etag = info['size'], info['etag']
+    if on_size:
+        on_size(size)
+
+    part_path = file_path + PART_SUFFIX
+    state_path = part_path + ".json"
+    state = _load_download_state(state_path)
+    if (not state or state.get('etag') != etag or state.get('size') != size
+            or not os.path.exists(part_path) or os.path.getsize(part_path) != size):
+        # 没有可用的断点，预分配文件从头下载
+        state = {'etag': etag, 'size': size, 'range_size': range_size, 'done': []}
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+        _save_download_state(state_path, state)
+
+    range_size = state.get('range_size', range_size)
+    done = set(state['done'])
+    ranges = [(index, offset, min(range_size, size - offset))
+              for index, offset in enumerate(range(0, size, range_size)) if index not in done]
+    if progress and size:
+        progress(size - sum(length for _, _, length in ranges))
+
+    cancel_event = cancel_event or threading.Event()
+    state_lock = threading.Lock()
+
+    def fetch(item):
+        index, offset, length = item
+        received = 0
+        # 先借到缓冲再发起请求，避免响应已打开却在等待内存
+        with default_pool().buffer(cancel_event, _slot_released) as buffer:
+            stream = with_retry(backend.get_object, namespace, bucket, name, byte_range=(offset, offset + length - 1),
+                                if_match=etag, cancel_event=cancel_event)
+            try:
+                with open(part_path, 'r+b') as f:
+                    f.seek(offset)
+                    while received < length:
+                        if cancel_event.is_set():
+                            raise TransferCancelled()
+                        n = readinto(stream, buffer[:min(len(buffer), length - received)])
+                        if not n:
+                            break
+                        f.write(buffer[:n])
+                        received += n
+                        if progress:
+                            progress(n)
+                        default_limiter().received(n, cancel_event)
+            except BaseException:
+                if progress and received:
+                    progress(-received)
+                raise
+            finally:
+                close = getattr(stream, 'close', None)
+                if close:
+                    close()
+        if received != length:
+            if progress and received:
+                progress(-received)
+            raise StorageError(f"范围 {offset}-{offset + length - 1} 数据不完整: {received}/{length}")
+        with state_lock:
+            state['done'].append(index)
+            _save_download_state(state_path, state)
+        return length
+
+    summary = _fan_out(ranges, fetch, range_workers, cancel_event, label=lambda item: f"bytes {item[1]}")
+    if summary.cancelled:
+        raise TransferCancelled()
+    if summary.failed:
+        failed_range, error = summary.failed[0]
+        raise StorageError(f"下载 {name} 失败 ({failed_range}): {error}")
+
+    # 完整性校验：单次上传的对象比对 MD5，记录了分段大小的分段对象比对分段 MD5，
+    # 其余分段对象由 If-Match 保证版本一致
+    md5 = _verify_download(part_path, info)
+    if md5 is None:
+        os.remove(part_path)
+        os.remove(state_path)
+        raise StorageError(f"下载 {name} 校验失败: MD5 不一致")
+
+    if decompress and is_compressed(info):
+        raw_path = part_path + ".raw"
+        md5 = _decompress_file(part_path, raw_path, info['content-encoding'].lower(), cancel_event)
+        expected = (info.get('metadata') or {}).get(ORIGINAL_MD5_METADATA)
+        os.remove(part_path)
+        if expected and expected != md5:
+            os.remove(raw_path)
+            os.remove(state_path)
+            raise StorageError(f"下载 {name} 校验失败: 解压后 MD5 不一致")
+        os.replace(raw_path, part_path)
+        default_index().put_info(info)
+
+    if mtime is not None:
+        os.utime(part_path, (mtime, mtime))
+    os.replace(part_path, file_path)
+    os.remove(state_path)
+    default_cache().put(file_path, md5)
+    return info
+
+
+def walk_files(folder_path, on_error=None):
+    """用 os.scandir 深度优先遍历目录，逐个返回 (路径, 相对路径, 大小)
+
+    与 os.walk 一样不进入指向目录的符号链接；无法读取的目录跳过，并调用 on_error(相对路径, 异常)。
+    """
+    def relative(path):
+        # 将Windows路径分隔符转换为Unix格式
+        return os.path.relpath(path, folder_path).replace('\\', '/')
+
+    stack = [folder_path]
+    while stack:
+        directory = stack.pop()
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirectories.append(entry.path)
+                            continue
+                        size = entry.stat().st_size
+                    except OSError as e:
+                        if on_error:
+                            on_error(relative(entry.path), e)
+                        continue
+                    yield entry.path, relative(entry.path), size
+        except OSError as e:
+            if on_error:
+                on_error(relative(directory), e)
+        stack.extend(reversed(subdirectories))
+
+
+def walk_in_background(folder_path, cancel_event=None, on_error=None, queue_size=WALK_QUEUE_SIZE):
+    """在后台线程中遍历目录，经有界队列逐个返回 walk_files 的结果
+
+    遍历与消费同时进行；队列满时遍历线程等待，取消或调用方停止迭代时遍历线程退出。
+    """
+    files = queue.Queue(maxsize=queue_size)
+    finished = object()
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                files.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def walk():
+        try:
+            for item in walk_files(folder_path, on_error):
+                if (cancel_event is not None and cancel_event.is_set()) or not put(item):
+                    return
+        finally:
+            put(finished)
+
+    threading.Thread(target=walk, daemon=True, name="walker").start()
+    try:
+        while True:
+            item = files.get()
+            if item is finished:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def upload_folder(backend, namespace, bucket, folder_path, target_path, workers=DEFAULT_WORKERS, tracker=None,
+                  cancel_event=None, summary=None, gate=None, journal=None, compression=None):
+    """递归上传本地文件夹到 target_path 下，保留目录结构
+
+    后台线程遍历目录，发现的文件经有界队列立即送入上传线程池，遍历结束前总数为"已发现"的数量。
+    journal 不为空时跳过日志中已完成的文件，并记录新完成的文件和进行中的分段上传。
+    compression 不为空时每个文件按该算法压缩上传。返回 TransferSummary。
+    """
+    summary = summary or TransferSummary()
+    if tracker:
+        tracker.start_discovery()
+
+    def on_error(relative_path, error):
+        summary.add_failure(relative_path, f"无法读取: {error}")
+
+    def files():
+        for file_path, relative_path, size in walk_in_background(folder_path, cancel_event, on_error):
+            if tracker:
+                tracker.add_total(size, items=1)
+            if journal and journal.is_done(relative_path):
+                # 之前运行中已上传的文件
+                summary.add_success()
+                summary.add_skipped()
+                if tracker:
+                    tracker.add_bytes(size)
+                    tracker.item_done(relative_path)
+                continue
+            yield file_path, relative_path
+        if tracker:
+            tracker.finish_discovery()
+
+    def upload(item):
+        file_path, relative_path = item
+        try:
+            upload_file(backend, namespace, bucket, target_path + relative_path, file_path,
+                        progress=tracker.add_bytes if tracker else None, cancel_event=cancel_event, journal=journal,
+                        compression=compression)
+            if journal:
+                journal.record_done(relative_path)
+            return os.path.getsize(file_path)
+        finally:
+            if tracker:
+                tracker.item_done(relative_path)
+
+    try:
+        return run_pool(files(), upload, workers, cancel_event, label=lambda item: item[1], summary=summary,
+                        gate=gate)
+    finally:
+        if tracker:
+            tracker.finish_discovery()
+
+
+def parse_time(value):
+    """把对象的 time-modified 转换为时间戳，无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def local_path_for(local_dir, relative_name):
+    """对象相对名称对应的本地路径，拒绝跳出目标目录的名称"""
+    parts = [part for part in relative_name.split('/') if part]
+    if any(part in ('.', '..') for part in parts):
+        raise StorageError(f"对象名称不安全: {relative_name}")
+    return os.path.join(local_dir, *parts)
+
+
+def is_same_file(local_path, obj):
+    """本地文件与对象大小相同且修改时间一致（误差 1 秒内）时视为已存在
+
+    压缩索引中已知的压缩对象与解压后的大小比较，有原始 MD5 时再比对内容。
+    """
+    try:
+        stat = os.stat(local_path)
+    except OSError:
+        return False
+    remote_time = parse_time(obj.get('time-modified'))
+    compressed = default_index().get(obj.get('etag'))
+    if compressed is not None:
+        _, size, md5 = compressed
+        if stat.st_size != size:
+            return False
+        if md5:
+            try:
+                return default_cache().md5(local_path) == md5
+            except OSError:
+                return False
+        return remote_time is not None and abs(stat.st_mtime - remote_time) < 1
+    return stat.st_size == obj.get('size', 0) and remote_time is not None and abs(stat.st_mtime - remote_time) < 1
+
+
+def download_prefix(backend, namespace, bucket, prefix, local_dir, workers=DEFAULT_WORKERS, tracker=None,
+                    cancel_event=None, summary=None, gate=None):
+    """递归下载前缀下的所有对象到 local_dir，保留目录结构
+
+    列举结果逐页送入有界的下载线程池，列举未结束时下载已经开始。
+    本地已有大小和修改时间一致、或内容 MD5 一致的文件时跳过；下载完成后把本地修改时间设为对象的修改时间。
+    返回 TransferSummary。
+    """
+    summary = summary or TransferSummary()
+    os.makedirs(local_dir, exist_ok=True)
+    if tracker:
+        tracker.start_discovery()
+
+    def objects():
+        for obj in iter_objects(backend, namespace, bucket, prefix):
+            if tracker:
+                tracker.add_total(obj.get('size', 0), items=1)
+            yield obj
+        if tracker:
+            tracker.finish_discovery()
+
+    def fetch(obj):
+        relative_name = obj['name'][len(prefix):]
+        try:
+            local_path = local_path_for(local_dir, relative_name)
+            if obj['name'].endswith('/'):
+                # 文件夹占位对象
+                os.makedirs(local_path, exist_ok=True)
+                summary.add_skipped()
+                return 0
+            remote_time = parse_time(obj.get('time-modified'))
+            if is_same_file(local_path, obj) or (os.path.isfile(local_path)
+                                                 and os.path.getsize(local_path) == obj.get('size', 0)
+                                                 and local_matches(local_path, obj)):
+                summary.add_skipped()
+                if tracker:
+                    tracker.add_bytes(obj.get('size', 0))
+                return 0
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            download_file(backend, namespace, bucket, obj['name'], local_path,
+                          progress=tracker.add_bytes if tracker else None, cancel_event=cancel_event,
+                          mtime=remote_time)
+            return obj.get('size', 0)
+        finally:
+            if tracker:
+                tracker.item_done(relative_name)
+
+    try:
+        return run_pool(objects(), fetch, workers, cancel_event, label=lambda obj: obj['name'], summary=summary,
+                        gate=gate)
+    finally:
+        if tracker:
+            tracker.finish_discovery()
+
+
+def delete_object(backend, namespace, bucket, name, cancel_event=None, missing_ok=True):
+    """删除单个对象，限流时重试；missing_ok 时对象已不存在视为成功"""
+    try:
+        with_retry(backend.delete_object, namespace, bucket, name, cancel_event=cancel_event)
+    except StorageError as e:
+        if e.status != 404 or not missing_ok:
+            raise
+    return 0
+
+
+def delete_prefix(backend, namespace, bucket, prefix, workers=DEFAULT_WORKERS, tracker=None, cancel_event=None,
+                  summary=None, gate=None, journal=None):
+    """删除前缀下的所有对象
+
+    列举结果逐页送入并发删除线程池；单个对象失败只记录在结果中，不中断整个删除。
+    journal 不为空时每删除一个对象写入任务日志。返回 TransferSummary。
+    """
+    def objects():
+        for obj in iter_objects(backend, namespace, bucket, prefix):
+            if tracker:
+                tracker.add_total(0, items=1)
+            yield obj['name']
+
+    def delete(name):
+        try:
+            delete_object(backend, namespace, bucket, name, cancel_event)
+            if journal:
+                journal.record_done(name)
+            return 0
+        finally:
+            if tracker:
+                tracker.item_done(name)
+
+    return run_pool(objects(), delete, workers, cancel_event, summary=summary, gate=gate)
+
+
+def rename_object(backend, namespace, bucket, old_name, new_name, cancel_event=None):
+    """重命名对象：优先使用服务端 RenameObject（只改元数据），不支持时退回复制加删除"""
+    try:
+        with_retry(backend.rename_object, namespace, bucket, old_name, new_name, cancel_event=cancel_event)
+    except NotImplementedError:
+        with_retry(backend.copy_object, namespace, bucket, old_name, new_name, cancel_event=cancel_event)
+        with_retry(backend.delete_object, namespace, bucket, old_name, cancel_event=cancel_event)
+    return 0
+
+
+def rename_prefix(backend, namespace, bucket, old_prefix, new_prefix, journal=None, workers=DEFAULT_WORKERS,
+                  tracker=None, cancel_event=None, summary=None, gate=None):
+    """把 old_prefix 下的所有对象重命名到 new_prefix 下
+
+    列举结果逐页送入并发重命名线程池；每完成一个对象写入 journal，中断后重新执行即可继续
+    （已移走的对象不会再被列举到），也可用 rollback_rename 回滚。返回 TransferSummary。
+    """
+    if new_prefix.startswith(old_prefix):
+        raise StorageError("新文件夹不能位于原文件夹内部")
+
+    def objects():
+        for obj in iter_objects(backend, namespace, bucket, old_prefix):
+            if tracker:
+                tracker.add_total(0, items=1)
+            yield obj['name']
+
+    def rename(name):
+        try:
+            rename_object(backend, namespace, bucket, name, new_prefix + name[len(old_prefix):], cancel_event)
+            if journal:
+                journal.record_done(name)
+            return 0
+        finally:
+            if tracker:
+                tracker.item_done(name)
+
+    return run_pool(objects(), rename, workers, cancel_event, summary=summary, gate=gate)
+
+
+def rollback_rename(backend, namespace, bucket, journal, workers=DEFAULT_WORKERS, tracker=None, cancel_event=None,
+                    gate=None):
+    """按日志把已移动到新前缀的对象移回原名称，返回 TransferSummary"""
+    names = journal.done_names()
+    old_prefix, new_prefix = journal.params['old_prefix'], journal.params['new_prefix']
+    if tracker:
+        tracker.add_total(0, items=len(names))
+
+    def restore(name):
+        try:
+            rename_object(backend, namespace, bucket, new_prefix + name[len(old_prefix):], name, cancel_event)
+            journal.record_undone(name)
+            return 0
+        finally:
+            if tracker:
+                tracker.item_done(name)
+
+    return run_pool(names, restore, workers, cancel_event, gate=gate)